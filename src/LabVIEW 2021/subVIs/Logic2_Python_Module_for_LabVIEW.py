@@ -10,9 +10,63 @@
 
 
 
-from saleae import automation
+import argparse
+import collections
+import concurrent.futures
+import csv
+import dataclasses
+import functools
+import glob
+import importlib
+import inspect
+import itertools
 import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import secrets
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
 from enum import Enum
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+
+
+class _LazyModule:
+    """
+    Stands in for a module global and imports the module the first time one of its attributes is used, so loading
+    this file into LabVIEW does not pay for imports a VI may never need. Once imported, the real module replaces
+    the stand-in in this module's globals, so later calls see no extra cost.
+    """
+    def __init__(self, module_name, global_name):
+        self.module_name = module_name
+        self.global_name = global_name
+        self.lock = threading.Lock()
+        self.module = None
+
+    def _resolve(self):
+        with self.lock:
+            if self.module is None:
+                self.module = importlib.import_module(self.module_name)
+                if globals().get(self.global_name) is self:
+                    globals()[self.global_name] = self.module
+        return self.module
+
+    def __getattr__(self, name):
+        if name in ('module_name', 'global_name', 'lock', 'module'):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+
+automation = _LazyModule('saleae.automation', 'automation') # Imported on first use, see warm_up() to pay for it in advance
+np = _LazyModule('numpy', 'np') # Only needed by the array functions, the rest of the module works without it
 
 # INSTRUCTIONS
 # 1. Install LabVIEW, and setup an Anaconda 3 instance using Python 3.8
@@ -22,294 +76,4873 @@ from enum import Enum
 
 
 
-# Global variable declaration (Note: I hope to find a better way to maintain state in the future. ESAL22)
-manager = None  # Global managing the Logic2 session
-capture = None  # Global managing the captured data
-spi_analyzer = None # Global managing the SPI Analyzer (Doing it this way limits you to 1 SPI analyzer, hope to improve. ESAL22)
-device_configuration = None # Global managing device config
-capture_configuration = None # Global managing capture config
+# Session state (Note: the original globals now live on a Session object per handle, so several
+# Logic 2 connections and devices can be driven from parallel LabVIEW loops. ESAL22)
+DEFAULT_SESSION = 0 # Handle used when no session handle is wired, this is what the original subVIs talk to
+WORKER_ADDRESS = '127.0.0.1' # The worker process only ever listens on the local machine
+DEFAULT_WORKER_PORT = 10431 # One above the Logic 2 automation port
+WORKER_AUTHKEY_BYTES = 32 # Length of the random key start_worker() gives each worker, clients must present it to connect
+WORKER_KEY_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.expanduser('~'), '.logic2_labview') # Per-user directory of the worker key files
+METRICS_WINDOW = 1000 # Number of recent calls per name the latency percentiles are computed from
+ARCHIVE_MANIFEST = 'manifest.json' # Index of the tables and time chunks of an archive written by archive_exports()
+DIGITAL_MEASUREMENTS = ['transitions', 'rising_edges', 'frequency_hz', 'period_mean_seconds', 'period_min_seconds',
+                        'period_max_seconds', 'period_std_seconds', 'duty_cycle', 'high_min_seconds', 'high_max_seconds',
+                        'low_min_seconds', 'low_max_seconds', 'glitches', 'skew_mean_seconds', 'skew_min_seconds',
+                        'skew_max_seconds'] # Columns of the measure_digital() results table
+DEVICE_CACHE_TTL_SECONDS = 10.0 # How long get_list_of_devices() answers from the cache before asking Logic 2 again
+POOL_CALL_DEADLINE_SECONDS = 5.0 # Upper bound for connecting, liveness probes, device queries and closing a connection
+POOL_PROBE_INTERVAL_SECONDS = 5.0 # A pooled connection not verified for this long is probed with get_app_info() before use
+POOL_CONNECT_ATTEMPTS = 3 # Connection attempts before giving up, with POOL_BACKOFF_SECONDS doubling between them
+POOL_BACKOFF_SECONDS = 0.5 # Delay before the second connection attempt
+POOL_IDLE_SECONDS = 600.0 # Pooled connections no session has used for this long are closed
+BATCH_MANIFEST_VERSION = 1 # Layout of the progress manifest written by start_batch_reprocess()
+DIGITAL_BYTES_PER_TRANSITION = 8 # Approximate Logic 2 memory and binary export size per digital transition
+ANALOG_BYTES_PER_SAMPLE = 4 # Approximate Logic 2 memory and binary export size per analog sample
+CSV_TIME_BYTES = 13 # Typical width of the time column of a raw CSV export, comma included
+CSV_DIGITAL_BYTES = 2 # Per digital channel column of a raw CSV export
+CSV_ANALOG_BYTES = 13 # Per analog channel column of a raw CSV export
+DEFAULT_EXPORT_BYTES_PER_SECOND = 20e6 # Export throughput assumed until the metrics have measured one
+CAPTURE_CLEANUP_DEADLINE_SECONDS = 30.0 # Upper bound for stopping and closing a capture, which frees its memory in Logic 2
+CAPTURE_START_DEADLINE_SECONDS = 30.0 # Upper bound for asking Logic 2 to start a capture and for adding or removing an analyzer
+CAPTURE_WAIT_MARGIN_SECONDS = 60.0 # Allowed on top of a timed capture's duration before its wait() is abandoned
+EXPORT_DEADLINE_SECONDS = 600.0 # Upper bound for one export, save or load of a capture, raise it for very long captures
+DEFAULT_CALL_DEADLINES = { # Deadline in seconds per automation call, see configure_call_deadlines(). Only trigger waits are unbounded by default
+    'Manager.connect': 2 * POOL_CALL_DEADLINE_SECONDS, # Above the connect timeout the gRPC channel is given
+    'manager.get_devices': POOL_CALL_DEADLINE_SECONDS,
+    'manager.get_app_info': POOL_CALL_DEADLINE_SECONDS,
+    'manager.close': POOL_CALL_DEADLINE_SECONDS,
+    'manager.start_capture': CAPTURE_START_DEADLINE_SECONDS,
+    'manager.load_capture': EXPORT_DEADLINE_SECONDS,
+    'capture.wait': CAPTURE_WAIT_MARGIN_SECONDS,
+    'capture.add_analyzer': CAPTURE_START_DEADLINE_SECONDS,
+    'capture.remove_analyzer': CAPTURE_START_DEADLINE_SECONDS,
+    'capture.export_raw_data_csv': EXPORT_DEADLINE_SECONDS,
+    'capture.export_raw_data_binary': EXPORT_DEADLINE_SECONDS,
+    'capture.export_data_table': EXPORT_DEADLINE_SECONDS,
+    'capture.save_capture': EXPORT_DEADLINE_SECONDS,
+    'capture.stop': CAPTURE_CLEANUP_DEADLINE_SECONDS,
+    'capture.close': CAPTURE_CLEANUP_DEADLINE_SECONDS,
+}
+IDEMPOTENT_CALLS = frozenset(['manager.get_devices', 'manager.get_app_info']) # Calls retried when they fail or miss their deadline
+CALL_RETRIES = 2 # Extra attempts of an idempotent call, with CALL_BACKOFF_SECONDS doubling between them
+CALL_BACKOFF_SECONDS = 0.5 # Delay before the first retry
+DEADLINE_REPORT_WINDOW = 100 # Number of recent deadline misses get_deadline_report() lists
+ANALOG_SAMPLE_RATES = (50000000, 12500000, 6250000, 3125000, 1562500, 781250) # Rates an 'adapt' capture budget steps the analog rate down through
+DECIMATION_FILTER_SPAN = 1 << 20 # About this many samples of a waveform are anti-alias filtered at a time, so memory stays bounded
+
+
+class Metrics:
+    """
+    Call counts, latencies, failures and bytes written per module function and per automation API call.
+
+    Off by default. While off, instrumented calls only check the enabled flag, so the overhead is negligible.
+    Latency percentiles are computed over the most recent METRICS_WINDOW calls of each name.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.trace_logger = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = collections.defaultdict(lambda: {
+                'count': 0,
+                'failures': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'bytes_written': 0,
+                'recent_seconds': collections.deque(maxlen=METRICS_WINDOW),
+            })
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            entry = self.calls[name]
+            entry['count'] += 1
+            entry['failures'] += 0 if ok else 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            entry['recent_seconds'].append(seconds)
+        if self.trace_logger is not None:
+            self.trace_logger.info(json.dumps({'time': time.time(), 'name': name, 'seconds': seconds, 'ok': ok}))
+
+    def add_bytes(self, name, byte_count):
+        with self.lock:
+            self.calls[name]['bytes_written'] += byte_count
+
+    def timed(self, name):
+        """
+        Context manager timing one automation API call, for example with metrics.timed('capture.wait'):
+        An exception leaving the block counts as a failure.
+        """
+        return _TimedCall(self, name)
+
+    def snapshot(self):
+        """
+        Returns the counters as a dict of name -> statistics.
+        """
+        with self.lock:
+            calls = {name: dict(entry, recent_seconds=sorted(entry['recent_seconds'])) for name, entry in self.calls.items()}
+        for entry in calls.values():
+            recent_seconds = entry.pop('recent_seconds')
+            entry['mean_seconds'] = entry['total_seconds'] / entry['count'] if entry['count'] else 0.0
+            for percentile in (50, 95, 99):
+                # Nearest-rank percentile of the recent window: the ceil(percentile / 100 * n)-th smallest
+                rank = max(0, -(-percentile * len(recent_seconds) // 100) - 1)
+                entry[f'p{percentile}_seconds'] = recent_seconds[min(rank, len(recent_seconds) - 1)] if recent_seconds else 0.0
+        return calls
+
+
+class _TimedCall:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if self.metrics.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.start is not None:
+            self.metrics.record(self.name, time.perf_counter() - self.start, exc_type is None)
+        return False
+
+
+def _is_error_result(result):
+    """
+    True for the '-1 ERROR' strings the module functions return, also as the first item of a tuple result.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    return isinstance(result, str) and result.startswith('-1 ERROR')
+
+
+def _instrumented(function):
+    """
+    Decorator recording every call of a module function in the metrics, counting '-1 ERROR' results as failures.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = function(*args, **kwargs)
+            ok = not _is_error_result(result)
+            return result
+        finally:
+            metrics.record(function.__name__, time.perf_counter() - start, ok)
+    return wrapper
+
+
+def _output_bytes(*paths):
+    """
+    Total size of the given files, or of all files directly inside the given directories. Missing paths count as 0.
+    """
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        elif os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+metrics = Metrics() # Global metrics, see enable_metrics() and get_metrics()
+
+
+class HandleRegistry:
+    """
+    Thread-safe table of objects (sessions, capture jobs, ...) addressed by integer handles.
+
+    LabVIEW only ever sees the integer, the objects themselves stay inside the Python session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects = {}
+        self._next_handle = 1 # 0 is reserved for DEFAULT_SESSION, negative numbers are never valid handles
+
+    def add(self, obj, handle=None):
+        """
+        Stores obj and returns its handle. A new handle is allocated unless one is given.
+        """
+        with self._lock:
+            if handle is None:
+                handle = self._next_handle
+                self._next_handle += 1
+            self._objects[handle] = obj
+        return handle
+
+    def get(self, handle, kind=None):
+        """
+        Returns the object for handle, or None if there is none or it is not an instance of kind.
+        """
+        with self._lock:
+            obj = self._objects.get(handle)
+        if kind is not None and not isinstance(obj, kind):
+            return None
+        return obj
+
+    def remove(self, handle, kind=None):
+        """
+        Releases handle and returns the object it referred to, or None. With kind, a handle of another kind is kept.
+        """
+        with self._lock:
+            if kind is not None and not isinstance(self._objects.get(handle), kind):
+                return None
+            return self._objects.pop(handle, None)
+
+    def items(self, kind=None):
+        """
+        Returns a snapshot list of (handle, object) pairs, optionally only those of the given kind.
+        """
+        with self._lock:
+            snapshot = list(self._objects.items())
+        return [(handle, obj) for handle, obj in snapshot if kind is None or isinstance(obj, kind)]
+
+
+def _missing_handle(kind, handle):
+    """
+    Returns the '-1 ERROR' string for a handle that does not refer to an object of kind.
+    """
+    return f"-1 ERROR {kind.HANDLE_NAME} {handle} does not exist."
+
+
+def _device_to_dict(device):
+    """
+    Converts a DeviceDesc returned by manager.get_devices() to the dictionary get_list_of_devices() reports.
+    """
+    return {
+        "device_id": device.device_id,
+        "device_type": device.device_type.name if isinstance(device.device_type, Enum) else device.device_type,
+        "is_simulation": device.is_simulation
+    }
+
+
+class DeviceCache:
+    """
+    The device lists of one session, as the JSON get_list_of_devices() returns, keyed by include_simulation_devices.
+
+    Entries are dropped as soon as a device query or a capture start fails, so a device that was unplugged
+    is not served from the cache for the rest of its TTL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {} # include_simulation_devices -> (time.monotonic() of the query, JSON list)
+
+    def get(self, include_simulation_devices, ttl_seconds):
+        """
+        Returns the cached JSON list if it is younger than ttl_seconds, otherwise None.
+        """
+        with self.lock:
+            entry = self.entries.get(bool(include_simulation_devices))
+        if entry is None or time.monotonic() - entry[0] > ttl_seconds:
+            return None
+        return entry[1]
+
+    def fetch(self, manager, include_simulation_devices):
+        """
+        Queries Logic 2, stores the result and returns it. Clears the cache and re-raises if the query fails.
+        """
+        try:
+            list_of_devices = _automation_call('manager.get_devices', manager.get_devices,
+                                               include_simulation_devices=bool(include_simulation_devices))
+            json_list_of_devices = json.dumps([_device_to_dict(device) for device in list_of_devices])
+        except Exception:
+            self.invalidate()
+            raise
+        with self.lock:
+            self.entries[bool(include_simulation_devices)] = (time.monotonic(), json_list_of_devices)
+        return json_list_of_devices
+
+    def cached_keys(self):
+        with self.lock:
+            return list(self.entries)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def _call_with_deadline(deadline_seconds, function, *args, **kwargs):
+    """
+    Runs function on a helper thread and raises TimeoutError if it has not returned within deadline_seconds.
+    A gRPC call cannot be interrupted from outside, so a call that misses its deadline finishes in the background
+    on its daemon thread, which does not keep Python (or LabVIEW) from exiting.
+    """
+    outcome = {}
+    def call():
+        try:
+            outcome['result'] = function(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+    thread = threading.Thread(target=call, name='Logic2Deadline', daemon=True)
+    thread.start()
+    thread.join(deadline_seconds)
+    if thread.is_alive():
+        raise TimeoutError(f"{getattr(function, '__name__', 'call')} did not return within {deadline_seconds} seconds")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def _automation_call(name, function, *args, **kwargs):
+    """
+    Runs one automation API call under its deadline from call_deadlines (default_call_deadline for calls not
+    listed, 0 or None for no deadline) and times it in the metrics under name. Calls in IDEMPOTENT_CALLS that
+    fail or miss their deadline are retried call_retries times with doubling backoff. Raises TimeoutError when
+    the (last) attempt misses its deadline, and whatever the call raised otherwise.
+    """
+    return _bounded_call(name, call_deadlines.get(name, default_call_deadline), function, *args, **kwargs)
+
+
+def _bounded_call(name, deadline_seconds, function, *args, **kwargs):
+    attempts = 1 + (call_retries if name in IDEMPOTENT_CALLS else 0)
+    delay = call_backoff_seconds
+    for attempt in range(attempts):
+        start = time.perf_counter()
+        try:
+            with metrics.timed(name):
+                if not deadline_seconds:
+                    return function(*args, **kwargs)
+                return _call_with_deadline(deadline_seconds, function, *args, **kwargs)
+        except TimeoutError:
+            deadline_misses.append({'time': time.time(), 'name': name, 'deadline_seconds': deadline_seconds,
+                                    'elapsed_seconds': time.perf_counter() - start, 'attempt': attempt + 1})
+            if attempt == attempts - 1:
+                raise TimeoutError(f"{name} did not return within {deadline_seconds} seconds")
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+        time.sleep(delay)
+        delay *= 2
+
+
+def _cancel_capture(temp_capture):
+    """
+    Stops and closes a capture, each under its deadline, ignoring errors: the capture is abandoned either way.
+    """
+    for name, function in (('capture.stop', temp_capture.stop), ('capture.close', temp_capture.close)):
+        try:
+            _automation_call(name, function)
+        except Exception:
+            pass
+
+
+def _wait_for_capture(temp_capture, capture_configuration):
+    """
+    capture.wait() under a deadline of the configured 'capture.wait' seconds on top of the timed duration.
+    A triggered capture can legitimately wait for its trigger indefinitely, so it is only bounded when
+    'capture.wait_trigger' is configured (no default), by that many seconds on top of the time after the trigger.
+    A capture that misses its deadline is stopped and closed, so a hung capture cannot block the caller or
+    keep holding Logic 2 memory.
+    """
+    capture_mode = getattr(capture_configuration, 'capture_mode', None)
+    if isinstance(capture_mode, automation.DigitalTriggerCaptureMode):
+        margin_seconds = call_deadlines.get('capture.wait_trigger')
+        length_seconds = capture_mode.after_trigger_seconds or 0.0
+    else:
+        margin_seconds = call_deadlines.get('capture.wait', default_call_deadline)
+        length_seconds = getattr(capture_mode, 'duration_seconds', None) or 0.0
+    if not margin_seconds:
+        return _bounded_call('capture.wait', None, temp_capture.wait)
+    try:
+        return _bounded_call('capture.wait', length_seconds + margin_seconds, temp_capture.wait)
+    except TimeoutError as e:
+        _cancel_capture(temp_capture)
+        raise TimeoutError(f"{e}, the capture was stopped and closed") from None
+
+
+class PooledConnection:
+    """
+    One automation.Manager of the ConnectionPool and its bookkeeping.
+    """
+
+    def __init__(self, address, port):
+        self.address = address
+        self.port = port
+        self.manager = None
+        self.lock = threading.Lock() # Held while connecting or probing, so only one caller reconnects
+        self.sessions = 0
+        self.verified_at = 0.0 # time.monotonic() of the last successful connect or probe
+        self.released_at = time.monotonic()
+        self.reconnects = 0
+        self.retired = [] # Managers replaced while captures made with them were still open, closed once no session is left
+
+
+class ConnectionPool:
+    """
+    Keeps one automation.Manager per (address, port) connected across sessions and LabVIEW runs, so a bench PC
+    driving several Logic 2 hosts pays for each gRPC connection once.
+
+    A connection that has not been verified for POOL_PROBE_INTERVAL_SECONDS is probed with get_app_info()
+    before it is handed out, and replaced with a fresh one (retrying with backoff) if the probe fails. A probe
+    also fails while Logic 2 is busy, so a replaced manager that sessions still hold captures of is kept open
+    until the last session of the connection is released; closing it would break the exports of those captures.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = {} # (address, port) -> PooledConnection
+
+    def acquire(self, address, port):
+        """
+        Returns the key of a live connection to address:port for a new session, connecting if needed.
+        """
+        self.close_idle(POOL_IDLE_SECONDS)
+        key = (address, int(port))
+        with self.lock:
+            connection = self.connections.setdefault(key, PooledConnection(address, int(port)))
+            connection.sessions += 1
+        try:
+            self.get(key)
+        except Exception:
+            self.release(key)
+            raise
+        return key
+
+    def release(self, key):
+        """
+        Called when a session using key closes. The connection stays open for the next session.
+        """
+        retired = []
+        with self.lock:
+            connection = self.connections.get(key)
+            if connection is not None:
+                connection.sessions = max(0, connection.sessions - 1)
+                connection.released_at = time.monotonic()
+                if connection.sessions == 0:
+                    retired, connection.retired = connection.retired, []
+        for manager in retired:
+            self._close_retired(manager)
+
+    def get(self, key, probe_interval_seconds=None):
+        """
+        Returns the manager of key, probing and reconnecting it first if it has not been verified within
+        probe_interval_seconds (POOL_PROBE_INTERVAL_SECONDS by default).
+        """
+        if probe_interval_seconds is None:
+            probe_interval_seconds = POOL_PROBE_INTERVAL_SECONDS
+        with self.lock:
+            connection = self.connections.get(key)
+        if connection is None:
+            raise RuntimeError(f"No pooled connection to {key[0]}:{key[1]}")
+        with connection.lock:
+            if connection.manager is not None and time.monotonic() - connection.verified_at <= probe_interval_seconds:
+                return connection.manager
+            if connection.manager is not None:
+                try:
+                    _automation_call('manager.get_app_info', connection.manager.get_app_info)
+                    connection.verified_at = time.monotonic()
+                    return connection.manager
+                except Exception:
+                    if _connection_holds_captures(key):
+                        connection.retired.append(connection.manager)
+                        connection.manager = None
+                    else:
+                        self._close_manager(connection)
+                    connection.reconnects += 1
+            connection.manager = self._connect(connection.address, connection.port)
+            connection.verified_at = time.monotonic()
+            return connection.manager
+
+    def _connect(self, address, port):
+        delay = POOL_BACKOFF_SECONDS
+        for attempt in range(POOL_CONNECT_ATTEMPTS):
+            try:
+                return _automation_call('Manager.connect', automation.Manager.connect, port=port, address=address,
+                                        connect_timeout_seconds=POOL_CALL_DEADLINE_SECONDS)
+            except Exception:
+                if attempt == POOL_CONNECT_ATTEMPTS - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def _close_manager(self, connection):
+        manager, connection.manager = connection.manager, None
+        self._close_retired(manager)
+
+    def _close_retired(self, manager):
+        try:
+            _automation_call('manager.close', manager.close)
+        except Exception:
+            pass # The connection is being dropped either way
+
+    def close_idle(self, idle_seconds):
+        """
+        Closes the connections no session has used for idle_seconds and returns how many were closed.
+        """
+        now = time.monotonic()
+        with self.lock:
+            idle = [key for key, connection in self.connections.items()
+                    if connection.sessions == 0 and now - connection.released_at >= idle_seconds]
+            connections = [self.connections.pop(key) for key in idle]
+        for connection in connections:
+            with connection.lock:
+                if connection.manager is not None:
+                    self._close_manager(connection)
+                for manager in connection.retired:
+                    self._close_retired(manager)
+                connection.retired = []
+        return len(connections)
+
+    def status(self):
+        """
+        Returns a list of dicts describing each pooled connection.
+        """
+        now = time.monotonic()
+        with self.lock:
+            connections = list(self.connections.values())
+        return [{
+            'address': connection.address,
+            'port': connection.port,
+            'connected': connection.manager is not None,
+            'sessions': connection.sessions,
+            'seconds_since_verified': now - connection.verified_at if connection.manager is not None else None,
+            'reconnects': connection.reconnects,
+            'retired_managers': len(connection.retired),
+        } for connection in connections]
+
+
+def _connection_holds_captures(key):
+    """
+    Whether any session, capture job, loop or batch on the pooled connection key may still hold a capture in Logic 2.
+    """
+    for _, session in registry.items(Session):
+        if session.pool_key == key and (session.capture is not None or session.manual_capture is not None):
+            return True
+    for _, job in registry.items((CaptureJob, CaptureLoop)):
+        if job.session.pool_key == key:
+            return True
+    return any(key in batch.pool_keys and batch.thread.is_alive() for _, batch in registry.items(BatchJob))
+
+
+class Session:
+    """
+    Everything that belongs to one connection to Logic 2: the manager, the stored configurations,
+    the active capture and its SPI analyzer.
+
+    The lock serializes changes to the session state. The exports only read the active capture and do not
+    take it, so several exports of the same capture can run at once (see export_all()).
+
+    Sessions opened with open_connection() or open_session() get their manager from the connection pool
+    through pool_key, so a dropped connection is replaced without the session noticing.
+    """
+
+    def __init__(self, manager, pool_key=None):
+        self._manager = manager
+        self.pool_key = pool_key
+        self.capture = None
+        self.spi_analyzer = None # Only the one added by add_spi_analyzer(), see add_analyzer() for any number of analyzers
+        self.device_configuration = None
+        self.capture_configuration = None
+        self.manual_capture = None # Manual capture still recording, ended by stop_capture()
+        self.devices = DeviceCache()
+        self.budget = None # Resource limits checked before every capture, see set_capture_budget()
+        self.lock = threading.RLock()
+
+    @property
+    def manager(self):
+        if self.pool_key is None:
+            return self._manager
+        return connection_pool.get(self.pool_key)
+
+    def set_capture(self, capture):
+        """
+        Makes capture the active capture. The SPI analyzer belongs to the capture it was added to, so it is dropped.
+        Call with the lock held.
+        """
+        self.capture = capture
+        self.spi_analyzer = None
+
+
+class CaptureJob:
+    """
+    A capture that is recording in the background.
+
+    manager.start_capture() returns as soon as the device is armed, so the blocking capture.wait()
+    is moved to a worker thread and LabVIEW polls the job instead of sitting in the Python Node.
+    """
+
+    HANDLE_NAME = 'Capture job'
+
+    def __init__(self, session, temp_capture, manual=False):
+        self.session = session
+        self.capture = temp_capture
+        self.manual = manual # Manual captures cannot be waited for, they are complete as soon as they record
+        self.capture_configuration = session.capture_configuration
+        self.error = None
+        self.cancelled = False
+        self.timed_out = False # The capture missed its deadline and was stopped and closed, see _wait_for_capture()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._wait, daemon=True)
+        self.thread.start()
+
+    def _wait(self):
+        try:
+            if not self.manual:
+                _wait_for_capture(self.capture, self.capture_configuration)
+        except TimeoutError as e:
+            self.timed_out = True
+            self.error = e
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def status(self):
+        """
+        Returns 'RUNNING', 'COMPLETE', 'CANCELLED' or a '-1 ERROR' string describing why the capture failed.
+        """
+        if self.cancelled:
+            return "CANCELLED"
+        if not self.done.is_set():
+            return "RUNNING"
+        if self.error is not None:
+            return f"-1 ERROR An error occurred while waiting for the capture: {self.error}"
+        return "COMPLETE"
+
+
+class CaptureLoop:
+    """
+    Repeats the same capture with the stored configurations, double-buffered: while capture N+1 records,
+    the exports of capture N and its close() run in a worker thread.
+
+    At most max_pending captures exist in Logic 2 at a time (the one recording plus those still exporting),
+    so Logic 2 memory stays bounded when the exports are slower than the captures.
+    """
+
+    HANDLE_NAME = 'Capture loop'
+
+    def __init__(self, session, device_id, device_configuration, operations, iterations, max_pending):
+        self.session = session
+        self.device_id = device_id
+        self.device_configuration = device_configuration # Checked against the budget when the loop was started
+        self.operations = operations
+        self.iterations = iterations
+        self.max_pending = max_pending
+        self.stop_requested = threading.Event()
+        self.aborted = False # Set by stop(abort=True): the recording capture is stopped and nothing more is exported
+        self.recording = None # Capture being waited for, guarded by stats_lock
+        self.pending_slots = threading.BoundedSemaphore(max_pending)
+        self.stats_lock = threading.Lock()
+        self.captures_started = 0
+        self.captures_completed = 0
+        self.pending = 0
+        self.failures = 0
+        self.last_error = None
+        self.loop_error = None
+        self.start_time = time.perf_counter()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_pending)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, abort=False):
+        """
+        Asks the loop to stop after the capture that is recording. With abort the recording capture is stopped
+        right away and closed without its exports, and the exports still pending skip their remaining operations.
+        """
+        self.stop_requested.set()
+        if abort:
+            with self.stats_lock:
+                self.aborted = True
+                recording = self.recording
+            if recording is not None:
+                try:
+                    _automation_call('capture.stop', recording.stop)
+                except Exception:
+                    pass # The wait still ends at its deadline
+
+    def _run(self):
+        device_configuration = self.device_configuration
+        with self.session.lock:
+            capture_configuration = self.session.capture_configuration
+
+        iteration = 0
+        try:
+            while self.iterations <= 0 or iteration < self.iterations:
+                # Blocks while max_pending captures are still recording or exporting
+                self.pending_slots.acquire()
+                if self.stop_requested.is_set():
+                    self.pending_slots.release()
+                    break
+                try:
+                    temp_capture = _automation_call('manager.start_capture', self.session.manager.start_capture,
+                        device_id=self.device_id,
+                        device_configuration=device_configuration,
+                        capture_configuration=capture_configuration)
+                except Exception as e:
+                    self.pending_slots.release()
+                    self.loop_error = f"-1 ERROR An error occurred while starting capture {iteration}: {e}"
+                    break
+
+                with self.stats_lock:
+                    self.captures_started += 1
+                    self.pending += 1
+                    self.recording = temp_capture
+                    aborted = self.aborted
+                if aborted:
+                    # stop(abort=True) came before the capture was recorded here
+                    try:
+                        _automation_call('capture.stop', temp_capture.stop)
+                    except Exception:
+                        pass
+                try:
+                    _wait_for_capture(temp_capture, capture_configuration)
+                except TimeoutError as e:
+                    # Already stopped and closed, there is nothing left to export
+                    self.loop_error = f"-1 ERROR Capture {iteration} timed out: {e}"
+                    with self.stats_lock:
+                        self.failures += 1
+                        self.pending -= 1
+                    self.pending_slots.release()
+                    break
+                except Exception as e:
+                    if not self.aborted:
+                        self.loop_error = f"-1 ERROR An error occurred while waiting for capture {iteration}: {e}"
+                    self.executor.submit(self._export_and_close, iteration, temp_capture, [])
+                    break
+                finally:
+                    with self.stats_lock:
+                        self.recording = None
+                if self.aborted:
+                    self.executor.submit(self._export_and_close, iteration, temp_capture, [])
+                    break
+                self.executor.submit(self._export_and_close, iteration, temp_capture, self.operations)
+                iteration += 1
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def _export_and_close(self, iteration, temp_capture, operations):
+        # The operations run against a private session holding just this capture, so they
+        # cannot touch the capture that is recording meanwhile
+        capture_session = Session(self.session.manager)
+        capture_session.set_capture(temp_capture)
+        capture_session_handle = registry.add(capture_session)
+        try:
+            for operation in _substitute_iteration(operations, iteration):
+                if self.aborted:
+                    break
+                step = _run_operation(LOOP_OPERATIONS, operation, capture_session_handle)
+                if not step['ok']:
+                    with self.stats_lock:
+                        self.failures += 1
+                        self.last_error = f"Iteration {iteration} {step['op']}: {step['result']}"
+            _automation_call('capture.close', temp_capture.close)
+            with self.stats_lock:
+                self.captures_completed += 1
+        except Exception as e:
+            with self.stats_lock:
+                self.failures += 1
+                self.last_error = f"Iteration {iteration}: {e}"
+        finally:
+            registry.remove(capture_session_handle)
+            _forget_analyzers(capture_session)
+            with self.stats_lock:
+                self.pending -= 1
+            self.pending_slots.release()
+
+    def status(self):
+        """
+        Returns the loop counters as a dict.
+        """
+        if self.thread.is_alive():
+            state = "STOPPING" if self.stop_requested.is_set() else "RUNNING"
+        elif self.loop_error is not None:
+            state = "ERROR"
+        else:
+            state = "STOPPED" if self.stop_requested.is_set() else "COMPLETE"
+        elapsed_seconds = time.perf_counter() - self.start_time
+        with self.stats_lock:
+            return {
+                'state': state,
+                'captures_started': self.captures_started,
+                'captures_completed': self.captures_completed,
+                'pending': self.pending,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'loop_error': self.loop_error,
+                'elapsed_seconds': elapsed_seconds,
+                'captures_per_hour': self.captures_completed * 3600.0 / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+            }
+
+
+class BatchJob:
+    """
+    Reprocesses saved .sal captures in the background: every capture is loaded with manager.load_capture(),
+    the operations run on it through a private session, and it is closed again.
+
+    Captures are spread over a pool of threads with captures_per_instance slots per Logic 2 instance, handed
+    out through a queue so each instance never has more than that many captures loaded at once. The outcome
+    and timing of every capture is written to the manifest as soon as it finishes, and captures already marked
+    done there are skipped, so a stopped or crashed batch resumes where it left off.
+    """
+
+    HANDLE_NAME = 'Batch'
+
+    def __init__(self, capture_paths, operations, manifest_path, pool_keys, captures_per_instance):
+        self.capture_paths = capture_paths
+        self.operations = operations
+        self.manifest_path = manifest_path
+        self.pool_keys = pool_keys
+        self.stop_requested = threading.Event()
+        self.stats_lock = threading.Lock()
+        self.manifest = self._read_manifest()
+        self.skipped = sum(1 for path in capture_paths if self.manifest['captures'].get(path, {}).get('status') == 'done')
+        self.completed = 0
+        self.failures = 0
+        self.running = 0
+        self.last_error = None
+        self.start_time = time.perf_counter()
+        self.slots = queue.Queue()
+        for pool_key in pool_keys:
+            for _ in range(captures_per_instance):
+                self.slots.put(pool_key)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.slots.qsize())
+        self.thread = threading.Thread(target=self._run, name='Logic2Batch', daemon=True)
+        self.thread.start()
+
+    def _read_manifest(self):
+        if os.path.isfile(self.manifest_path):
+            with open(self.manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get('version') == BATCH_MANIFEST_VERSION:
+                return manifest
+        return {'version': BATCH_MANIFEST_VERSION, 'captures': {}}
+
+    def _write_manifest(self):
+        # Called with stats_lock held. Replaced in one step so a crash never leaves a truncated manifest behind
+        temporary_path = self.manifest_path + '.tmp'
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=1)
+        os.replace(temporary_path, self.manifest_path)
+
+    def _run(self):
+        try:
+            futures = [self.executor.submit(self._reprocess, index, path) for index, path in enumerate(self.capture_paths)
+                       if self.manifest['captures'].get(path, {}).get('status') != 'done']
+            concurrent.futures.wait(futures)
+        finally:
+            self.executor.shutdown(wait=True)
+            for pool_key in self.pool_keys:
+                connection_pool.release(pool_key)
+
+    def _reprocess(self, index, capture_path):
+        pool_key = self.slots.get()
+        if self.stop_requested.is_set():
+            self.slots.put(pool_key)
+            return
+        with self.stats_lock:
+            self.running += 1
+        entry = {'status': 'failed', 'instance': f"{pool_key[0]}:{pool_key[1]}", 'steps': []}
+        capture_start = time.perf_counter()
+        capture_session = Session(None, pool_key)
+        capture_session_handle = registry.add(capture_session)
+        try:
+            capture_session.set_capture(_automation_call('manager.load_capture', capture_session.manager.load_capture, capture_path))
+            entry['load_seconds'] = time.perf_counter() - capture_start
+            name = os.path.splitext(os.path.basename(capture_path))[0]
+            for operation in _substitute_placeholders(self.operations, {'{name}': name, '{index}': str(index)}):
+                step = _run_operation(LOOP_OPERATIONS, operation, capture_session_handle)
+                entry['steps'].append({'op': step['op'], 'ok': step['ok'], 'seconds': step['seconds']})
+                if not step['ok']:
+                    entry['error'] = f"{step['op']}: {step['result']}"
+                    break
+            else:
+                entry['status'] = 'done'
+        except Exception as e:
+            entry['error'] = f"{e}"
+        finally:
+            registry.remove(capture_session_handle)
+            _forget_analyzers(capture_session)
+            if capture_session.capture is not None:
+                try:
+                    _automation_call('capture.close', capture_session.capture.close)
+                except Exception:
+                    pass # The capture is dropped either way
+            self.slots.put(pool_key)
+            entry['seconds'] = time.perf_counter() - capture_start
+            with self.stats_lock:
+                self.running -= 1
+                if entry['status'] == 'done':
+                    self.completed += 1
+                else:
+                    self.failures += 1
+                    self.last_error = f"{capture_path}: {entry.get('error')}"
+                self.manifest['captures'][capture_path] = entry
+                try:
+                    self._write_manifest()
+                except Exception as e:
+                    self.last_error = f"Could not write the manifest: {e}"
+
+    def status(self):
+        """
+        Returns the batch counters as a dict.
+        """
+        if self.thread.is_alive():
+            state = "STOPPING" if self.stop_requested.is_set() else "RUNNING"
+        else:
+            state = "STOPPED" if self.stop_requested.is_set() else "COMPLETE"
+        elapsed_seconds = time.perf_counter() - self.start_time
+        with self.stats_lock:
+            processed = self.completed + self.failures
+            return {
+                'state': state,
+                'captures_total': len(self.capture_paths),
+                'captures_skipped': self.skipped,
+                'captures_completed': self.completed,
+                'failures': self.failures,
+                'running': self.running,
+                'remaining': len(self.capture_paths) - self.skipped - processed,
+                'last_error': self.last_error,
+                'elapsed_seconds': elapsed_seconds,
+                'captures_per_hour': processed * 3600.0 / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+                'manifest_path': self.manifest_path,
+            }
+
+
+class Analyzer:
+    """
+    An analyzer added by add_analyzer() to the capture that was active in its session at the time.
+    """
+
+    HANDLE_NAME = 'Analyzer'
+
+    def __init__(self, session, capture, analyzer_handle, name, label):
+        self.session = session
+        self.capture = capture
+        self.analyzer_handle = analyzer_handle
+        self.name = name
+        self.label = label
+
+
+def _forget_analyzers(session, keep_capture=None):
+    """
+    Releases the handles of the session's analyzers, except those on keep_capture.
+    """
+    for handle, analyzer in registry.items(Analyzer):
+        if analyzer.session is session and (keep_capture is None or analyzer.capture is not keep_capture):
+            registry.remove(handle)
+
+
+class RawDataReader:
+    """
+    Reads an exported digital.csv or analog.csv a fixed number of rows at a time, so memory use stays
+    bounded no matter how long the capture was.
+
+    In 'rows' mode every chunk holds the rows as they are in the file. In 'transitions' mode (digital.csv only)
+    every chunk holds the per-channel transitions found in its rows, continuing from the previous chunk.
+    """
+
+    HANDLE_NAME = 'Reader'
+
+    def __init__(self, csv_path, chunk_rows, mode, sample_rate):
+        _require_numpy()
+        if mode not in ('rows', 'transitions'):
+            raise ValueError(f"Unknown reader mode: {mode}")
+        self.csv_file = open(csv_path, 'r')
+        self.channels = _channel_numbers(self.csv_file.readline().rstrip('\r\n').split(',')[1:])
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.previous_states = None
+        self.rows_read = 0
+        self.lock = threading.Lock()
+
+    def next_chunk(self):
+        """
+        Returns the next (times, samples) block of rows, or None at the end of the file.
+        """
+        lines = list(itertools.islice(self.csv_file, self.chunk_rows))
+        if not lines:
+            return None
+        data = np.loadtxt(lines, delimiter=',', dtype=np.float64, ndmin=2)
+        self.rows_read += data.shape[0]
+        return data[:, 0], data[:, 1:]
+
+    def close(self):
+        self.csv_file.close()
+
+
+class AnalyzerTable:
+    """
+    An exported analyzer data table loaded once into NumPy arrays for repeated queries.
+
+    The frames are sorted by start time, so a time range is found with two binary searches. Frames between an
+    'enable' (or 'start') frame and the following 'disable' (or 'stop') frame share a transaction number,
+    frames outside any transaction get -1. Numeric data columns (MOSI, MISO, data, address, ...) are held as int64,
+    -1 where a frame has no value.
+    """
+
+    HANDLE_NAME = 'Analyzer table'
+
+    def __init__(self, csv_path):
+        _require_numpy()
+        frames = _read_data_table(csv_path)
+        for name in ('type', 'start_time', 'duration'):
+            if name not in frames.dtype.names:
+                raise ValueError(f"{csv_path} has no '{name}' column, it is not an analyzer data table")
+        frames = frames[np.argsort(frames['start_time'], kind='stable')]
+        self.start_times = frames['start_time'].astype(np.float64)
+        self.durations = np.nan_to_num(frames['duration'].astype(np.float64))
+        self.type_names, self.type_codes = np.unique(frames['type'].astype(str), return_inverse=True)
+        self.type_codes = self.type_codes.astype(np.uint8)
+
+        self.value_columns = [name for name in frames.dtype.names
+                              if name not in ('name', 'type', 'start_time', 'duration') and frames.dtype[name].kind in 'if']
+        self.values = np.full((frames.size, len(self.value_columns)), -1, dtype=np.int64)
+        for index, name in enumerate(self.value_columns):
+            column = frames[name]
+            present = column >= 0 if column.dtype.kind == 'i' else ~np.isnan(column)
+            self.values[present, index] = column[present].astype(np.int64)
+
+        type_names = np.char.lower(self.type_names.astype(str))
+        starts = np.isin(self.type_codes, np.flatnonzero(np.isin(type_names, ('enable', 'start'))))
+        ends = np.isin(self.type_codes, np.flatnonzero(np.isin(type_names, ('disable', 'stop'))))
+        # A row is inside a transaction when the last start at or before it is later than the last end before it.
+        # An end frame still belongs to the transaction it closes, ends without a start (a capture that begins with
+        # Enable asserted, or a trimmed trigger capture) are left out, and a transaction still open at the end of
+        # the data runs to the last row. A start while a transaction is open begins the next one.
+        rows = np.arange(frames.size)
+        last_start = np.maximum.accumulate(np.where(starts, rows, -1)) if frames.size else rows
+        last_end = np.maximum.accumulate(np.where(ends, rows, -1)) if frames.size else rows
+        last_end_before = np.concatenate(([-1], last_end[:-1])) if frames.size else rows
+        inside = (last_start >= 0) & (last_start > last_end_before)
+        self.transactions = np.where(inside, np.cumsum(starts) - 1, -1).astype(np.int64)
+        self.transaction_ids, self.transaction_first, self.transaction_counts = np.unique(
+            self.transactions[self.transactions >= 0], return_index=True, return_counts=True)
+        self.transaction_first += np.flatnonzero(self.transactions >= 0)[0] if self.transaction_ids.size else 0
+        self.lock = threading.Lock()
+
+    def frame_range(self, t0, t1, transaction=-1):
+        """
+        Returns the (first, stop) row slice of the frames starting in [t0, t1), t1 < 0 meaning the end of the table,
+        restricted to one transaction when transaction >= 0.
+        """
+        first = int(np.searchsorted(self.start_times, t0, side='left'))
+        stop = self.start_times.size if t1 < 0 else int(np.searchsorted(self.start_times, t1, side='left'))
+        if transaction >= 0:
+            position = int(np.searchsorted(self.transaction_ids, transaction))
+            if position >= self.transaction_ids.size or self.transaction_ids[position] != transaction:
+                return 0, 0
+            # The rows of one transaction are contiguous because the frames are in time order
+            first = max(first, int(self.transaction_first[position]))
+            stop = min(stop, int(self.transaction_first[position] + self.transaction_counts[position]))
+        return first, max(first, stop)
+
+    def statistics(self):
+        """
+        Returns frame counts, rates, per-column value histograms, gap and transaction statistics as a dict.
+        """
+        data_frames = (self.values >= 0).any(axis=1) if self.value_columns else np.ones(self.start_times.size, dtype=bool)
+        data_starts = self.start_times[data_frames]
+        data_ends = data_starts + self.durations[data_frames]
+        span = float(data_ends.max() - data_starts.min()) if data_starts.size else 0.0
+        gaps = data_starts[1:] - data_ends[:-1]
+
+        def distribution(values):
+            if values.size == 0:
+                return {'count': 0}
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {'count': int(values.size), 'min': float(values.min()), 'mean': float(values.mean()),
+                    'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max())}
+
+        histograms = {}
+        for index, name in enumerate(self.value_columns):
+            column = self.values[:, index]
+            column = column[column >= 0]
+            histograms[name] = {
+                'byte_counts': np.bincount(column[column < 256], minlength=256).tolist(),
+                'above_255': int((column >= 256).sum()),
+            }
+
+        transaction_durations = np.empty(0)
+        if self.transaction_ids.size:
+            last = self.transaction_first + self.transaction_counts - 1
+            transaction_durations = (self.start_times[last] + self.durations[last]) - self.start_times[self.transaction_first]
+
+        return {
+            'frames': int(self.start_times.size),
+            'data_frames': int(data_starts.size),
+            'frame_types': {str(name): int(count) for name, count in zip(self.type_names, np.bincount(self.type_codes, minlength=len(self.type_names)))},
+            'first_time': float(self.start_times[0]) if self.start_times.size else None,
+            'last_time': float(self.start_times[-1]) if self.start_times.size else None,
+            'data_frames_per_second': data_starts.size / span if span > 0 else 0.0,
+            'value_histograms': histograms,
+            'gap_seconds': distribution(gaps),
+            'transactions': int(self.transaction_ids.size),
+            'frames_per_transaction': distribution(self.transaction_counts.astype(np.float64)),
+            'transaction_seconds': distribution(transaction_durations),
+        }
+
+
+class TransitionIndex:
+    """
+    The transition times of every digital channel of an export, sorted, so the state of a channel at any time,
+    its edges in a time range and the pulse around a time are found by binary search instead of a file scan.
+
+    Only the times are stored: a digital channel toggles at every transition, so its state after the k-th
+    transition follows from its initial state. The index is kept next to the export (see _transition_index_path())
+    and reused until the export changes.
+    """
+
+    HANDLE_NAME = 'Transition index'
+    VERSION = 1
+
+    def __init__(self, channels, initial_states, offsets, times, begin_time, end_time):
+        self.channels = [int(channel) for channel in channels]
+        self.initial_states = np.asarray(initial_states, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64) # Transitions of channel position c are times[offsets[c]:offsets[c + 1]]
+        self.times = np.asarray(times, dtype=np.float64)
+        self.begin_time = float(begin_time)
+        self.end_time = float(end_time)
+
+    def channel_times(self, channel):
+        """
+        Returns (initial state, sorted transition times) of a channel number.
+        """
+        if channel not in self.channels:
+            raise ValueError(f"Channel {channel} is not in the index, it has channels {self.channels}")
+        position = self.channels.index(channel)
+        return int(self.initial_states[position]), self.times[self.offsets[position]:self.offsets[position + 1]]
+
+    def state_at(self, channel, time_seconds):
+        initial_state, times = self.channel_times(channel)
+        return initial_state ^ (int(np.searchsorted(times, time_seconds, side='right')) & 1)
+
+    def edges(self, channel, t0, t1):
+        """
+        Returns the times of the transitions in [t0, t1) and the state after each of them.
+        """
+        initial_state, times = self.channel_times(channel)
+        first, stop = np.searchsorted(times, [t0, t1], side='left')
+        return times[first:stop], (initial_state ^ ((np.arange(first, stop) + 1) & 1)).astype(np.uint8)
+
+    def pulse_at(self, channel, time_seconds):
+        """
+        Returns (state, start, end) of the level the channel holds at time_seconds. The capture begin and end
+        stand in for the edges before the first and after the last transition.
+        """
+        initial_state, times = self.channel_times(channel)
+        count = int(np.searchsorted(times, time_seconds, side='right'))
+        start = float(times[count - 1]) if count > 0 else self.begin_time
+        end = float(times[count]) if count < times.size else self.end_time
+        return initial_state ^ (count & 1), start, end
+
+    def save(self, index_path, source_signature):
+        temporary_path = index_path + '.tmp.npz'
+        np.savez(temporary_path, version=self.VERSION, channels=np.asarray(self.channels, dtype=np.int64),
+                 initial_states=self.initial_states, offsets=self.offsets, times=self.times,
+                 span=np.asarray([self.begin_time, self.end_time]), source_signature=np.asarray(source_signature, dtype=np.float64))
+        os.replace(temporary_path, index_path) # A reader never sees a half written index
+
+    @classmethod
+    def load(cls, index_path, source_signature):
+        """
+        Returns the index stored at index_path, or None if there is none or it was built from a different export.
+        """
+        if not os.path.isfile(index_path):
+            return None
+        with np.load(index_path) as stored:
+            if int(stored['version']) != cls.VERSION or not np.array_equal(stored['source_signature'], np.asarray(source_signature, dtype=np.float64)):
+                return None
+            return cls(stored['channels'], stored['initial_states'], stored['offsets'], stored['times'], *stored['span'])
+
+
+class MeasurementAccumulator:
+    """
+    Running count, mean, standard deviation, minimum and maximum of every measurement of every channel over
+    many captures (Welford's algorithm), so long-run statistics need no raw data kept.
+    """
+
+    HANDLE_NAME = 'Measurement accumulator'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.captures = 0
+        self.channels = {} # channel -> (count, mean, m2, minimum, maximum), each an array with one entry per measurement
+
+    def add(self, channels, values):
+        """
+        Adds one capture's measurement table (one row per channel, NaN where a measurement does not apply).
+        """
+        with self.lock:
+            self.captures += 1
+            for channel, row in zip(channels, values):
+                if channel not in self.channels:
+                    size = len(row)
+                    self.channels[channel] = (np.zeros(size), np.zeros(size), np.zeros(size), np.full(size, np.inf), np.full(size, -np.inf))
+                count, mean, m2, minimum, maximum = self.channels[channel]
+                present = ~np.isnan(row)
+                count[present] += 1
+                delta = np.where(present, row - mean, 0.0)
+                mean += np.where(present, delta / np.maximum(count, 1), 0.0)
+                m2 += np.where(present, delta * (row - mean), 0.0)
+                np.fmin(minimum, row, out=minimum)
+                np.fmax(maximum, row, out=maximum)
+
+    def summary(self):
+        """
+        Returns {statistic: (channels, table)} for 'count', 'mean', 'std', 'min' and 'max', NaN where no capture had a value.
+        """
+        with self.lock:
+            channels = sorted(self.channels)
+            rows = [self.channels[channel] for channel in channels]
+        def table(function):
+            if not rows:
+                return np.empty((0, 0)) # Nothing measured yet, reshape() cannot infer the row length
+            return np.array([function(*row) for row in rows]).reshape(len(rows), -1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'count': (channels, table(lambda count, mean, m2, minimum, maximum: count)),
+                'mean': (channels, table(lambda count, mean, m2, minimum, maximum: np.where(count > 0, mean, np.nan))),
+                'std': (channels, table(lambda count, mean, m2, minimum, maximum: np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan))),
+                'min': (channels, table(lambda count, mean, m2, minimum, maximum: np.where(np.isfinite(minimum), minimum, np.nan))),
+                'max': (channels, table(lambda count, mean, m2, minimum, maximum: np.where(np.isfinite(maximum), maximum, np.nan))),
+            }
+
+
+class ArchiveJob:
+    """
+    Converts exported CSV files into a compressed archive in a background thread, one file at a time and
+    chunk_rows rows at a time, so neither the capture loop nor memory is held up by large exports.
+    """
+
+    HANDLE_NAME = 'Archive job'
+
+    def __init__(self, csv_paths, archive_dir, delete_sources, chunk_rows):
+        self.csv_paths = csv_paths
+        self.archive_dir = archive_dir
+        self.delete_sources = delete_sources
+        self.chunk_rows = chunk_rows
+        self.lock = threading.Lock()
+        self.files_done = 0
+        self.current = ''
+        self.source_bytes = 0
+        self.archive_bytes = 0
+        self.error = None
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.thread = threading.Thread(target=self._run, name='Logic2Archive', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for csv_path in self.csv_paths:
+                with self.lock:
+                    self.current = csv_path
+                table = _archive_csv(csv_path, self.archive_dir, self.chunk_rows)
+                if self.delete_sources:
+                    os.remove(csv_path) # Only once its table is in the archive manifest
+                with self.lock:
+                    self.files_done += 1
+                    self.source_bytes += table['source_bytes']
+                    self.archive_bytes += table['archive_bytes']
+        except Exception as e:
+            with self.lock:
+                self.error = f"{self.current}: {e}"
+        finally:
+            with self.lock:
+                self.current = ''
+                self.end_time = time.perf_counter()
+
+    def status(self):
+        with self.lock:
+            if self.thread.is_alive():
+                state = 'RUNNING'
+            else:
+                state = 'ERROR' if self.error is not None else 'COMPLETE'
+            return {
+                'state': state,
+                'files_done': self.files_done,
+                'files_total': len(self.csv_paths),
+                'current': self.current,
+                'source_bytes': self.source_bytes,
+                'archive_bytes': self.archive_bytes,
+                'compression_ratio': self.source_bytes / self.archive_bytes if self.archive_bytes else 0.0,
+                'seconds': (self.end_time or time.perf_counter()) - self.start_time,
+                'error': self.error,
+            }
+
+
+class WorkerClient:
+    """
+    Connection to a worker process started with start_worker() (or by running this file with --serve).
+
+    The worker owns the automation.Manager and all sessions, so long gRPC calls block only the caller
+    that made them, and the connection to Logic 2 stays warm between LabVIEW runs.
+    """
+
+    HANDLE_NAME = 'Worker'
+
+    def __init__(self, port, authkey):
+        self.port = port
+        self.authkey = authkey
+        self.connection = Client((WORKER_ADDRESS, port), authkey=authkey)
+        self.lock = threading.Lock()
+
+    def call(self, function_name, *args, **kwargs):
+        """
+        Runs function_name(*args, **kwargs) in the worker and returns its result.
+        """
+        with self.lock:
+            self.connection.send((function_name, args, kwargs))
+            return self.connection.recv()
+
+    def close(self):
+        self.connection.close()
+
+
+registry = HandleRegistry() # Global registry of sessions, capture jobs, capture loops, analyzers, readers and worker connections
+shared_blocks = {} # Global table of shared memory blocks handed out by the share_* functions, keyed by block name
+shared_blocks_lock = threading.Lock() # Guards shared_blocks
+device_cache_ttl_seconds = DEVICE_CACHE_TTL_SECONDS # Set with configure_device_cache()
+device_refresher = None # (thread, stop event) of the background device list refresher, see configure_device_cache()
+connection_pool = ConnectionPool() # Global pool of Logic 2 connections shared by all sessions
+call_deadlines = dict(DEFAULT_CALL_DEADLINES) # Set with configure_call_deadlines()
+default_call_deadline = None # Deadline of the automation calls not in call_deadlines, set with configure_call_deadlines()
+call_retries = CALL_RETRIES # Set with configure_call_deadlines()
+call_backoff_seconds = CALL_BACKOFF_SECONDS # Set with configure_call_deadlines()
+deadline_misses = collections.deque(maxlen=DEADLINE_REPORT_WINDOW) # Recent deadline misses, see get_deadline_report()
+
+
+@_instrumented
+def open_connection(ip_address, selected_port, session_handle=DEFAULT_SESSION):
+    """
+    Opens a connection to the Logic 2 application.
+
+    Args:
+        ip_address (str): IP Address for the connection.
+        selected_port (int): Port number for the connection.
+        session_handle (int): Session to (re)connect, defaults to the default session used by the subVIs.
+    """
+    previous = registry.get(session_handle)
+    if previous is not None and not isinstance(previous, Session):
+        return f"-1 ERROR Handle {session_handle} is not a session."
+    try:
+        pool_key = connection_pool.acquire(ip_address, selected_port)
+        # Additional initialization steps can be added here
+    except Exception as e:
+        return f"-1 ERROR An error occurred while opening the connection: {e}"
+    if previous is not None:
+        # Reconnecting replaces the session, so its captures would otherwise stay open in Logic 2
+        _close_session_captures(previous)
+    registry.add(Session(None, pool_key), session_handle)
+    if previous is not None:
+        try:
+            _release_session_connection(previous)
+        except Exception:
+            pass # The new session is in place, a connection that fails to close is abandoned
+    return 'Connection Successful'
+
+
+@_instrumented
+def open_session(ip_address, selected_port):
+    """
+    Opens an additional session on the Logic 2 application and returns its session handle. Sessions on the same
+    address and port share one pooled connection. Pass the handle as the last argument of the other functions
+    to work on this session.
+
+    Args:
+        ip_address (str): IP Address for the connection.
+        selected_port (int): Port number for the connection.
+
+    Returns:
+        str: The session handle as a decimal string, or a '-1 ERROR' string.
+    """
+    try:
+        pool_key = connection_pool.acquire(ip_address, selected_port)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while opening the connection: {e}"
+    return f"{registry.add(Session(None, pool_key))}"
+
+
+@_instrumented
+def device_config(enabled_digital_channels, digital_sample_rate, digital_threshold_volts, enabled_analog_channels, analog_sample_rate, session_handle=DEFAULT_SESSION):
+    """
+    Configures the capturing device using an established connection.
+
+    Args:
+        enable_digital_channels (list): List of digital channels to enable.
+        digital_sample_rate (int): Sampling rate in MSa/s.
+        digital_threshold_volts (float): Logic level threshold in volts, rounded to 1 decimal place.
+        session_handle (int): Session to configure.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        # Device configuration
+        with session.lock:
+            session.device_configuration = automation.LogicDeviceConfiguration(
+                enabled_analog_channels = enabled_analog_channels,
+                enabled_digital_channels = enabled_digital_channels,
+                analog_sample_rate = analog_sample_rate,
+                digital_sample_rate = digital_sample_rate,
+                digital_threshold_volts=round(digital_threshold_volts, 1),
+            )
+
+    except Exception as e:
+        return f"-1 ERROR An error occurred while configuring the device: {e}"
+    return 'Device Configuration Successful'
+
+
+@_instrumented
+def capture_duration_config(capture_duration, session_handle=DEFAULT_SESSION):
+    """
+    Configures the capture, in this example it is a capture of finite duration in seconds.
+
+    Args:
+        capture_duration (float): Duration of the capture in seconds.
+        session_handle (int): Session to configure.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        # Record N seconds of data before stopping the capture
+        with session.lock:
+            session.capture_configuration = automation.CaptureConfiguration(
+            capture_mode=automation.TimedCaptureMode(duration_seconds=capture_duration)
+            )
+
+    except Exception as e:
+        return f"-1 ERROR An error occurred while configuring the capture: {e}"
+    return 'Capture Configured Successfully'
+
+
+def _is_manual_capture(capture_configuration):
+    """
+    True if capture_configuration records until stop_capture() instead of ending by itself.
+    """
+    return capture_configuration is not None and isinstance(capture_configuration.capture_mode, automation.ManualCaptureMode)
+
+
+def _optional(value):
+    """
+    LabVIEW cannot wire None, so 0 (or less) stands for 'not set' in the capture configuration inputs.
+    """
+    return value if value > 0 else None
+
+
+@_instrumented
+def digital_trigger_capture_config(trigger_type, trigger_channel, pre_trigger_seconds, post_trigger_seconds,
+                                   min_pulse_width_seconds, max_pulse_width_seconds, linked_channels, linked_channel_states,
+                                   buffer_size_megabytes, session_handle=DEFAULT_SESSION):
+    """
+    Configures the capture to wait for a digital trigger and keep only the data around it, so the capture,
+    and everything exported from it, is limited to the window of interest.
+
+    Args:
+        trigger_type (str): 'RISING', 'FALLING', 'PULSE_HIGH' or 'PULSE_LOW'.
+        trigger_channel (int): Digital channel the trigger is on.
+        pre_trigger_seconds (float): Data kept before the trigger. A negative value keeps everything since the capture started.
+        post_trigger_seconds (float): Time the capture continues after the trigger.
+        min_pulse_width_seconds (float): Shortest pulse that triggers, pulse triggers only. 0 for no limit.
+        max_pulse_width_seconds (float): Longest pulse that triggers, pulse triggers only. 0 for no limit.
+        linked_channels (list): Channels that must also be in a given state when the trigger fires, can be empty.
+        linked_channel_states (list): 'HIGH'/'LOW' (or 1/0) for each linked channel.
+        buffer_size_megabytes (int): Capture buffer size in Logic 2, 0 for the application default.
+        session_handle (int): Session to configure.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        if len(linked_channels) != len(linked_channel_states):
+            raise ValueError("linked_channels and linked_channel_states must have the same length")
+        trigger_name = str(trigger_type).strip().upper()
+        if trigger_name not in automation.DigitalTriggerType.__members__:
+            raise ValueError(f"Unknown trigger type '{trigger_type}', expected one of {', '.join(automation.DigitalTriggerType.__members__)}")
+        trigger = automation.DigitalTriggerType[trigger_name]
+        pulse = trigger in (automation.DigitalTriggerType.PULSE_HIGH, automation.DigitalTriggerType.PULSE_LOW)
+        linked = [
+            automation.DigitalTriggerLinkedChannel(
+                channel_index=int(channel),
+                state=automation.DigitalTriggerLinkedChannelState[state.strip().upper()] if isinstance(state, str)
+                else (automation.DigitalTriggerLinkedChannelState.HIGH if state else automation.DigitalTriggerLinkedChannelState.LOW))
+            for channel, state in zip(linked_channels, linked_channel_states)
+        ]
+        with session.lock:
+            session.capture_configuration = automation.CaptureConfiguration(
+                buffer_size_megabytes=_optional(int(buffer_size_megabytes)),
+                capture_mode=automation.DigitalTriggerCaptureMode(
+                    trigger_type=trigger,
+                    trigger_channel_index=int(trigger_channel),
+                    min_pulse_width_seconds=_optional(min_pulse_width_seconds) if pulse else None,
+                    max_pulse_width_seconds=_optional(max_pulse_width_seconds) if pulse else None,
+                    linked_channels=linked,
+                    trim_data_seconds=pre_trigger_seconds + post_trigger_seconds if pre_trigger_seconds >= 0 else None,
+                    after_trigger_seconds=post_trigger_seconds)
+            )
+    except Exception as e:
+        return f"-1 ERROR An error occurred while configuring the capture: {e}"
+    return 'Capture Configured Successfully'
+
+
+@_instrumented
+def manual_capture_config(trim_data_seconds, buffer_size_megabytes, session_handle=DEFAULT_SESSION):
+    """
+    Configures the capture to record from start_capture() until stop_capture().
+
+    Args:
+        trim_data_seconds (float): Only the last trim_data_seconds before the stop are kept, 0 keeps everything.
+        buffer_size_megabytes (int): Capture buffer size in Logic 2, 0 for the application default.
+        session_handle (int): Session to configure.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        with session.lock:
+            session.capture_configuration = automation.CaptureConfiguration(
+                buffer_size_megabytes=_optional(int(buffer_size_megabytes)),
+                capture_mode=automation.ManualCaptureMode(trim_data_seconds=_optional(trim_data_seconds))
+            )
+    except Exception as e:
+        return f"-1 ERROR An error occurred while configuring the capture: {e}"
+    return 'Capture Configured Successfully'
+
+
+@_instrumented
+def get_list_of_devices(include_simulation_devices, session_handle=DEFAULT_SESSION):
+    """
+    Returns a list of Saleae devices.
+
+    The list is served from the session's device cache while it is younger than the cache TTL
+    (see configure_device_cache()), otherwise Logic 2 is asked again.
+
+    Args:
+        include_simulation_devices (bool): If True, the return value will also include simulation devices. This can be useful for testing without a physical device
+        session_handle (int): Session to query.
+
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    json_list_of_devices = session.devices.get(include_simulation_devices, device_cache_ttl_seconds)
+    if json_list_of_devices is not None:
+        return json_list_of_devices
+    try:
+        return session.devices.fetch(session.manager, include_simulation_devices)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while retrieving the list of devices: {e}"
+
+
+@_instrumented
+def refresh_devices(include_simulation_devices, session_handle=DEFAULT_SESSION):
+    """
+    Same as get_list_of_devices(), but always asks Logic 2 and updates the cache, for example right after
+    a device was plugged in.
+
+    Args:
+        include_simulation_devices (bool): If True, the return value will also include simulation devices.
+        session_handle (int): Session to query.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    try:
+        return session.devices.fetch(session.manager, include_simulation_devices)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while retrieving the list of devices: {e}"
+
+
+def _refresh_device_caches(stop_event, interval_seconds):
+    """
+    Body of the background refresher: re-queries every device list held in a session cache each interval_seconds.
+    """
+    while not stop_event.wait(interval_seconds):
+        for _, session in registry.items(Session):
+            for include_simulation_devices in session.devices.cached_keys():
+                try:
+                    session.devices.fetch(session.manager, include_simulation_devices)
+                except Exception:
+                    pass # fetch() already dropped the stale entries, the next get_list_of_devices() reports the error
+
+
+@_instrumented
+def configure_device_cache(ttl_seconds, refresh_interval_seconds):
+    """
+    Sets how long device lists are cached and starts or stops the background refresher.
+
+    Args:
+        ttl_seconds (float): Age after which get_list_of_devices() queries Logic 2 again. 0 disables the cache.
+        refresh_interval_seconds (float): Period of the background refresh of all cached device lists, so lookups
+            stay current without waiting on Logic 2. 0 or less stops the refresher.
+    """
+    global device_cache_ttl_seconds, device_refresher
+    if device_refresher is not None:
+        thread, stop_event = device_refresher
+        stop_event.set()
+        thread.join()
+        device_refresher = None
+    device_cache_ttl_seconds = max(0.0, float(ttl_seconds))
+    if refresh_interval_seconds > 0:
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_refresh_device_caches, args=(stop_event, float(refresh_interval_seconds)),
+                                  name='Logic2DeviceRefresher', daemon=True)
+        thread.start()
+        device_refresher = (thread, stop_event)
+        return f"Device cache TTL {device_cache_ttl_seconds} s, refreshed every {refresh_interval_seconds} s"
+    return f"Device cache TTL {device_cache_ttl_seconds} s, background refresh off"
+
+
+@_instrumented
+def warm_up(ip_address, selected_port, include_simulation_devices, session_handle=DEFAULT_SESSION):
+    """
+    Pays the one-time costs of a test run in advance, typically while the operator is still setting up:
+    imports the Saleae automation API (and NumPy when installed), connects the session if it is not
+    connected yet, checks that Logic 2 answers, and enumerates the devices.
+
+    Args:
+        ip_address (str): IP Address for the connection.
+        selected_port (int): Port number for the connection.
+        include_simulation_devices (bool): If True, the device list will also include simulation devices.
+        session_handle (int): Session to connect and check, defaults to the default session used by the subVIs.
+
+    Returns:
+        str: JSON object with "status" ("OK" or "ERROR"), "error", "phases" (seconds taken by each completed phase:
+        import_automation, import_numpy, connect, health_check, enumerate_devices), "numpy", "app_version" and "devices".
+    """
+    report = {'status': 'OK', 'error': '', 'phases': {}, 'numpy': False, 'app_version': '', 'devices': []}
+
+    def phase(name, function):
+        start = time.perf_counter()
+        try:
+            return function()
+        finally:
+            report['phases'][name] = time.perf_counter() - start
+
+    def import_numpy():
+        try:
+            _require_numpy()
+            report['numpy'] = True
+        except RuntimeError:
+            pass
+
+    def connect():
+        if registry.get(session_handle, Session) is None:
+            result = open_connection(ip_address, selected_port, session_handle)
+            if result.startswith('-1 ERROR'):
+                raise RuntimeError(result)
+
+    def health_check():
+        return _automation_call('manager.get_app_info', registry.get(session_handle, Session).manager.get_app_info)
+
+    def enumerate_devices():
+        result = get_list_of_devices(include_simulation_devices, session_handle)
+        if result.startswith('-1 ERROR'):
+            raise RuntimeError(result)
+        return json.loads(result)
+
+    try:
+        phase('import_automation', lambda: automation._resolve() if isinstance(automation, _LazyModule) else automation)
+        phase('import_numpy', import_numpy)
+        phase('connect', connect)
+        report['app_version'] = str(phase('health_check', health_check).app_version)
+        report['devices'] = phase('enumerate_devices', enumerate_devices)
+    except Exception as e:
+        report['status'] = 'ERROR'
+        report['error'] = str(e) if str(e).startswith('-1 ERROR') else f"-1 ERROR An error occurred while warming up: {e}"
+    return json.dumps(report)
+
+
+def _capture_seconds(capture_configuration, expected_seconds):
+    """
+    Length of data a capture configuration records, in seconds. Triggered and manual captures have no fixed
+    length, expected_seconds (when above 0) or else their trim length is used. None if nothing bounds it.
+    """
+    capture_mode = capture_configuration.capture_mode if capture_configuration is not None else None
+    if isinstance(capture_mode, automation.TimedCaptureMode):
+        return capture_mode.duration_seconds
+    if expected_seconds > 0:
+        return expected_seconds
+    return getattr(capture_mode, 'trim_data_seconds', None)
+
+
+def _export_throughput(name):
+    """
+    Returns (bytes per second, basis) of an export function, measured by the metrics when they have seen it write data.
+    """
+    entry = metrics.snapshot().get(name) if metrics.enabled else None
+    if entry and entry['bytes_written'] and entry['total_seconds'] > 0:
+        return entry['bytes_written'] / entry['total_seconds'], 'measured'
+    return DEFAULT_EXPORT_BYTES_PER_SECOND, 'default'
+
+
+def _estimate_resources(device_configuration, capture_configuration, exports, expected_seconds, digital_activity):
+    """
+    Estimates the Logic 2 memory a capture needs and the size and duration of its exports, as a dict.
+
+    Digital data is stored as transitions, so its size depends on the signal: digital_activity is the assumed
+    fraction of samples on which a channel changes (1 for a channel toggling on every sample).
+    """
+    if device_configuration is None:
+        raise ValueError("The device is not configured. Call device_config first.")
+    seconds = _capture_seconds(capture_configuration, expected_seconds)
+    buffer_megabytes = getattr(capture_configuration, 'buffer_size_megabytes', None)
+    if seconds is None and not buffer_megabytes:
+        raise ValueError("The capture has no fixed length, pass expected_seconds or set a buffer size.")
+
+    digital_channels = list(device_configuration.enabled_digital_channels or [])
+    analog_channels = list(device_configuration.enabled_analog_channels or [])
+    digital_rate = (device_configuration.digital_sample_rate or 0) if digital_channels else 0
+    analog_rate = (device_configuration.analog_sample_rate or 0) if analog_channels else 0
+    if seconds is None:
+        # Only the buffer bounds it, work out how long the buffer lasts
+        bytes_per_second = (len(digital_channels) * digital_rate * digital_activity * DIGITAL_BYTES_PER_TRANSITION +
+                            len(analog_channels) * analog_rate * ANALOG_BYTES_PER_SAMPLE)
+        seconds = buffer_megabytes * 1e6 / bytes_per_second if bytes_per_second else 0.0
+
+    transitions = len(digital_channels) * digital_rate * seconds * digital_activity
+    analog_rows = analog_rate * seconds
+    digital_bytes = transitions * DIGITAL_BYTES_PER_TRANSITION
+    analog_bytes = analog_rows * len(analog_channels) * ANALOG_BYTES_PER_SAMPLE
+    memory_bytes = digital_bytes + analog_bytes
+    if buffer_megabytes and not isinstance(capture_configuration.capture_mode, automation.TimedCaptureMode):
+        memory_bytes = min(memory_bytes, buffer_megabytes * 1e6) # Triggered and manual captures only keep what fits the buffer
+
+    digital_csv = transitions * (CSV_TIME_BYTES + CSV_DIGITAL_BYTES * len(digital_channels))
+    analog_csv = analog_rows * (CSV_TIME_BYTES + CSV_ANALOG_BYTES * len(analog_channels))
+    export_models = {
+        'export_raw_digital': digital_csv,
+        'export_raw_mixed_signal': digital_csv + analog_csv,
+        'export_raw_digital_binary': digital_bytes,
+        'export_raw_mixed_signal_binary': digital_bytes + analog_bytes,
+        'export_saleae_capture': memory_bytes,
+    }
+    export_estimates = {}
+    for name in exports:
+        if name not in EXPORT_OPERATIONS:
+            raise ValueError(f"Unknown export '{name}', expected one of {', '.join(EXPORT_OPERATIONS)}")
+        entry = metrics.snapshot().get(name) if metrics.enabled else None
+        if name in export_models:
+            export_bytes, size_basis = export_models[name], 'model'
+        elif entry and entry['count']:
+            export_bytes, size_basis = entry['bytes_written'] / entry['count'], 'history' # Analyzer tables depend on the decoded traffic
+        else:
+            export_bytes, size_basis = 0.0, 'unknown'
+        throughput, time_basis = _export_throughput(name)
+        export_estimates[name] = {'bytes': export_bytes, 'size_basis': size_basis,
+                                  'seconds': export_bytes / throughput, 'time_basis': time_basis}
+
+    return {
+        'capture_seconds': seconds,
+        'digital_channels': digital_channels,
+        'digital_sample_rate': digital_rate,
+        'analog_channels': analog_channels,
+        'analog_sample_rate': analog_rate,
+        'digital_transitions': transitions,
+        'analog_samples': analog_rows * len(analog_channels),
+        'memory_bytes': memory_bytes,
+        'exports': export_estimates,
+        'disk_bytes': sum(estimate['bytes'] for estimate in export_estimates.values()),
+        'export_seconds': sum(estimate['seconds'] for estimate in export_estimates.values()),
+    }
+
+
+def _over_budget(budget, estimate):
+    """
+    Returns a description of the limits estimate exceeds, or '' if it fits the budget.
+    """
+    problems = []
+    if budget['max_memory_bytes'] and estimate['memory_bytes'] > budget['max_memory_bytes']:
+        problems.append(f"memory {estimate['memory_bytes'] / 1e6:.1f} MB > {budget['max_memory_bytes'] / 1e6:.1f} MB")
+    if budget['max_disk_bytes'] and estimate['disk_bytes'] > budget['max_disk_bytes']:
+        problems.append(f"exports {estimate['disk_bytes'] / 1e6:.1f} MB > {budget['max_disk_bytes'] / 1e6:.1f} MB")
+    return ', '.join(problems)
+
+
+def _enforce_budget(session):
+    """
+    Checks the session's configuration against its capture budget before a capture starts. With the 'adapt'
+    policy the analog sample rate is stepped down through ANALOG_SAMPLE_RATES, and then analog channels are
+    dropped from the highest one, until the estimate fits. The adapted configuration only applies to the
+    capture being started, session.device_configuration is left as the user set it. Must be called with the
+    session lock held.
+
+    Returns a (error, device_configuration) tuple: error is None if the capture may start, or a '-1 ERROR'
+    string, and device_configuration is the configuration to start the capture with.
+    """
+    budget = session.budget
+    if budget is None or budget['policy'] == 'off':
+        return None, session.device_configuration
+    try:
+        device_configuration = session.device_configuration
+        while True:
+            estimate = _estimate_resources(device_configuration, session.capture_configuration, budget['exports'],
+                                           budget['expected_seconds'], budget['digital_activity'])
+            problems = _over_budget(budget, estimate)
+            if not problems:
+                break
+            analog_channels = list(device_configuration.enabled_analog_channels or [])
+            lower_rates = [rate for rate in ANALOG_SAMPLE_RATES if analog_channels and rate < (device_configuration.analog_sample_rate or 0)]
+            if budget['policy'] != 'adapt' or not analog_channels:
+                return f"-1 ERROR The capture exceeds its budget: {problems}. Reduce the channels, sample rates or duration.", None
+            if lower_rates:
+                device_configuration = dataclasses.replace(device_configuration, analog_sample_rate=lower_rates[0])
+            else:
+                device_configuration = dataclasses.replace(device_configuration, enabled_analog_channels=analog_channels[:-1])
+    except Exception as e:
+        return f"-1 ERROR An error occurred while checking the capture budget: {e}", None
+
+    if device_configuration is not session.device_configuration:
+        budget['last_adaptation'] = {
+            'time': time.time(),
+            'analog_channels': [list(session.device_configuration.enabled_analog_channels), list(device_configuration.enabled_analog_channels)],
+            'analog_sample_rate': [session.device_configuration.analog_sample_rate, device_configuration.analog_sample_rate],
+        }
+    return None, device_configuration
+
+
+@_instrumented
+def estimate_capture_resources(exports, expected_seconds, digital_activity, session_handle=DEFAULT_SESSION):
+    """
+    Estimates the Logic 2 memory, export sizes and export times of the session's device and capture
+    configuration, without starting a capture. Export times use the throughput the metrics have measured
+    for each export when metrics are enabled (see enable_metrics()), a default throughput otherwise.
+
+    Args:
+        exports (list): Names of the export functions that will run on the capture, for example ['export_raw_mixed_signal'].
+        expected_seconds (float): Expected length of triggered and manual captures, 0 to use their trim length or buffer size.
+        digital_activity (float): Assumed fraction of samples on which a digital channel changes, for example 0.01.
+        session_handle (int): Session whose configurations are estimated.
+
+    Returns:
+        str: JSON with "capture_seconds", the channels and rates, "digital_transitions", "analog_samples",
+        "memory_bytes", per export "bytes" and "seconds" in "exports", their sums "disk_bytes" and "export_seconds",
+        plus "budget" (see set_capture_budget()) and its "over_budget" description. A '-1 ERROR' string on failure.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        with session.lock:
+            estimate = _estimate_resources(session.device_configuration, session.capture_configuration,
+                                           list(exports), expected_seconds, digital_activity)
+            estimate['budget'] = session.budget
+            estimate['over_budget'] = _over_budget(session.budget, estimate) if session.budget else ''
+        return json.dumps(estimate)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while estimating the capture resources: {e}"
+
+
+@_instrumented
+def set_capture_budget(max_memory_megabytes, max_disk_megabytes, policy, exports, expected_seconds, digital_activity,
+                       session_handle=DEFAULT_SESSION):
+    """
+    Sets resource limits that start_capture(), start_capture_async() and start_capture_loop() check before
+    asking Logic 2 to capture, using the estimate of estimate_capture_resources().
+
+    Args:
+        max_memory_megabytes (float): Largest estimated Logic 2 memory for one capture, 0 for no limit.
+        max_disk_megabytes (float): Largest estimated total size of the exports of one capture, 0 for no limit.
+        policy (str): 'reject' fails the capture when it is over budget, 'adapt' lowers the analog sample rate and then
+            drops analog channels until it fits (rejecting it if it still does not), 'off' removes the budget.
+        exports (list): Names of the export functions that will run on each capture.
+        expected_seconds (float): Expected length of triggered and manual captures, 0 to use their trim length or buffer size.
+        digital_activity (float): Assumed fraction of samples on which a digital channel changes.
+        session_handle (int): Session the budget applies to.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    policy = str(policy).strip().lower()
+    if policy not in ('reject', 'adapt', 'off'):
+        return f"-1 ERROR Unknown budget policy '{policy}', expected 'reject', 'adapt' or 'off'."
+    unknown = [name for name in exports if name not in EXPORT_OPERATIONS]
+    if unknown:
+        return f"-1 ERROR Unknown exports {unknown}, expected some of {', '.join(EXPORT_OPERATIONS)}."
+    with session.lock:
+        session.budget = None if policy == 'off' else {
+            'max_memory_bytes': max_memory_megabytes * 1e6,
+            'max_disk_bytes': max_disk_megabytes * 1e6,
+            'policy': policy,
+            'exports': list(exports),
+            'expected_seconds': expected_seconds,
+            'digital_activity': digital_activity,
+            'last_adaptation': None,
+        }
+    return 'Capture Budget Set'
+
+
+@_instrumented
+def start_capture(device_id, session_handle=DEFAULT_SESSION):
+    """
+    Starts a capture session using the given configurations.
+
+    Args:
+        device_id (str): ID of the device to capture from.
+        session_handle (int): Session whose device and capture configuration are used.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        with session.lock:
+            budget_error, device_configuration = _enforce_budget(session)
+            if budget_error:
+                return budget_error
+            capture_configuration = session.capture_configuration # The configuration may change once the lock is released
+            temp_capture = _automation_call('manager.start_capture', session.manager.start_capture,
+                device_id=device_id,
+                device_configuration=device_configuration,
+                capture_configuration=capture_configuration)
+
+        if _is_manual_capture(capture_configuration):
+            # Records until stop_capture(), the exports can only run after that
+            _install_capture(session, temp_capture, manual=True)
+            return "Capture started successfully"
+
+        # Wait outside the lock so other calls on this session are not held up by the capture duration
+        _wait_for_capture(temp_capture, capture_configuration)
+        _install_capture(session, temp_capture)
+        return "Capture started successfully"
+    except Exception as e:
+        session.devices.invalidate() # The device may be gone, do not keep offering it from the cache
+        return f"-1 ERROR An error occurred while starting the capture: {e}"
+
+
+@_instrumented
+def start_capture_async(device_id, session_handle=DEFAULT_SESSION):
+    """
+    Starts a capture session and returns immediately with a job handle, instead of blocking until the capture is done.
+    Use poll_capture() or wait_capture() to find out when it is finished, and cancel_capture() to abandon it.
+    A manual capture is complete as soon as it records, it keeps recording until stop_capture().
+
+    Args:
+        device_id (str): ID of the device to capture from.
+        session_handle (int): Session whose device and capture configuration are used.
+
+    Returns:
+        str: The job handle as a decimal string, or a '-1 ERROR' string.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        with session.lock:
+            budget_error, device_configuration = _enforce_budget(session)
+            if budget_error:
+                return budget_error
+            capture_configuration = session.capture_configuration
+            temp_capture = _automation_call('manager.start_capture', session.manager.start_capture,
+                device_id=device_id,
+                device_configuration=device_configuration,
+                capture_configuration=capture_configuration)
+    except Exception as e:
+        session.devices.invalidate() # The device may be gone, do not keep offering it from the cache
+        return f"-1 ERROR An error occurred while starting the capture: {e}"
+
+    manual = _is_manual_capture(capture_configuration)
+    if manual:
+        with session.lock:
+            session.manual_capture = temp_capture
+    return f"{registry.add(CaptureJob(session, temp_capture, manual))}"
+
+
+def _install_capture(session, temp_capture, manual=False):
+    """
+    Makes temp_capture the session's active capture (and with manual its recording manual capture), and closes
+    the captures it replaces together with their analyzers, so Logic 2 does not keep holding their memory.
+    """
+    with session.lock:
+        replaced = [capture for capture in (session.capture, session.manual_capture) if capture is not None and capture is not temp_capture]
+        session.set_capture(temp_capture)
+        session.manual_capture = temp_capture if manual else None
+    _forget_analyzers(session, keep_capture=temp_capture)
+    for capture in dict.fromkeys(replaced): # The active capture is often also the manual one
+        try:
+            _automation_call('capture.close', capture.close)
+        except Exception:
+            pass # The replaced capture is dropped either way
+
+
+def _collect_capture_job(job, job_handle):
+    """
+    Once a capture job has completed, makes it the active capture of its session for the export functions.
+    A job that has reported COMPLETE or an error is finished, so its handle is released; the capture of a
+    failed job is closed (one that missed its deadline already was).
+    Returns the job status string.
+    """
+    job_status = job.status()
+    if job_status == "RUNNING" or registry.remove(job_handle) is not job:
+        return job_status
+    if job_status == "COMPLETE":
+        _install_capture(job.session, job.capture, manual=job.manual and job.session.manual_capture is job.capture)
+    elif not job.timed_out:
+        try:
+            _automation_call('capture.close', job.capture.close)
+        except Exception:
+            pass # The failed capture is dropped either way
+    return job_status
+
+
+@_instrumented
+def poll_capture(job_handle):
+    """
+    Checks a capture started with start_capture_async() without blocking. Once it returns 'COMPLETE' or an error,
+    the job handle is released and the capture is the session's active capture (when complete).
+
+    Args:
+        job_handle (int): Handle returned by start_capture_async().
+
+    Returns:
+        str: 'RUNNING', 'COMPLETE', 'CANCELLED' or a '-1 ERROR' string.
+    """
+    job = registry.get(job_handle, CaptureJob)
+    if job is None:
+        return _missing_handle(CaptureJob, job_handle)
+    return _collect_capture_job(job, job_handle)
+
+
+@_instrumented
+def wait_capture(job_handle, timeout_seconds):
+    """
+    Waits up to timeout_seconds for a capture started with start_capture_async() to finish.
+
+    Args:
+        job_handle (int): Handle returned by start_capture_async().
+        timeout_seconds (float): Longest time to block, in seconds. A negative value waits forever.
+
+    Returns:
+        str: 'RUNNING' if the timeout expired first, otherwise the same values as poll_capture().
+    """
+    job = registry.get(job_handle, CaptureJob)
+    if job is None:
+        return _missing_handle(CaptureJob, job_handle)
+
+    job.done.wait(None if timeout_seconds < 0 else timeout_seconds)
+    return _collect_capture_job(job, job_handle)
+
+
+@_instrumented
+def cancel_capture(job_handle):
+    """
+    Stops a capture started with start_capture_async(), closes it in Logic 2 and releases the job handle.
+
+    Args:
+        job_handle (int): Handle returned by start_capture_async().
+    """
+    job = registry.get(job_handle, CaptureJob)
+    if job is None:
+        return _missing_handle(CaptureJob, job_handle)
+    registry.remove(job_handle)
+
+    try:
+        job.cancelled = True
+        if not job.done.is_set():
+            _automation_call('capture.stop', job.capture.stop)
+            job.done.wait(call_deadlines.get('capture.stop', default_call_deadline)) # A hung wait is abandoned with the capture, None waits for it
+        with job.session.lock:
+            if job.session.capture is job.capture:
+                job.session.set_capture(None)
+            if job.session.manual_capture is job.capture:
+                job.session.manual_capture = None
+        _automation_call('capture.close', job.capture.close)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while cancelling the capture: {e}"
+    return "Capture cancelled"
+
+
+@_instrumented
+def add_analyzer(analyzer_name, label, settings, session_handle=DEFAULT_SESSION):
+    """
+    Adds an analyzer of any type to the active capture.
+
+    Args:
+        analyzer_name (str): Analyzer as named in Logic 2, for example 'SPI', 'I2C', 'Async Serial' or 'CAN'.
+        label (str): Label for the analyzer, empty for the Logic 2 default.
+        settings (str or dict): JSON object of the analyzer settings as named in Logic 2, for example
+            {"SDA": 0, "SCL": 1} for I2C or {"Input Channel": 2, "Bit Rate (Bits/s)": 115200} for Async Serial.
+        session_handle (int): Session whose capture gets the analyzer.
+
+    Returns:
+        str: The analyzer handle as a decimal string, or a '-1 ERROR' string.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None or session.capture is None:
+        return "-1 ERROR Capture session is not valid. Please start a capture first."
+
+    try:
+        if isinstance(settings, str):
+            settings = json.loads(settings) if settings.strip() else {}
+        if not isinstance(settings, dict):
+            raise ValueError("settings must be a JSON object")
+        with session.lock:
+            active_capture = session.capture
+            analyzer_handle = _automation_call('capture.add_analyzer', active_capture.add_analyzer, analyzer_name, label=label or None, settings=settings)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while adding the {analyzer_name} analyzer: {e}"
+    _forget_analyzers(session, keep_capture=active_capture) # Analyzers of earlier captures can no longer be exported
+    return f"{registry.add(Analyzer(session, active_capture, analyzer_handle, analyzer_name, label))}"
+
+
+@_instrumented
+def remove_analyzer(analyzer_handle):
+    """
+    Removes an analyzer added by add_analyzer() from its capture.
+
+    Args:
+        analyzer_handle (int): Handle returned by add_analyzer().
+    """
+    analyzer = registry.get(analyzer_handle, Analyzer)
+    if analyzer is None:
+        return _missing_handle(Analyzer, analyzer_handle)
+    registry.remove(analyzer_handle)
+    try:
+        _automation_call('capture.remove_analyzer', analyzer.capture.remove_analyzer, analyzer.analyzer_handle)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while removing the analyzer: {e}"
+    return "Analyzer removed successfully."
+
+
+@_instrumented
+def stop_capture(session_handle=DEFAULT_SESSION):
+    """
+    Ends the session's manual capture, and any capture of the session started with start_capture_async() that
+    is still recording, for example a trigger capture whose trigger never came. The data recorded so far
+    (trimmed as configured) is kept: a manual capture is the active capture for the export functions,
+    a stopped asynchronous capture becomes it once poll_capture() or wait_capture() reports 'COMPLETE'.
+
+    Args:
+        session_handle (int): Session whose captures are stopped.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    with session.lock:
+        manual_capture, session.manual_capture = session.manual_capture, None
+    captures = [job.capture for _, job in registry.items(CaptureJob)
+                if job.session is session and not job.manual and not job.done.is_set()]
+    if manual_capture is not None:
+        captures.append(manual_capture)
+    if not captures:
+        return "-1 ERROR There is no recording capture to stop."
+    try:
+        for temp_capture in captures:
+            _automation_call('capture.stop', temp_capture.stop)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while stopping the capture: {e}"
+    return "Capture stopped successfully"
+
+
+@_instrumented
+def add_spi_analyzer(label, mosi, miso, clock, enable, bits_per_transfer, session_handle=DEFAULT_SESSION):
+    """
+    Adds an SPI analyzer to the capture session.
+
+    Args:
+        label (str): Label for the analyzer.
+        miso (int): MISO channel number.
+        clock (int): Clock channel number.
+        enable (int): Enable channel number.
+        bits_per_transfer (str): Number of bits per transfer.
+        session_handle (int): Session whose capture gets the analyzer.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None or session.capture is None:
+        return "-1 ERROR Capture session is not valid. Please start a capture first."
+
+    try:
+        with session.lock:
+            session.spi_analyzer = _automation_call('capture.add_analyzer', session.capture.add_analyzer, 'SPI', label=label, settings={
+                'MOSI': mosi,
+                'MISO': miso,
+                'Clock': clock,
+                'Enable': enable,
+                'Bits per Transfer': bits_per_transfer
+            })
+        return "SPI analyzer added successfully."
+    except Exception as e:
+        return f"-1 ERROR An error occurred while adding the SPI analyzer: {e}"
+
+
+@_instrumented
+def export_raw_digital(output_dir, digital_channels, session_handle=DEFAULT_SESSION):
+    """
+    Exports the raw digital capture to a CSV file.
+
+    Args:
+        output_dir (str): File path and file name for the output CSV file.
+        digital_channels (list): List of channels to be exported.
+        session_handle (int): Session whose capture is exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        # Export raw digital data to a CSV file
+        _automation_call('capture.export_raw_data_csv', active_capture.export_raw_data_csv, directory=output_dir, digital_channels=digital_channels)
+        if metrics.enabled:
+            metrics.add_bytes('export_raw_digital', _output_bytes(os.path.join(output_dir, 'digital.csv')))
+        return "Raw digital data successfully exported to CSV file"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting raw digital data to CSV: {e}"
+    
+@_instrumented
+def export_raw_mixed_signal(output_dir, digital_channels, analog_channels, analog_downsample_ratio, session_handle=DEFAULT_SESSION):
+    """
+    Exports the raw digital capture to a CSV file.
+
+    Args:
+        output_dir (str): File path and file name for the output CSV file.
+        digital_channels (list): List of channels to be exported.
+        session_handle (int): Session whose capture is exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        # Export raw digital data to a CSV file
+        _automation_call('capture.export_raw_data_csv', active_capture.export_raw_data_csv, directory=output_dir, digital_channels=digital_channels, analog_channels=analog_channels, analog_downsample_ratio = analog_downsample_ratio)
+        if metrics.enabled:
+            metrics.add_bytes('export_raw_mixed_signal', _output_bytes(os.path.join(output_dir, 'digital.csv'), os.path.join(output_dir, 'analog.csv')))
+        return "Raw digital data successfully exported to CSV file"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting raw digital data to CSV: {e}"
+    
+
+@_instrumented
+def export_raw_digital_binary(output_dir, digital_channels, session_handle=DEFAULT_SESSION):
+    """
+    Exports the raw digital capture to Saleae binary files (one digital_N.bin per channel), which is much
+    smaller and faster to write and read back than CSV. See read_binary_digital().
+
+    Args:
+        output_dir (str): Directory for the .bin files, must already exist.
+        digital_channels (list): List of channels to be exported.
+        session_handle (int): Session whose capture is exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        _automation_call('capture.export_raw_data_binary', active_capture.export_raw_data_binary, directory=output_dir, digital_channels=digital_channels)
+        if metrics.enabled:
+            metrics.add_bytes('export_raw_digital_binary', _output_bytes(*[bin_path for _, bin_path in _binary_export_files(output_dir, 'digital')]))
+        return "Raw digital data successfully exported to binary files"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting raw digital data to binary files: {e}"
+
+
+@_instrumented
+def export_raw_mixed_signal_binary(output_dir, digital_channels, analog_channels, analog_downsample_ratio, session_handle=DEFAULT_SESSION):
+    """
+    Exports the raw digital and analog capture to Saleae binary files (digital_N.bin and analog_N.bin).
+    See read_binary_digital() and read_binary_analog().
+
+    Args:
+        output_dir (str): Directory for the .bin files, must already exist.
+        digital_channels (list): List of digital channels to be exported.
+        analog_channels (list): List of analog channels to be exported.
+        analog_downsample_ratio (int): Keep every Nth analog sample, 1 keeps them all.
+        session_handle (int): Session whose capture is exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        _automation_call('capture.export_raw_data_binary', active_capture.export_raw_data_binary, directory=output_dir, digital_channels=digital_channels, analog_channels=analog_channels, analog_downsample_ratio = analog_downsample_ratio)
+        if metrics.enabled:
+            metrics.add_bytes('export_raw_mixed_signal_binary', _output_bytes(*[bin_path for prefix in ('digital', 'analog') for _, bin_path in _binary_export_files(output_dir, prefix)]))
+        return "Raw mixed signal data successfully exported to binary files"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting raw mixed signal data to binary files: {e}"
+
+
+@_instrumented
+def export_spi_analyzer_table(output_dir, session_handle=DEFAULT_SESSION):
+    """
+    Export the data from the analyzer to a CSV file.
+
+    Args:
+        output_dir (str): File path and file name for the output CSV file.
+        session_handle (int): Session whose capture and SPI analyzer are exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        # Export analyzer data to a CSV file
+        analyzer_export_filepath = output_dir
+        _automation_call('capture.export_data_table', active_capture.export_data_table,
+            filepath=analyzer_export_filepath,
+            analyzers=[session.spi_analyzer]
+        )
+        if metrics.enabled:
+            metrics.add_bytes('export_spi_analyzer_table', _output_bytes(analyzer_export_filepath))
+        return "Analyzer successfully exported to CSV file"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting analyzer data to CSV: {e}"
+
+@_instrumented
+def export_data_table(filepath, analyzer_handles, radix, columns, session_handle=DEFAULT_SESSION):
+    """
+    Exports the decoded data of several analyzers to one CSV file, rows merged in time order.
+
+    Args:
+        filepath (str): File path and file name for the output CSV file.
+        analyzer_handles (list): Handles returned by add_analyzer(). Empty exports every analyzer of the active capture,
+            the one added by add_spi_analyzer() included.
+        radix (str): 'HEXADECIMAL', 'DECIMAL', 'BINARY' or 'ASCII' for the data values, empty for the Logic 2 default.
+        columns (list): Names of the columns to export, empty exports all of them.
+        session_handle (int): Session whose capture is exported.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        if analyzer_handles:
+            analyzers = []
+            for handle in analyzer_handles:
+                analyzer = registry.get(int(handle), Analyzer)
+                if analyzer is None or analyzer.session is not session:
+                    raise ValueError(f"Analyzer {handle} does not exist in this session")
+                if analyzer.capture is not active_capture:
+                    raise ValueError(f"Analyzer {handle} belongs to an earlier capture")
+                analyzers.append(analyzer.analyzer_handle)
+        else:
+            analyzers = [analyzer.analyzer_handle for _, analyzer in registry.items(Analyzer)
+                         if analyzer.session is session and analyzer.capture is active_capture]
+            if session.spi_analyzer is not None:
+                analyzers.append(session.spi_analyzer)
+        if not analyzers:
+            raise ValueError("the capture has no analyzers")
+        if radix:
+            radix_name = str(radix).strip().upper()
+            if radix_name not in automation.RadixType.__members__:
+                raise ValueError(f"Unknown radix '{radix}', expected one of {', '.join(automation.RadixType.__members__)}")
+            analyzers = [automation.DataTableExportConfiguration(analyzer=analyzer, radix=automation.RadixType[radix_name])
+                         for analyzer in analyzers]
+
+        _automation_call('capture.export_data_table', active_capture.export_data_table,
+            filepath=filepath,
+            analyzers=analyzers,
+            columns=list(columns) if columns else None
+        )
+        if metrics.enabled:
+            metrics.add_bytes('export_data_table', _output_bytes(filepath))
+        return "Analyzers successfully exported to CSV file"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting analyzer data to CSV: {e}"
+
+
+@_instrumented
+def export_saleae_capture(capture_filepath, session_handle=DEFAULT_SESSION):
+    """
+    Export the data from the analyzer to a CSV file.
+
+    Args:
+        capture_filepath (str): File path and file name for the output CSV file.
+        session_handle (int): Session whose capture is saved.
+    """
+    session = registry.get(session_handle, Session)
+    active_capture = session.capture if session else None
+    if active_capture is None:
+        return "-1 ERROR Capture no longer exists. Please capture data first."
+
+    try:
+        # Finally, save the capture to a .sal file
+        _automation_call('capture.save_capture', active_capture.save_capture, filepath=capture_filepath)
+        if metrics.enabled:
+            metrics.add_bytes('export_saleae_capture', _output_bytes(capture_filepath))
+        return "Analyzer data successfully saved."
+    except Exception as e:
+        return f"-1 ERROR An error occurred while exporting the capture: {e}"
+
+
+@_instrumented
+def close_connection(session_handle=DEFAULT_SESSION):
+    """
+    Closes the session's captures, including those of capture jobs that were never collected, and releases the
+    session handle. The pooled connection to Logic 2 stays open for the next session (see close_idle_connections()).
+
+    Args:
+        session_handle (int): Session to close.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    errors = []
+    try:
+        errors = _close_session_captures(session)
+    finally:
+        # Hand the connection back to the pool and release the handle even if a capture could not be closed
+        try:
+            _release_session_connection(session)
+        except Exception as e:
+            errors.append(e)
+        registry.remove(session_handle)
+    if errors:
+        return f"-1 ERROR An error occurred while closing the session: {errors[0]}"
+    return 'Logic2 Session Closed'
+
+
+def _close_session_captures(session):
+    """
+    Aborts the session's capture loops, releases its capture jobs and analyzers and closes every capture it
+    still holds in Logic 2, including those of capture jobs that were never collected. The session handle and
+    its connection are left alone. Returns the errors of the captures that could not be closed.
+    """
+    # Abort the loops and forget the analyzers of this session, and collect the captures its uncollected jobs still hold
+    captures, loops = [], []
+    for job_handle, job in registry.items((CaptureJob, CaptureLoop, Analyzer)):
+        if job.session is session:
+            registry.remove(job_handle)
+            if isinstance(job, CaptureLoop):
+                job.stop(abort=True)
+                loops.append(job)
+            elif isinstance(job, CaptureJob) and not job.timed_out:
+                job.cancelled = True
+                captures.append(job.capture)
+    for loop in loops:
+        loop.thread.join() # Its captures and exports use the session's connection, every call is under a deadline
+
+    errors = []
+    with session.lock:
+        if session.capture is not None and session.capture not in captures:
+            captures.append(session.capture)
+        if session.manual_capture is not None and session.manual_capture not in captures:
+            captures.append(session.manual_capture)
+        session.set_capture(None)
+        session.manual_capture = None
+        for temp_capture in captures:
+            try:
+                _automation_call('capture.close', temp_capture.close)
+            except Exception as e:
+                errors.append(e)
+    return errors
+
+
+def _release_session_connection(session):
+    """
+    Hands a session's pooled connection back to the pool, or closes the manager of a session that owns one.
+    """
+    if session.pool_key is not None:
+        connection_pool.release(session.pool_key)
+    else:
+        _automation_call('manager.close', session.manager.close)
+
+
+@_instrumented
+def check_connection(session_handle=DEFAULT_SESSION):
+    """
+    Probes the session's Logic 2 connection now and reconnects it if the probe fails.
+
+    Args:
+        session_handle (int): Session to check.
+
+    Returns:
+        str: The Logic 2 version, or a '-1 ERROR' string if no connection could be made.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    try:
+        if session.pool_key is not None:
+            manager = connection_pool.get(session.pool_key, probe_interval_seconds=0.0)
+        else:
+            manager = session.manager
+        app_info = _automation_call('manager.get_app_info', manager.get_app_info)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while checking the connection: {e}"
+    return f"{app_info.app_version}"
+
+
+@_instrumented
+def get_connection_status():
+    """
+    Returns a JSON list describing every pooled Logic 2 connection: address, port, connected, sessions using it,
+    seconds since it was last verified, how often it was reconnected, and how many replaced managers are kept
+    open for the captures made with them.
+    """
+    return json.dumps(connection_pool.status())
+
+
+@_instrumented
+def close_idle_connections(idle_seconds):
+    """
+    Closes the pooled connections that no session has used for idle_seconds (0 closes every unused connection).
+    Unused connections are otherwise closed after POOL_IDLE_SECONDS.
+
+    Args:
+        idle_seconds (float): Minimum time since the last session using a connection was closed.
+    """
+    try:
+        closed = connection_pool.close_idle(float(idle_seconds))
+    except Exception as e:
+        return f"-1 ERROR An error occurred while closing idle connections: {e}"
+    return f"Closed {closed} idle connection(s)"
+
+
+@_instrumented
+def configure_call_deadlines(deadlines, default_seconds, retries, backoff_seconds):
+    """
+    Sets the deadlines of the automation API calls made by every function of the module. A call that misses
+    its deadline is abandoned and its function returns a '-1 ERROR' string instead of blocking LabVIEW; a
+    capture that misses its deadline is also stopped and closed, and its capture job handle is released once
+    the error has been reported.
+
+    Args:
+        deadlines (str or dict): JSON object (or dict) of call name -> seconds, merged into the current deadlines.
+            Names are those of get_metrics(), for example {"capture.export_raw_data_csv": 120, "capture.save_capture": 60}.
+            The 'capture.wait' value is added to the timed capture duration. Triggered captures are only bounded by
+            'capture.wait_trigger', added to the time after the trigger, since the trigger may take any time to come.
+            0 removes the deadline of a call.
+        default_seconds (float): Deadline of the calls not listed, 0 for none.
+        retries (int): Extra attempts of the idempotent calls (device list and health checks) after a failure or missed deadline.
+        backoff_seconds (float): Delay before the first retry, doubling for each further one.
+
+    Returns:
+        str: JSON of the deadlines in effect, or a '-1 ERROR' string.
+    """
+    global default_call_deadline, call_retries, call_backoff_seconds
+    try:
+        if isinstance(deadlines, str):
+            deadlines = json.loads(deadlines) if deadlines.strip() else {}
+        call_deadlines.update({name: float(seconds) for name, seconds in dict(deadlines).items()})
+        default_call_deadline = float(default_seconds) if default_seconds > 0 else None
+        call_retries = max(0, int(retries))
+        call_backoff_seconds = max(0.0, float(backoff_seconds))
+    except Exception as e:
+        return f"-1 ERROR An error occurred while configuring the call deadlines: {e}"
+    return json.dumps({'deadlines': call_deadlines, 'default_seconds': default_call_deadline,
+                       'retries': call_retries, 'backoff_seconds': call_backoff_seconds})
+
+
+@_instrumented
+def get_deadline_report():
+    """
+    Reports the call deadlines in effect and the most recent calls that missed them.
+
+    Returns:
+        str: JSON with "deadlines", "default_seconds", "retries", "backoff_seconds" and "misses", a list of the last
+        DEADLINE_REPORT_WINDOW misses with their "time", "name", "deadline_seconds", "elapsed_seconds" and "attempt".
+    """
+    return json.dumps({'deadlines': call_deadlines, 'default_seconds': default_call_deadline, 'retries': call_retries,
+                       'backoff_seconds': call_backoff_seconds, 'misses': list(deadline_misses)})
+
+
+def _run_operation(operation_table, operation, session_handle):
+    """
+    Runs one {"op": ..., "args": ...} step against a table of allowed functions and returns its result
+    as a dict with "op", "result", "ok" and "seconds". Never raises.
+    """
+    op = operation.get('op') if isinstance(operation, dict) else None
+    function = operation_table.get(op)
+    step_start = time.perf_counter()
+    if function is None:
+        result = f"-1 ERROR Unknown operation: {op}"
+    else:
+        args = operation.get('args', [])
+        if isinstance(args, dict):
+            positional, keywords = [], dict(args)
+        else:
+            positional, keywords = list(args), {}
+        parameters = list(inspect.signature(function).parameters)
+        if 'session_handle' in parameters and 'session_handle' not in keywords and len(positional) <= parameters.index('session_handle'):
+            keywords['session_handle'] = session_handle
+        try:
+            result = function(*positional, **keywords)
+        except Exception as e:
+            # Wrong argument count or types, the functions themselves report their own errors
+            result = f"-1 ERROR An error occurred while running {op}: {e}"
+
+    return {
+        'op': op,
+        'result': result,
+        'ok': not str(result).startswith('-1 ERROR'),
+        'seconds': time.perf_counter() - step_start,
+    }
+
+
+@_instrumented
+def run_sequence(operations, stop_on_error=True, session_handle=DEFAULT_SESSION):
+    """
+    Runs a whole list of operations (configure, capture, analyze, export, ...) in one Python Node call,
+    so a short capture does not pay the LabVIEW to Python call overhead once per step.
+
+    Each operation is an object with the function name in "op" and its arguments in "args", either as a list
+    (positional) or an object (keyword), for example:
+        [{"op": "device_config", "args": [[0, 1, 2, 3], 10000000, 3.3, [], 0]},
+         {"op": "capture_duration_config", "args": [0.05]},
+         {"op": "start_capture", "args": ["F4241"]},
+         {"op": "export_raw_digital", "args": {"output_dir": "C:/captures", "digital_channels": [0, 1]}}]
+    Operations that take a session handle run on session_handle unless their args name another one.
+
+    Args:
+        operations (str or list): JSON string or list of operation objects.
+        stop_on_error (bool): If True, the remaining operations are skipped after the first failure.
+        session_handle (int): Session the operations run on.
+
+    Returns:
+        str: JSON object with the overall "status" ('OK' or 'ERROR'), "total_seconds" and one entry per step
+        in "steps" holding its "op", "result", "ok" and "seconds". A '-1 ERROR' string if operations cannot be parsed.
+    """
+    try:
+        if isinstance(operations, str):
+            operations = json.loads(operations)
+        operations = list(operations)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while parsing the operation list: {e}"
+
+    steps = []
+    sequence_ok = True
+    sequence_start = time.perf_counter()
+    for operation in operations:
+        step = _run_operation(SEQUENCE_OPERATIONS, operation, session_handle)
+        steps.append(step)
+        if not step['ok']:
+            sequence_ok = False
+            if stop_on_error:
+                break
+
+    return json.dumps({
+        'status': 'OK' if sequence_ok else 'ERROR',
+        'total_seconds': time.perf_counter() - sequence_start,
+        'steps': steps,
+    })
+
+
+# Functions export_all() may call. They only read the session's active capture, so they are safe to run side by side
+EXPORT_OPERATIONS = {
+    'export_raw_digital': export_raw_digital,
+    'export_raw_mixed_signal': export_raw_mixed_signal,
+    'export_spi_analyzer_table': export_spi_analyzer_table,
+    'export_saleae_capture': export_saleae_capture,
+    'export_raw_digital_binary': export_raw_digital_binary,
+    'export_raw_mixed_signal_binary': export_raw_mixed_signal_binary,
+    'export_data_table': export_data_table,
+}
+
+# Functions start_capture_loop() may run on each capture, the exports plus adding the analyzers they need
+LOOP_OPERATIONS = dict(EXPORT_OPERATIONS, add_spi_analyzer=add_spi_analyzer, add_analyzer=add_analyzer)
+
+
+@_instrumented
+def export_all(exports, max_workers=4, session_handle=DEFAULT_SESSION):
+    """
+    Runs several exports of the active capture at the same time in a pool of worker threads, and returns
+    once all of them have finished or failed. Each export blocks on its own gRPC call to Logic 2 and none
+    depends on another, so for large captures this takes about as long as the slowest export instead of the sum.
+
+    Exports use the same {"op": ..., "args": ...} format as run_sequence(), for example:
+        [{"op": "export_raw_digital", "args": ["D:/raw", [0, 1, 2, 3]]},
+         {"op": "export_spi_analyzer_table", "args": ["E:/tables/spi.csv"]},
+         {"op": "export_saleae_capture", "args": ["F:/archive/capture.sal"]}]
+    Point them at separate directories or disks to keep them from competing for the same drive.
+
+    Args:
+        exports (str or list): JSON string or list of export operations.
+        max_workers (int): Largest number of exports to run at once.
+        session_handle (int): Session whose active capture is exported.
+
+    Returns:
+        str: JSON in the same layout as run_sequence(), with "steps" in the order the exports were given.
+        A '-1 ERROR' string if exports cannot be parsed.
+    """
+    try:
+        if isinstance(exports, str):
+            exports = json.loads(exports)
+        exports = list(exports)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while parsing the export list: {e}"
+
+    stage_start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        futures = [executor.submit(_run_operation, EXPORT_OPERATIONS, export, session_handle) for export in exports]
+        steps = [future.result() for future in futures]
+
+    return json.dumps({
+        'status': 'OK' if all(step['ok'] for step in steps) else 'ERROR',
+        'total_seconds': time.perf_counter() - stage_start,
+        'steps': steps,
+    })
+
+
+def _substitute_iteration(operations, iteration):
+    """
+    Returns a copy of operations with '{iteration}' in every string argument replaced by the iteration number,
+    so each capture of a loop exports to its own files.
+    """
+    return _substitute_placeholders(operations, {'{iteration}': str(iteration)})
+
+
+def _substitute_placeholders(operations, replacements):
+    """
+    Returns a copy of operations with every placeholder key of replacements in every string argument replaced by its value.
+    """
+    def substitute(value):
+        if isinstance(value, str):
+            for placeholder, replacement in replacements.items():
+                value = value.replace(placeholder, replacement)
+            return value
+        if isinstance(value, list):
+            return [substitute(item) for item in value]
+        if isinstance(value, dict):
+            return {key: substitute(item) for key, item in value.items()}
+        return value
+    return substitute(operations)
+
+
+@_instrumented
+def start_capture_loop(device_id, operations, iterations, max_pending=2, session_handle=DEFAULT_SESSION):
+    """
+    Repeats start_capture() plus a list of post-capture operations in a background thread, re-using the
+    session's stored device and capture configuration. The next capture starts as soon as the previous one
+    has finished recording, its exports and close() run in the background meanwhile.
+
+    The operations use the run_sequence() format and may be add_spi_analyzer and the export_* functions.
+    '{iteration}' in any string argument is replaced by the capture number, for example:
+        [{"op": "add_spi_analyzer", "args": ["SPI", 0, 1, 2, 3, "8 Bits per Transfer (Standard)"]},
+         {"op": "export_spi_analyzer_table", "args": ["D:/cycles/spi_{iteration}.csv"]}]
+
+    Args:
+        device_id (str): ID of the device to capture from.
+        operations (str or list): JSON string or list of operations to run on every capture.
+        iterations (int): Number of captures, 0 or less runs until stop_capture_loop() is called.
+        max_pending (int): Largest number of captures held in Logic 2 at once, the one recording included.
+            2 overlaps one capture with the exports of the previous one.
+        session_handle (int): Session whose connection and configurations are used.
+
+    Returns:
+        str: The loop handle as a decimal string, or a '-1 ERROR' string.
+    """
+    session = registry.get(session_handle, Session)
+    if session is None:
+        return "-1 ERROR Manager is not connected. Please establish a connection first."
+
+    try:
+        if isinstance(operations, str):
+            operations = json.loads(operations)
+        operations = list(operations)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while parsing the operation list: {e}"
+    if max_pending < 1:
+        return "-1 ERROR max_pending must be at least 1."
+    if _is_manual_capture(session.capture_configuration):
+        return "-1 ERROR Capture loops need a timed or digital trigger capture configuration."
+    with session.lock:
+        budget_error, device_configuration = _enforce_budget(session) # Every capture of the loop uses the same configuration, so checking once is enough
+    if budget_error:
+        return budget_error
+
+    return f"{registry.add(CaptureLoop(session, device_id, device_configuration, operations, int(iterations), int(max_pending)))}"
+
+
+@_instrumented
+def poll_capture_loop(loop_handle):
+    """
+    Returns the progress of a loop started with start_capture_loop().
+
+    Args:
+        loop_handle (int): Handle returned by start_capture_loop().
+
+    Returns:
+        str: JSON object with "state" ('RUNNING', 'STOPPING', 'COMPLETE', 'STOPPED' or 'ERROR'), the capture
+        counters, the last export error and "captures_per_hour". A '-1 ERROR' string if the handle is unknown.
+    """
+    loop = registry.get(loop_handle, CaptureLoop)
+    if loop is None:
+        return _missing_handle(CaptureLoop, loop_handle)
+    return json.dumps(loop.status())
+
+
+@_instrumented
+def stop_capture_loop(loop_handle, timeout_seconds):
+    """
+    Stops a loop started with start_capture_loop() after the capture that is recording, waits for the
+    pending exports and releases the loop handle.
+
+    Args:
+        loop_handle (int): Handle returned by start_capture_loop().
+        timeout_seconds (float): Longest time to wait for the loop to wind down, a negative value waits forever.
+
+    Returns:
+        str: The final poll_capture_loop() JSON, or a '-1 ERROR' string.
+    """
+    loop = registry.get(loop_handle, CaptureLoop)
+    if loop is None:
+        return _missing_handle(CaptureLoop, loop_handle)
+
+    loop.stop()
+    loop.thread.join(None if timeout_seconds < 0 else timeout_seconds)
+    if loop.thread.is_alive():
+        return f"-1 ERROR Capture loop {loop_handle} did not stop within {timeout_seconds} seconds."
+    registry.remove(loop_handle)
+    return json.dumps(loop.status())
+
+
+def _capture_files(captures):
+    """
+    Expands a .sal file, a directory (all .sal files in it), a glob pattern or a list of those into a sorted
+    list of absolute capture paths without duplicates.
+    """
+    if isinstance(captures, str):
+        captures = [captures]
+    capture_paths = []
+    for capture in captures:
+        if os.path.isdir(capture):
+            capture_paths.extend(os.path.join(capture, name) for name in os.listdir(capture) if name.lower().endswith('.sal'))
+        elif glob.has_magic(capture):
+            capture_paths.extend(glob.glob(capture, recursive=True))
+        else:
+            capture_paths.append(capture)
+    return sorted(set(os.path.abspath(path) for path in capture_paths))
+
+
+@_instrumented
+def start_batch_reprocess(captures, operations, manifest_path, instances, captures_per_instance, session_handle=DEFAULT_SESSION):
+    """
+    Runs analyzer and export operations on saved .sal captures in the background, resuming from its manifest.
+
+    Args:
+        captures (str or list): .sal file, directory, glob pattern (for example 'D:/archive/**/*.sal') or a list of those.
+        operations (str or list): Operations in the start_capture_loop() format, '{name}' and '{index}' in string
+            arguments are replaced by the capture file name without extension and its position in the capture list.
+        manifest_path (str): JSON progress manifest, created if it does not exist. Captures it lists as done are skipped.
+        instances (str or list): Logic 2 instance or instances as 'address:port' strings. Empty uses the connection of session_handle.
+        captures_per_instance (int): Largest number of captures loaded at once on each instance.
+        session_handle (int): Session whose connection is used when instances is empty.
+
+    Returns:
+        str: The batch handle as a decimal string, or a '-1 ERROR' string.
+    """
+    try:
+        if isinstance(operations, str):
+            operations = json.loads(operations)
+        operations = list(operations)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while parsing the operation list: {e}"
+    if captures_per_instance < 1:
+        return "-1 ERROR captures_per_instance must be at least 1."
+    if isinstance(instances, str):
+        instances = [instances] if instances.strip() else [] # One instance, not a list of its characters
+
+    pool_keys = []
+    try:
+        capture_paths = _capture_files(captures)
+        if not capture_paths:
+            return "-1 ERROR No .sal captures were found."
+        if len(instances):
+            for instance in instances:
+                address, _, port = instance.rpartition(':')
+                pool_keys.append(connection_pool.acquire(address, int(port)))
+        else:
+            session = registry.get(session_handle, Session)
+            if session is None or session.pool_key is None:
+                return "-1 ERROR Manager is not connected. Please establish a connection first."
+            pool_keys.append(connection_pool.acquire(*session.pool_key))
+        return f"{registry.add(BatchJob(capture_paths, operations, manifest_path, pool_keys, int(captures_per_instance)))}"
+    except Exception as e:
+        for pool_key in pool_keys:
+            connection_pool.release(pool_key)
+        return f"-1 ERROR An error occurred while starting the batch: {e}"
+
+
+@_instrumented
+def poll_batch_reprocess(batch_handle):
+    """
+    Returns the progress of a batch started with start_batch_reprocess().
+
+    Args:
+        batch_handle (int): Handle returned by start_batch_reprocess().
+
+    Returns:
+        str: JSON object with "state" ('RUNNING', 'STOPPING', 'COMPLETE' or 'STOPPED'), the capture counters,
+        the last error and "captures_per_hour". A '-1 ERROR' string if the handle is unknown.
+    """
+    batch = registry.get(batch_handle, BatchJob)
+    if batch is None:
+        return _missing_handle(BatchJob, batch_handle)
+    return json.dumps(batch.status())
+
+
+@_instrumented
+def stop_batch_reprocess(batch_handle, timeout_seconds):
+    """
+    Stops a batch after the captures being processed and releases its handle.
+
+    Args:
+        batch_handle (int): Handle returned by start_batch_reprocess().
+        timeout_seconds (float): Longest time to wait for the running captures, a negative value waits forever.
+
+    Returns:
+        str: The final poll_batch_reprocess() JSON, or a '-1 ERROR' string.
+    """
+    batch = registry.get(batch_handle, BatchJob)
+    if batch is None:
+        return _missing_handle(BatchJob, batch_handle)
+
+    if batch.thread.is_alive():
+        batch.stop_requested.set()
+    batch.thread.join(None if timeout_seconds < 0 else timeout_seconds)
+    if batch.thread.is_alive():
+        return f"-1 ERROR Batch {batch_handle} did not stop within {timeout_seconds} seconds."
+    registry.remove(batch_handle)
+    return json.dumps(batch.status())
+
+
+def _require_numpy():
+    """
+    Raises a readable error when NumPy is missing, for the functions that return arrays.
+    """
+    if isinstance(np, _LazyModule):
+        try:
+            np._resolve()
+        except ImportError:
+            raise RuntimeError("NumPy is not installed in this Python environment. Install it with 'pip install numpy'.")
+
+
+def _channel_numbers(column_names):
+    """
+    Returns the channel number of each exported column name ('Channel 3' -> 3). Columns whose name does not
+    end in a number (renamed channels) get their position instead.
+    """
+    numbers = []
+    for position, name in enumerate(column_names):
+        match = re.search(r'(\d+)\s*$', name.strip().strip('"'))
+        numbers.append(int(match.group(1)) if match else position)
+    return numbers
+
+
+def _read_raw_csv(csv_path):
+    """
+    Loads a digital.csv or analog.csv written by export_raw_data_csv() in one vectorized pass.
+
+    Returns:
+        tuple: (channel numbers, times in seconds as float64, samples as a 2D float64 array with one column per channel)
+    """
+    _require_numpy()
+    with open(csv_path, 'r') as csv_file:
+        header = csv_file.readline().rstrip('\r\n').split(',')
+    data = np.loadtxt(csv_path, delimiter=',', skiprows=1, dtype=np.float64, ndmin=2)
+    if data.shape[0] == 0:
+        data = np.empty((0, len(header)), dtype=np.float64)
+    return _channel_numbers(header[1:]), data[:, 0], data[:, 1:]
+
+
+def _digital_transitions(times, states, sample_rate, previous_states=None):
+    """
+    Turns the rows of a digital.csv (one row per change on any channel) into per-channel transitions.
+
+    Args:
+        times (ndarray): Row times in seconds.
+        states (ndarray): 2D array of channel states, one column per channel.
+        sample_rate (float): Digital sample rate in Sa/s, used to convert times to sample indices.
+        previous_states (ndarray): Last row of the previous chunk when reading a file in chunks, or None
+            for the start of the capture.
+
+    Returns:
+        list: One (sample indices as int64, states as uint8) pair per column. Without previous_states the
+        first entry of each channel is its state at the start of the capture.
+    """
+    _require_numpy()
+    sample_indices = np.rint(times * sample_rate).astype(np.int64)
+    transitions = []
+    for column in range(states.shape[1]):
+        channel_states = states[:, column].astype(np.uint8)
+        if channel_states.size == 0:
+            transitions.append((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)))
+            continue
+        change_rows = np.flatnonzero(channel_states[1:] != channel_states[:-1]) + 1
+        if previous_states is None or channel_states[0] != previous_states[column]:
+            rows = np.concatenate(([0], change_rows))
+        else:
+            rows = change_rows
+        transitions.append((sample_indices[rows], channel_states[rows]))
+    return transitions
+
+
+def _flatten_transitions(transitions):
+    """
+    Packs per-channel transitions into (transition_counts, sample index bytes, state bytes) for LabVIEW.
+    """
+    transition_counts = [int(indices.size) for indices, _ in transitions]
+    sample_indices = np.concatenate([indices for indices, _ in transitions] or [np.empty(0, dtype=np.int64)])
+    channel_states = np.concatenate([values for _, values in transitions] or [np.empty(0, dtype=np.uint8)])
+    return transition_counts, sample_indices.astype('<i8', copy=False).tobytes(), channel_states.tobytes()
+
+
+@_instrumented
+def load_raw_digital_arrays(csv_path, sample_rate):
+    """
+    Loads an existing digital.csv into flat transition arrays that LabVIEW can take without parsing text.
+
+    Args:
+        csv_path (str): Path of the digital.csv file.
+        sample_rate (float): Digital sample rate in Sa/s the capture was taken at.
+
+    Returns:
+        tuple: (status, channels, transition_counts, sample_indices, states)
+            status (str): 'Raw digital data loaded' or a '-1 ERROR' string.
+            channels (list): Channel number of each block.
+            transition_counts (list): Number of entries of each channel in the flat buffers.
+            sample_indices (bytes): All channels' transition sample indices back to back, little-endian int64.
+            states (bytes): The matching channel states, uint8.
+        Use Unflatten From String (little-endian, no size prefix) to turn the buffers into I64 and U8 arrays.
+    """
+    try:
+        channels, transitions = _load_digital(csv_path, sample_rate)
+        transition_counts, sample_indices, channel_states = _flatten_transitions(transitions)
+        return ("Raw digital data loaded", channels, transition_counts, sample_indices, channel_states)
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while loading raw digital data: {e}", [], [], b"", b"")
+
+
+@_instrumented
+def export_raw_digital_arrays(output_dir, digital_channels, session_handle=DEFAULT_SESSION):
+    """
+    Exports the raw digital capture like export_raw_digital() and returns the transitions as flat arrays,
+    so LabVIEW does not have to read and parse digital.csv itself.
+
+    Args:
+        output_dir (str): Directory for the digital.csv file, must be reachable from this computer.
+        digital_channels (list): List of channels to be exported.
+        session_handle (int): Session whose capture is exported. Its device configuration gives the sample rate.
+
+    Returns:
+        tuple: Same as load_raw_digital_arrays().
+    """
+    session = registry.get(session_handle, Session)
+    if session is None or session.device_configuration is None:
+        return ("-1 ERROR Device configuration is missing. Please configure the device first.", [], [], b"", b"")
+
+    export_status = export_raw_digital(output_dir, digital_channels, session_handle)
+    if export_status.startswith('-1 ERROR'):
+        return (export_status, [], [], b"", b"")
+    return load_raw_digital_arrays(os.path.join(output_dir, 'digital.csv'), session.device_configuration.digital_sample_rate)
+
+
+@_instrumented
+def open_raw_reader(csv_path, chunk_rows, mode, sample_rate):
+    """
+    Opens an exported digital.csv or analog.csv (from export_raw_digital() or export_raw_mixed_signal())
+    for reading in chunks of chunk_rows rows. Use read_next_chunk() in a producer/consumer loop and
+    close_raw_reader() when done.
+
+    Args:
+        csv_path (str): Path of the digital.csv or analog.csv file.
+        chunk_rows (int): Number of file rows per chunk.
+        mode (str): 'rows' for the samples as they are in the file, or 'transitions' for per-channel
+            digital transitions (digital.csv only).
+        sample_rate (float): Digital sample rate in Sa/s, only used in 'transitions' mode.
+
+    Returns:
+        str: The reader handle as a decimal string, or a '-1 ERROR' string.
+    """
+    try:
+        reader = RawDataReader(csv_path, chunk_rows, mode, sample_rate)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while opening the raw data file: {e}"
+    return f"{registry.add(reader)}"
+
+
+@_instrumented
+def read_next_chunk(reader_handle):
+    """
+    Returns the next chunk of a reader opened with open_raw_reader().
+
+    Args:
+        reader_handle (int): Handle returned by open_raw_reader().
+
+    Returns:
+        tuple: (status, channels, counts, buffer_1, buffer_2)
+            status (str): 'CHUNK', 'END' once the file is exhausted, or a '-1 ERROR' string.
+            channels (list): Channel number of each column.
+            In 'rows' mode counts holds the number of rows, buffer_1 the row times in seconds (little-endian
+            DBL) and buffer_2 the samples row by row (little-endian DBL, one value per channel per row).
+            In 'transitions' mode counts, buffer_1 and buffer_2 have the layout of load_raw_digital_arrays().
+    """
+    reader = registry.get(reader_handle, RawDataReader)
+    if reader is None:
+        return (_missing_handle(RawDataReader, reader_handle), [], [], b"", b"")
+
+    try:
+        with reader.lock:
+            chunk = reader.next_chunk()
+            if chunk is None:
+                return ("END", reader.channels, [], b"", b"")
+            times, samples = chunk
+            if reader.mode == 'rows':
+                return ("CHUNK", reader.channels, [int(times.size)],
+                        times.astype('<f8', copy=False).tobytes(), samples.astype('<f8', copy=False).tobytes())
+
+            transitions = _digital_transitions(times, samples, reader.sample_rate, reader.previous_states)
+            reader.previous_states = samples[-1].astype(np.uint8)
+            transition_counts, sample_indices, channel_states = _flatten_transitions(transitions)
+            return ("CHUNK", reader.channels, transition_counts, sample_indices, channel_states)
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while reading the raw data file: {e}", [], [], b"", b"")
+
+
+@_instrumented
+def close_raw_reader(reader_handle):
+    """
+    Closes a reader opened with open_raw_reader() and releases its handle.
+
+    Args:
+        reader_handle (int): Handle returned by open_raw_reader().
+    """
+    reader = registry.remove(reader_handle, RawDataReader)
+    if reader is None:
+        return _missing_handle(RawDataReader, reader_handle)
+    try:
+        reader.close()
+    except Exception as e:
+        return f"-1 ERROR An error occurred while closing the raw data file: {e}"
+    return "Reader closed"
+
+
+# Saleae binary export format, see https://support.saleae.com/faq/technical-faq/binary-export-format-logic-2
+BINARY_IDENTIFIER = b'<SALEAE>'
+BINARY_VERSION = 0 # The only layout this module reads, other versions are rejected
+BINARY_TYPE_DIGITAL = 0
+BINARY_TYPE_ANALOG = 1
+BINARY_DIGITAL_HEADER = struct.Struct('<8siiIddQ') # identifier, version, type, initial_state, begin_time, end_time, num_transitions
+BINARY_ANALOG_HEADER = struct.Struct('<8siidQQQ') # identifier, version, type, begin_time, sample_rate, downsample, num_samples
+
+
+def _read_binary_header(bin_path, header, expected_type, item_size, count_field):
+    """
+    Reads and checks the header of a Saleae binary export file. Only BINARY_VERSION is accepted and the file size
+    must match the header's sample count exactly, so a file in a layout this module does not know is rejected
+    instead of misread.
+    """
+    with open(bin_path, 'rb') as bin_file:
+        data = bin_file.read(header.size)
+    fields = header.unpack(data) if len(data) == header.size else (b'',) * 7
+    if fields[0] != BINARY_IDENTIFIER or fields[2] != expected_type:
+        raise ValueError(f"{bin_path} is not a Saleae {'digital' if expected_type == BINARY_TYPE_DIGITAL else 'analog'} binary export file")
+    if fields[1] != BINARY_VERSION or os.path.getsize(bin_path) != header.size + fields[count_field] * item_size:
+        raise ValueError(f"{bin_path} uses an unsupported binary export layout (version {fields[1]})")
+    return fields
+
+
+def _map_array(bin_path, dtype, offset, count):
+    """
+    Memory-maps count values of dtype starting at offset, read-only. Nothing is copied into memory.
+    """
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(bin_path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+@_instrumented
+def read_binary_digital(bin_path):
+    """
+    Maps a digital_N.bin file written by export_raw_digital_binary() without copying it.
+
+    Args:
+        bin_path (str): Path of the .bin file.
+
+    Returns:
+        dict: 'initial_state' (0 or 1), 'begin_time' and 'end_time' in seconds, and 'transition_times', a
+        read-only float64 NumPy view of the transition times in seconds. The state toggles at every transition.
+    """
+    _require_numpy()
+    fields = _read_binary_header(bin_path, BINARY_DIGITAL_HEADER, BINARY_TYPE_DIGITAL, 8, 6)
+    return {
+        'initial_state': int(fields[3]),
+        'begin_time': fields[4],
+        'end_time': fields[5],
+        'transition_times': _map_array(bin_path, '<f8', BINARY_DIGITAL_HEADER.size, fields[6]),
+    }
+
+
+@_instrumented
+def read_binary_analog(bin_path):
+    """
+    Maps an analog_N.bin file written by export_raw_mixed_signal_binary() without copying it.
+
+    Args:
+        bin_path (str): Path of the .bin file.
+
+    Returns:
+        dict: 'begin_time' in seconds, 'sample_rate' in Sa/s, 'downsample' ratio, and 'samples', a read-only
+        float32 NumPy view of the voltages. Sample i was taken at begin_time + i * downsample / sample_rate.
+    """
+    _require_numpy()
+    fields = _read_binary_header(bin_path, BINARY_ANALOG_HEADER, BINARY_TYPE_ANALOG, 4, 6)
+    return {
+        'begin_time': fields[3],
+        'sample_rate': fields[4],
+        'downsample': fields[5],
+        'samples': _map_array(bin_path, '<f4', BINARY_ANALOG_HEADER.size, fields[6]),
+    }
+
+
+def _binary_export_files(output_dir, prefix):
+    """
+    Returns [(channel, path)] of the digital_N.bin or analog_N.bin files in output_dir, sorted by channel.
+    """
+    files = []
+    for name in os.listdir(output_dir):
+        match = re.fullmatch(prefix + r'_(\d+)\.bin', name)
+        if match:
+            files.append((int(match.group(1)), os.path.join(output_dir, name)))
+    return sorted(files)
+
+
+def _load_digital(source, sample_rate):
+    """
+    Loads per-channel digital transitions from a digital.csv file or from a directory of digital_N.bin files.
+
+    Returns:
+        tuple: (channel numbers, list of (sample indices as int64, states as uint8) per channel)
+    """
+    _require_numpy()
+    if not os.path.isdir(source):
+        channels, times, states = _read_raw_csv(source)
+        return channels, _digital_transitions(times, states, sample_rate)
+
+    channels = []
+    transitions = []
+    for channel, bin_path in _binary_export_files(source, 'digital'):
+        digital = read_binary_digital(bin_path)
+        times = np.concatenate(([digital['begin_time']], digital['transition_times']))
+        states = (np.arange(times.size) + digital['initial_state']) % 2
+        channels.append(channel)
+        transitions.append((np.rint(times * sample_rate).astype(np.int64), states.astype(np.uint8)))
+    return channels, transitions
+
+
+def _load_analog(source):
+    """
+    Loads analog waveforms from an analog.csv file or from a directory of analog_N.bin files.
+    Waveforms from binary files are memory-mapped views.
+
+    Returns:
+        tuple: (channel numbers, t0 list in seconds, dt list in seconds, list of sample arrays)
+    """
+    _require_numpy()
+    if not os.path.isdir(source):
+        channels, times, samples = _read_raw_csv(source)
+        dt = float(times[1] - times[0]) if times.size > 1 else 0.0
+        t0 = float(times[0]) if times.size else 0.0
+        return channels, [t0] * len(channels), [dt] * len(channels), [samples[:, column] for column in range(samples.shape[1])]
+
+    channels, t0, dt, waveforms = [], [], [], []
+    for channel, bin_path in _binary_export_files(source, 'analog'):
+        analog = read_binary_analog(bin_path)
+        channels.append(channel)
+        t0.append(analog['begin_time'])
+        dt.append(analog['downsample'] / analog['sample_rate'])
+        waveforms.append(analog['samples'])
+    return channels, t0, dt, waveforms
+
+
+@_instrumented
+def load_binary_digital_arrays(output_dir, sample_rate):
+    """
+    Reads the digital_N.bin files in output_dir into the same flat transition buffers as load_raw_digital_arrays().
+
+    Args:
+        output_dir (str): Directory holding the files written by export_raw_digital_binary().
+        sample_rate (float): Digital sample rate in Sa/s, used to convert times to sample indices.
+
+    Returns:
+        tuple: Same as load_raw_digital_arrays().
+    """
+    if not os.path.isdir(output_dir):
+        return (f"-1 ERROR {output_dir} is not a directory.", [], [], b"", b"")
+    try:
+        channels, transitions = _load_digital(output_dir, sample_rate)
+        transition_counts, sample_indices, channel_states = _flatten_transitions(transitions)
+        return ("Raw digital data loaded", channels, transition_counts, sample_indices, channel_states)
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while loading raw digital data: {e}", [], [], b"", b"")
+
+
+@_instrumented
+def load_binary_analog_waveforms(output_dir):
+    """
+    Reads the analog_N.bin files in output_dir as waveforms LabVIEW can build directly.
+
+    Args:
+        output_dir (str): Directory holding the files written by export_raw_mixed_signal_binary().
+
+    Returns:
+        tuple: (status, channels, sample_counts, t0, dt, samples)
+            status (str): 'Raw analog data loaded' or a '-1 ERROR' string.
+            channels (list): Channel number of each waveform.
+            sample_counts (list): Number of samples of each waveform in the flat buffer.
+            t0 (list): Time of the first sample of each waveform in seconds.
+            dt (list): Time between samples of each waveform in seconds.
+            samples (bytes): All waveforms back to back, little-endian SGL volts.
+    """
+    if not os.path.isdir(output_dir):
+        return (f"-1 ERROR {output_dir} is not a directory.", [], [], [], [], b"")
+    try:
+        channels, t0, dt, waveforms = _load_analog(output_dir)
+        samples = np.concatenate(waveforms) if waveforms else np.empty(0, dtype='<f4')
+        return ("Raw analog data loaded", channels, [int(waveform.size) for waveform in waveforms], t0, dt, samples.tobytes())
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while loading raw analog data: {e}", [], [], [], [], b"")
+
+
+def _analog_source(source):
+    """
+    Accepts the output_dir of export_raw_mixed_signal() in place of its analog.csv.
+    """
+    csv_path = os.path.join(source, 'analog.csv')
+    if os.path.isdir(source) and not _binary_export_files(source, 'analog') and os.path.isfile(csv_path):
+        return csv_path
+    return source
+
+
+def _reduce_blocks(samples, block, reducer):
+    """
+    Applies reducer to the rows of samples viewed as blocks of block samples, the last partial block included,
+    without copying the samples (memory-mapped waveforms stay on disk until read).
+    """
+    full_blocks = samples.size // block
+    parts = [reducer(samples[:full_blocks * block].reshape(full_blocks, block))] if full_blocks else []
+    if samples.size % block:
+        parts.append(reducer(samples[full_blocks * block:].reshape(1, -1)))
+    return np.concatenate(parts) if parts else np.empty(0)
+
+
+def _min_max_envelope(blocks):
+    """
+    Returns the minimum and maximum of every block, in the order they occur, so a glitch of a single sample
+    survives any decimation factor.
+    """
+    minimum_at, maximum_at = blocks.argmin(axis=1), blocks.argmax(axis=1)
+    minimum = np.take_along_axis(blocks, minimum_at[:, None], axis=1)[:, 0]
+    maximum = np.take_along_axis(blocks, maximum_at[:, None], axis=1)[:, 0]
+    minimum_first = minimum_at <= maximum_at
+    return np.column_stack((np.where(minimum_first, minimum, maximum), np.where(minimum_first, maximum, minimum))).ravel()
+
+
+def _moving_average(samples, length):
+    """
+    Boxcar average over length samples through a cumulative sum, returning only the fully averaged samples.
+    """
+    sums = np.cumsum(np.concatenate(([0.0], np.asarray(samples, dtype=np.float64))))
+    return (sums[length:] - sums[:-length]) / length
+
+
+def _decimate_waveform(samples, t0, dt, method, target_points, anti_alias):
+    """
+    Reduces one waveform to about target_points samples. Returns (Y as float32, t0, dt).
+    """
+    method = method.strip().lower()
+    if method not in ('minmax', 'average', 'subsample'):
+        raise ValueError(f"Unknown method '{method}', expected 'minmax', 'average' or 'subsample'")
+    points_per_block = 2 if method == 'minmax' else 1
+    block = max(1, -(-samples.size * points_per_block // target_points)) if target_points > 0 else 1
+    if block == 1:
+        return np.asarray(samples, dtype=np.float32), t0, dt
+
+    if method == 'minmax':
+        # Two points per block at half the block spacing, anti-aliasing would smooth away the glitches it keeps
+        return _reduce_blocks(samples, block, _min_max_envelope).astype(np.float32), t0, dt * block / 2
+
+    if method == 'average':
+        reduce_span = lambda span: _reduce_blocks(span, block, lambda blocks: blocks.mean(axis=1))
+        t0 += (block - 1) * dt / 2
+    else:
+        reduce_span = lambda span: span[::block]
+    if not (anti_alias and samples.size >= 2 * block):
+        return np.asarray(reduce_span(samples), dtype=np.float32), t0, dt * block
+
+    # Two cascaded moving averages over one block (a sinc^2 low-pass with nulls at the new sample rate's multiples);
+    # each pass drops block - 1 samples and delays the waveform by half of that
+    return np.concatenate(list(_anti_alias_spans(samples, block, reduce_span))).astype(np.float32), t0 + (block - 1) * dt, dt * block
+
+
+def _anti_alias_spans(samples, block, reduce_span):
+    """
+    Yields reduce_span() of the anti-alias filtered waveform, DECIMATION_FILTER_SPAN samples at a time.
+    Every span is filtered with the 2 * (block - 1) samples after it, so the spans join without a seam,
+    and starts on a block boundary of the filtered waveform.
+    """
+    overlap = 2 * (block - 1)
+    filtered_size = samples.size - overlap
+    span = block * max(1, DECIMATION_FILTER_SPAN // block)
+    for start in range(0, filtered_size, span):
+        stop = min(start + span, filtered_size)
+        yield reduce_span(_moving_average(_moving_average(samples[start:stop + overlap], block), block))
+
+
+@_instrumented
+def decimate_analog_waveforms(source, method, target_points, anti_alias):
+    """
+    Reads exported analog data and reduces every channel to about target_points samples for a front panel graph.
+
+    Args:
+        source (str): The output_dir of export_raw_mixed_signal(), an analog.csv file, or a directory of analog_N.bin
+            files from export_raw_mixed_signal_binary() (read memory-mapped, so any capture length fits).
+        method (str): 'minmax' for the minimum and maximum of every block (keeps glitches, the usual choice for plots),
+            'average' for the mean of every block, or 'subsample' for every n-th sample.
+        target_points (int): Approximate number of samples per channel to return, 0 or less returns all samples.
+        anti_alias (bool): Low-pass filter the waveform before 'average' or 'subsample' decimation.
+
+    Returns:
+        tuple: (status, channels, sample_counts, t0, dt, samples) with the layout of load_binary_analog_waveforms().
+    """
+    try:
+        channels, t0_list, dt_list, waveforms = _load_analog(_analog_source(source))
+        results = [_decimate_waveform(waveform, t0, dt, method, int(target_points), anti_alias)
+                   for waveform, t0, dt in zip(waveforms, t0_list, dt_list)]
+        samples = np.concatenate([y for y, _, _ in results]) if results else np.empty(0, dtype=np.float32)
+        return ("Analog waveforms decimated", channels, [int(y.size) for y, _, _ in results],
+                [float(t0) for _, t0, _ in results], [float(dt) for _, _, dt in results], samples.astype('<f4', copy=False).tobytes())
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while decimating analog data: {e}", [], [], [], [], b"")
+
+
+archive_manifest_lock = threading.Lock() # Serializes manifest updates of archives written by several jobs
+
+
+def _read_archive_manifest(archive_dir):
+    manifest_path = os.path.join(archive_dir, ARCHIVE_MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return {'version': 1, 'tables': {}}
+    with open(manifest_path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def _write_archive_table(archive_dir, name, table):
+    """
+    Adds or replaces one table in the archive manifest. The manifest is replaced in one step, so readers
+    never see a table whose chunks are still being written. Only a table of the same source file is replaced.
+    Returns the entry it replaced, or None.
+    """
+    with archive_manifest_lock:
+        manifest = _read_archive_manifest(archive_dir)
+        previous = manifest['tables'].get(name)
+        if previous is not None and os.path.normcase(previous['source']) != os.path.normcase(table['source']):
+            raise ValueError(f"The archive table '{name}' already holds {previous['source']}")
+        manifest['tables'][name] = table
+        temporary_path = os.path.join(archive_dir, ARCHIVE_MANIFEST + '.tmp')
+        with open(temporary_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(temporary_path, os.path.join(archive_dir, ARCHIVE_MANIFEST))
+    return previous
+
+
+def _remove_archive_chunks(archive_dir, chunks):
+    """
+    Deletes chunk files no manifest entry refers to any more. A file that cannot be deleted is left behind,
+    it only costs disk space.
+    """
+    for chunk in chunks:
+        try:
+            os.remove(os.path.join(archive_dir, chunk['file']))
+        except OSError:
+            pass
+
+
+def _csv_chunks(csv_path, kind, chunk_rows):
+    """
+    Yields (times, list of column arrays) for chunk_rows rows at a time of an exported CSV file.
+    Raw exports give uint8 (digital) or float32 (analog) channel columns; analyzer tables keep every column
+    as text, with the start_time column parsed for the time index.
+    """
+    if kind in ('digital', 'analog'):
+        reader = RawDataReader(csv_path, chunk_rows, 'rows', 0)
+        try:
+            while True:
+                chunk = reader.next_chunk()
+                if chunk is None:
+                    return
+                times, samples = chunk
+                yield times, [samples[:, column].astype(np.uint8 if kind == 'digital' else np.float32) for column in range(samples.shape[1])]
+        finally:
+            reader.close()
+
+    with open(csv_path, 'r', encoding='utf-8') as csv_file:
+        header = next(csv.reader([csv_file.readline()]))
+        time_column = header.index('start_time')
+        while True:
+            lines = list(itertools.islice(csv_file, chunk_rows))
+            if not lines:
+                return
+            text = np.loadtxt(lines, delimiter=',', dtype=str, quotechar='"', ndmin=2, encoding='utf-8')
+            yield text[:, time_column].astype(np.float64), [text[:, column] for column in range(text.shape[1])]
+
+
+def _archive_table_name(csv_path):
+    """
+    Names the archive table of a CSV file after its export directory and file name, for example 'cycle1/digital',
+    since every raw export directory holds a digital.csv.
+    """
+    csv_path = os.path.abspath(csv_path)
+    return f"{os.path.basename(os.path.dirname(csv_path))}/{os.path.splitext(os.path.basename(csv_path))[0]}"
+
+
+def _archive_csv(csv_path, archive_dir, chunk_rows):
+    """
+    Streams one exported CSV file into the archive as compressed column chunks and records it in the manifest.
+    Returns the manifest entry of its table.
+
+    The chunks of every conversion get names of their own, so an earlier table of the same name stays complete
+    and readable until the manifest is switched to the new chunks. Its chunks are deleted after that.
+    """
+    name = _archive_table_name(csv_path)
+    with open(csv_path, 'r', encoding='utf-8') as csv_file:
+        header = next(csv.reader([csv_file.readline()]))
+    if 'start_time' in header:
+        kind = 'table'
+    elif header and header[0].startswith('Time'):
+        kind = 'analog' if os.path.basename(csv_path).startswith('analog') else 'digital'
+    else:
+        raise ValueError("not a raw data export or analyzer data table")
+
+    table_dir = os.path.join(archive_dir, *name.split('/'))
+    os.makedirs(table_dir, exist_ok=True)
+    write_id = secrets.token_hex(4)
+    chunks, rows, archive_bytes = [], 0, 0
+    try:
+        for times, columns in _csv_chunks(csv_path, kind, chunk_rows):
+            chunk_file = os.path.join(name, f"{write_id}_chunk_{len(chunks):06d}.npz")
+            chunks.append({'file': chunk_file, 'rows': int(times.size),
+                           't_first': float(times.min()) if times.size else None, 't_last': float(times.max()) if times.size else None})
+            np.savez_compressed(os.path.join(archive_dir, chunk_file), time=times,
+                                **{f"column_{index}": column for index, column in enumerate(columns)})
+            archive_bytes += os.path.getsize(os.path.join(archive_dir, chunk_file))
+            rows += int(times.size)
+        table = {'kind': kind, 'source': os.path.abspath(csv_path), 'header': header, 'rows': rows,
+                 'source_bytes': os.path.getsize(csv_path), 'archive_bytes': archive_bytes, 'chunks': chunks}
+        previous = _write_archive_table(archive_dir, name, table)
+    except BaseException:
+        _remove_archive_chunks(archive_dir, chunks) # The manifest still lists the earlier table, if any
+        raise
+    if previous is not None:
+        kept = {chunk['file'] for chunk in chunks}
+        _remove_archive_chunks(archive_dir, [chunk for chunk in previous['chunks'] if chunk['file'] not in kept])
+    return table
+
+
+def _archive_table(manifest, table_name):
+    if table_name not in manifest['tables']:
+        raise ValueError(f"The archive has no table '{table_name}', it has {sorted(manifest['tables'])}")
+    return manifest['tables'][table_name]
+
+
+def _archive_window(archive_dir, table_name, t0, t1, column_indices=None):
+    """
+    Returns (table entry, times, list of column arrays, without the time column of raw exports) of the rows of an archived table with a time in [t0, t1),
+    t1 < 0 meaning the end. Only the chunks overlapping the window, and in them only the time and the columns in
+    column_indices (None for all), are decompressed. For digital tables the last row before t0 is included as well,
+    it holds the channel states at t0.
+    """
+    table = _archive_table(_read_archive_manifest(archive_dir), table_name)
+    end = np.inf if t1 < 0 else t1
+    chunks = [chunk for chunk in table['chunks'] if chunk['rows'] and chunk['t_last'] >= t0 and chunk['t_first'] < end]
+    if table['kind'] == 'digital':
+        before = [chunk for chunk in table['chunks'] if chunk['rows'] and chunk['t_first'] < t0]
+        if before and before[-1] not in chunks:
+            chunks.insert(0, before[-1])
+
+    if column_indices is None:
+        column_indices = range(len(table['header']) - (0 if table['kind'] == 'table' else 1))
+    times, columns = [], [[] for _ in column_indices]
+    for chunk in chunks:
+        with np.load(os.path.join(archive_dir, chunk['file'])) as stored:
+            chunk_times = stored['time']
+            keep = (chunk_times >= t0) & (chunk_times < end)
+            if table['kind'] == 'digital':
+                earlier = np.flatnonzero(chunk_times < t0)
+                if earlier.size:
+                    keep[earlier[-1]] = True
+            times.append(chunk_times[keep])
+            for parts, index in zip(columns, column_indices):
+                parts.append(stored[f"column_{index}"][keep]) # NpzFile only decompresses the members it is asked for
+    times = np.concatenate(times) if times else np.empty(0)
+    columns = [np.concatenate(parts) if parts else np.empty(0) for parts in columns]
+    if table['kind'] == 'digital' and times.size > 1:
+        keep = np.ones(times.size, dtype=bool) # Only the very last row before t0 (an earlier chunk may have added one too)
+        keep[:max(0, int(np.searchsorted(times, t0)) - 1)] = False
+        times, columns = times[keep], [column[keep] for column in columns]
+    return table, times, columns
+
+
+@_instrumented
+def archive_exports(sources, archive_dir, delete_sources, chunk_rows):
+    """
+    Converts exported CSV files into a compressed, time-indexed archive in the background.
+
+    Args:
+        sources (list): CSV files, or directories whose .csv files are all converted (for example an export output_dir).
+        archive_dir (str): Directory of the archive, created if needed. Each file becomes the table
+            '<directory name>/<file name without extension>', which replaces an earlier table of the same file.
+        delete_sources (bool): Delete each CSV file once its table is complete in the archive.
+        chunk_rows (int): Rows per chunk, which bounds the memory used while converting and reading back.
+
+    Returns:
+        str: The archive job handle as a decimal string, for poll_archive_job(), or a '-1 ERROR' string.
+    """
+    try:
+        _require_numpy()
+        if isinstance(sources, str):
+            sources = [sources]
+        csv_paths = []
+        for source in sources:
+            if os.path.isdir(source):
+                csv_paths.extend(sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith('.csv')))
+            else:
+                csv_paths.append(source)
+        names = [_archive_table_name(csv_path) for csv_path in csv_paths]
+        clashes = sorted({name for name in names if names.count(name) > 1})
+        if clashes:
+            return f"-1 ERROR Several sources would become the archive tables {clashes}, archive them separately."
+        os.makedirs(archive_dir, exist_ok=True)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while starting the archive conversion: {e}"
+    return f"{registry.add(ArchiveJob(csv_paths, archive_dir, bool(delete_sources), max(1, int(chunk_rows))))}"
+
+
+@_instrumented
+def poll_archive_job(job_handle):
+    """
+    Reports the progress of archive_exports(), releasing the handle once the job is COMPLETE or ERROR.
+
+    Args:
+        job_handle (int): Handle returned by archive_exports().
+
+    Returns:
+        str: JSON with "state" (RUNNING, COMPLETE or ERROR), "files_done", "files_total", "current", "source_bytes",
+        "archive_bytes", "compression_ratio", "seconds" and "error".
+    """
+    job = registry.get(job_handle, ArchiveJob)
+    if job is None:
+        return _missing_handle(ArchiveJob, job_handle)
+    job_status = job.status()
+    if job_status['state'] != 'RUNNING':
+        registry.remove(job_handle)
+    return json.dumps(job_status)
+
+
+@_instrumented
+def list_archive(archive_dir):
+    """
+    Describes the tables of an archive written by archive_exports().
+
+    Args:
+        archive_dir (str): Directory of the archive.
+
+    Returns:
+        str: JSON object with one entry per table: "kind" ('digital', 'analog' or 'table'), "header", "rows",
+        "source", "source_bytes", "archive_bytes", "chunks", "t_first" and "t_last".
+    """
+    try:
+        manifest = _read_archive_manifest(archive_dir)
+        tables = {}
+        for name, table in manifest['tables'].items():
+            times = [chunk[key] for chunk in table['chunks'] if chunk['rows'] for key in ('t_first', 't_last')]
+            tables[name] = dict({key: table[key] for key in ('kind', 'header', 'rows', 'source', 'source_bytes', 'archive_bytes')},
+                                chunks=len(table['chunks']), t_first=min(times, default=None), t_last=max(times, default=None))
+        return json.dumps(tables)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while reading the archive: {e}"
+
+
+@_instrumented
+def read_archive_window(archive_dir, table_name, channels, t0, t1):
+    """
+    Reads selected channels of an archived raw digital or analog table between two times.
+
+    Args:
+        archive_dir (str): Directory of the archive.
+        table_name (str): Table name, the export directory and CSV file name without extension ('cycle1/digital', ...).
+        channels (list): Channel numbers to read, empty for all.
+        t0 (float): Start of the window in seconds (inclusive).
+        t1 (float): End of the window in seconds (exclusive), negative for the end of the capture.
+
+    Returns:
+        tuple: (status, channels, row_count, times, samples)
+            status (str): 'OK' or a '-1 ERROR' string.
+            channels (list): Channel number of each column in samples.
+            row_count (int): Number of rows. Digital windows start with the last change before t0.
+            times (bytes): Row times in seconds, little-endian DBL.
+            samples (bytes): Row by row, one value per channel: U8 for digital, little-endian SGL for analog.
+    """
+    try:
+        _require_numpy()
+        table = _archive_table(_read_archive_manifest(archive_dir), table_name)
+        if table['kind'] not in ('digital', 'analog'):
+            raise ValueError(f"'{table_name}' is an analyzer table, use restore_archive_csv() for it")
+        table_channels = _channel_numbers(table['header'][1:])
+        selected = [int(channel) for channel in channels] if len(channels) else table_channels
+        missing = [channel for channel in selected if channel not in table_channels]
+        if missing:
+            raise ValueError(f"Channels {missing} are not in the table, it has channels {table_channels}")
+        table, times, columns = _archive_window(archive_dir, table_name, t0, t1, [table_channels.index(channel) for channel in selected])
+        dtype = np.uint8 if table['kind'] == 'digital' else '<f4'
+        samples = np.column_stack(columns) if selected else np.empty((times.size, 0))
+        return ("OK", selected, int(times.size), times.astype('<f8', copy=False).tobytes(), np.ascontiguousarray(samples, dtype=dtype).tobytes())
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while reading the archive: {e}", [], 0, b"", b"")
+
+
+@_instrumented
+def restore_archive_csv(archive_dir, table_name, csv_path, t0, t1):
+    """
+    Writes the rows of an archived table between two times back to a CSV file with the original columns.
+
+    Args:
+        archive_dir (str): Directory of the archive.
+        table_name (str): Table name, the export directory and CSV file name without extension.
+        csv_path (str): CSV file to write.
+        t0 (float): Start of the window in seconds (inclusive).
+        t1 (float): End of the window in seconds (exclusive), negative for the end of the capture.
+
+    Returns:
+        str: The number of rows written, or a '-1 ERROR' string.
+    """
+    try:
+        _require_numpy()
+        table, times, columns = _archive_window(archive_dir, table_name, t0, t1)
+        with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(table['header'])
+            if table['kind'] == 'table':
+                writer.writerows(zip(*[column.tolist() for column in columns]))
+            else:
+                value_format = '%d' if table['kind'] == 'digital' else '%.9g'
+                np.savetxt(csv_file, np.column_stack([times] + columns), delimiter=',',
+                           fmt=['%.12g'] + [value_format] * len(columns))
+        return f"{times.size}"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while restoring the archive table: {e}"
+
+
+def _parse_hex(values):
+    """
+    Converts an array of '0x'-prefixed hex strings of up to 15 digits to int64 without a Python loop: the characters
+    are looked up as a byte matrix and weighted by powers of 16 according to each string's length.
+    Returns None if any string is not plain hex, so the caller can fall back to int(value, 16).
+    """
+    try:
+        characters = values.astype('S')
+    except UnicodeEncodeError:
+        return None
+    width = characters.dtype.itemsize
+    if values.size == 0 or width < 3 or width > 17:
+        return None
+    matrix = np.frombuffer(characters.tobytes(), dtype=np.uint8).reshape(values.size, width)[:, 2:]
+    lengths = np.char.str_len(characters) - 2
+    lookup = np.full(256, 16, dtype=np.int64) # 16 marks a character that is not a hex digit
+    lookup[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+    lookup[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+    lookup[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+    digits = lookup[matrix]
+    positions = np.arange(width - 2)
+    in_string = positions < lengths[:, None]
+    if (lengths < 1).any() or (digits[in_string] == 16).any():
+        return None
+    exponents = np.where(in_string, lengths[:, None] - 1 - positions, 0)
+    return (np.where(in_string, digits, 0) << (4 * exponents)).sum(axis=1)
+
+
+def _convert_table_column(values):
+    """
+    Converts one text column of an analyzer data table: numbers become float64 (NaN where empty),
+    0x-prefixed hex values become int64 (-1 where empty), anything else stays text.
+    """
+    stripped = np.char.strip(values)
+    present = stripped != ''
+    present_values = stripped[present]
+    if present_values.size == 0:
+        return np.full(values.shape, np.nan)
+    hex_prefixed = np.char.startswith(present_values, '0x') | np.char.startswith(present_values, '0X')
+    if hex_prefixed.all():
+        integers = np.full(values.shape, -1, dtype=np.int64)
+        parsed = _parse_hex(present_values)
+        try:
+            integers[present] = parsed if parsed is not None else [int(value, 16) for value in present_values]
+        except (ValueError, OverflowError):
+            return stripped # Not plain hex, or wider than 63 bits
+        return integers
+    if hex_prefixed.any():
+        return stripped
+    try:
+        numbers = np.full(values.shape, np.nan)
+        numbers[present] = present_values.astype(np.float64)
+        return numbers
+    except ValueError:
+        return stripped
+
+
+def _read_data_table(csv_path):
+    """
+    Loads an analyzer data table written by export_data_table() (for example by export_spi_analyzer_table())
+    into a NumPy structured array with one field per column.
+    """
+    _require_numpy()
+    with open(csv_path, 'r', encoding='utf-8') as csv_file:
+        header = next(csv.reader([csv_file.readline()]))
+    text = np.loadtxt(csv_path, delimiter=',', skiprows=1, dtype=str, quotechar='"', ndmin=2, encoding='utf-8')
+    if text.shape[0] == 0:
+        text = np.empty((0, len(header)), dtype=str)
+    columns = [_convert_table_column(text[:, index]) for index in range(len(header))]
+    frames = np.empty(text.shape[0], dtype=[(name, column.dtype) for name, column in zip(header, columns)])
+    for name, column in zip(header, columns):
+        frames[name] = column
+    return frames
+
+
+def _share_array(array):
+    """
+    Copies array into a new named shared memory block and returns its description for the caller:
+    {"name", "dtype", "shape"}. Structured arrays describe their dtype as a list of [field, type] pairs.
+    """
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    with shared_blocks_lock:
+        shared_blocks[block.name] = block
+    return {
+        'name': block.name,
+        'dtype': array.dtype.descr if array.dtype.names else array.dtype.str,
+        'shape': list(array.shape),
+    }
+
+
+@_instrumented
+def share_digital_transitions(source, sample_rate):
+    """
+    Decodes digital transitions and places them in shared memory instead of returning them through the
+    Python Node. Other processes (or LabVIEW, through the OS shared memory API) map the blocks by name.
+
+    Args:
+        source (str): A digital.csv file, or a directory of digital_N.bin files from export_raw_digital_binary().
+        sample_rate (float): Digital sample rate in Sa/s, used to convert times to sample indices.
+
+    Returns:
+        str: JSON with "channels", "transition_counts" and the "sample_indices" (int64) and "states" (uint8)
+        blocks, each described by "name", "dtype" and "shape". Free the blocks with release_shared_block().
+        A '-1 ERROR' string on failure.
+    """
+    try:
+        channels, transitions = _load_digital(source, sample_rate)
+        sample_indices = np.concatenate([indices for indices, _ in transitions] or [np.empty(0, dtype=np.int64)])
+        channel_states = np.concatenate([values for _, values in transitions] or [np.empty(0, dtype=np.uint8)])
+        return json.dumps({
+            'channels': channels,
+            'transition_counts': [int(indices.size) for indices, _ in transitions],
+            'sample_indices': _share_array(sample_indices),
+            'states': _share_array(channel_states),
+        })
+    except Exception as e:
+        return f"-1 ERROR An error occurred while sharing digital data: {e}"
+
+
+@_instrumented
+def share_analog_waveforms(source):
+    """
+    Places analog samples in shared memory, see share_digital_transitions().
+
+    Args:
+        source (str): An analog.csv file, or a directory of analog_N.bin files from export_raw_mixed_signal_binary().
+
+    Returns:
+        str: JSON with "channels", "sample_counts", "t0", "dt" and the "samples" block (float32, all channels
+        back to back). A '-1 ERROR' string on failure.
+    """
+    try:
+        channels, t0, dt, waveforms = _load_analog(source)
+        samples = np.concatenate(waveforms).astype(np.float32, copy=False) if waveforms else np.empty(0, dtype=np.float32)
+        return json.dumps({
+            'channels': channels,
+            'sample_counts': [int(waveform.size) for waveform in waveforms],
+            't0': t0,
+            'dt': dt,
+            'samples': _share_array(samples),
+        })
+    except Exception as e:
+        return f"-1 ERROR An error occurred while sharing analog data: {e}"
+
+
+@_instrumented
+def share_analyzer_table(csv_path):
+    """
+    Places the frames of an exported analyzer data table in shared memory as one structured array,
+    see share_digital_transitions().
+
+    Args:
+        csv_path (str): Data table CSV written by export_spi_analyzer_table().
+
+    Returns:
+        str: JSON with the "frames" block, whose dtype lists one [column, type] pair per table column.
+        A '-1 ERROR' string on failure.
+    """
+    try:
+        return json.dumps({'frames': _share_array(_read_data_table(csv_path))})
+    except Exception as e:
+        return f"-1 ERROR An error occurred while sharing analyzer data: {e}"
+
+
+@_instrumented
+def release_shared_block(block_name):
+    """
+    Frees a shared memory block handed out by one of the share_* functions. Processes that still have it
+    mapped keep their view until they close it.
+
+    Args:
+        block_name (str): The "name" of the block.
+    """
+    with shared_blocks_lock:
+        block = shared_blocks.pop(block_name, None)
+    if block is None:
+        return f"-1 ERROR Shared memory block {block_name} does not exist."
+    try:
+        block.close()
+        block.unlink()
+    except Exception as e:
+        return f"-1 ERROR An error occurred while releasing the shared memory block: {e}"
+    return "Shared memory block released"
+
+
+@_instrumented
+def release_all_shared_blocks():
+    """
+    Frees every shared memory block handed out by the share_* functions.
+    """
+    with shared_blocks_lock:
+        block_names = list(shared_blocks)
+    for block_name in block_names:
+        release_status = release_shared_block(block_name)
+        if release_status.startswith('-1 ERROR'):
+            return release_status
+    return "Shared memory blocks released"
+
 
-def open_connection(ip_address, selected_port):
+@_instrumented
+def open_analyzer_table(csv_path):
     """
-    Opens a connection to the Logic 2 application.
+    Loads an analyzer data table for query_analyzer_frames() and analyzer_table_statistics().
 
     Args:
-        ip_address (str): IP Address for the connection.
-        selected_port (int): Port number for the connection.
+        csv_path (str): Data table CSV written by export_spi_analyzer_table() or export_data_table().
+
+    Returns:
+        str: The table handle as a decimal string, or a '-1 ERROR' string.
     """
-    global manager
     try:
-        manager = automation.Manager.connect(port=selected_port, address=ip_address)
-        # Additional initialization steps can be added here
+        table = AnalyzerTable(csv_path)
     except Exception as e:
-        return f"-1 ERROR An error occurred while opening the connection: {e}"
-    return 'Connection Successful'
+        return f"-1 ERROR An error occurred while loading the analyzer table: {e}"
+    return f"{registry.add(table)}"
 
-def device_config(enabled_digital_channels, digital_sample_rate, digital_threshold_volts, enabled_analog_channels, analog_sample_rate):
+
+@_instrumented
+def query_analyzer_frames(table_handle, t0, t1, transaction):
     """
-    Configures the capturing device using an established connection.
+    Returns the frames of a loaded analyzer table that start between t0 and t1.
 
     Args:
-        enable_digital_channels (list): List of digital channels to enable.
-        digital_sample_rate (int): Sampling rate in MSa/s.
-        digital_threshold_volts (float): Logic level threshold in volts, rounded to 1 decimal place.
+        table_handle (int): Handle returned by open_analyzer_table().
+        t0 (float): Start of the range in seconds (inclusive).
+        t1 (float): End of the range in seconds (exclusive), negative for the end of the capture.
+        transaction (int): Only the frames of this transaction (Enable or start/stop group), -1 for all frames.
+
+    Returns:
+        tuple: (status, value_columns, type_names, start_times, durations, type_codes, transactions, values)
+            status (str): 'OK' or a '-1 ERROR' string.
+            value_columns (list): Names of the numeric data columns, for example ['mosi', 'miso'].
+            type_names (list): Frame type names, indexed by type_codes.
+            start_times, durations: Little-endian DBL per frame, in seconds.
+            type_codes: U8 per frame.
+            transactions: Little-endian I64 transaction number per frame, -1 outside any transaction.
+            values: Little-endian I64, one value per data column per frame, -1 where the frame has none.
     """
-    global manager, device_configuration
-    if manager is None:
-        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    table = registry.get(table_handle, AnalyzerTable)
+    if table is None:
+        return (_missing_handle(AnalyzerTable, table_handle), [], [], b"", b"", b"", b"", b"")
 
     try:
-        # Device configuration
-        device_configuration = automation.LogicDeviceConfiguration(
-            enabled_analog_channels = enabled_analog_channels,
-            enabled_digital_channels = enabled_digital_channels,
-            analog_sample_rate = analog_sample_rate,
-            digital_sample_rate = digital_sample_rate,
-            digital_threshold_volts=round(digital_threshold_volts, 1),
-        )
+        first, stop = table.frame_range(t0, t1, int(transaction))
+        return ("OK", table.value_columns, [str(name) for name in table.type_names],
+                table.start_times[first:stop].astype('<f8', copy=False).tobytes(),
+                table.durations[first:stop].astype('<f8', copy=False).tobytes(),
+                table.type_codes[first:stop].tobytes(),
+                table.transactions[first:stop].astype('<i8', copy=False).tobytes(),
+                table.values[first:stop].astype('<i8', copy=False).tobytes())
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while querying the analyzer table: {e}", [], [], b"", b"", b"", b"", b"")
+
+
+@_instrumented
+def analyzer_table_statistics(table_handle):
+    """
+    Summarizes a loaded analyzer table.
+
+    Args:
+        table_handle (int): Handle returned by open_analyzer_table().
 
+    Returns:
+        str: JSON with the frame counts per type, data frames per second, a 256-bin histogram of every data column,
+        the distribution of the gaps between data frames, and the number, size and duration of the transactions.
+    """
+    table = registry.get(table_handle, AnalyzerTable)
+    if table is None:
+        return _missing_handle(AnalyzerTable, table_handle)
+    try:
+        with table.lock:
+            return json.dumps(table.statistics())
     except Exception as e:
-        return f"-1 ERROR An error occurred while configuring the device: {e}"
-    return 'Device Configuration Successful'
+        return f"-1 ERROR An error occurred while computing the analyzer table statistics: {e}"
 
 
-def capture_duration_config(capture_duration):
+@_instrumented
+def close_analyzer_table(table_handle):
     """
-    Configures the capture, in this example it is a capture of finite duration in seconds.
+    Releases a table loaded by open_analyzer_table().
 
     Args:
-        capture_duration (float): Duration of the capture in seconds.
+        table_handle (int): Handle returned by open_analyzer_table().
     """
-    global manager, capture_configuration
-    if manager is None:
-        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    if registry.remove(table_handle, AnalyzerTable) is None:
+        return _missing_handle(AnalyzerTable, table_handle)
+    return "Analyzer table closed"
+
+
+def _digital_source(source):
+    """
+    Accepts the output_dir of export_raw_digital() or export_raw_mixed_signal() in place of its digital.csv.
+    """
+    csv_path = os.path.join(source, 'digital.csv')
+    if os.path.isdir(source) and not _binary_export_files(source, 'digital') and os.path.isfile(csv_path):
+        return csv_path
+    return source
+
+
+def _load_transition_index(source):
+    """
+    Returns the TransitionIndex of a digital export, from its index file if that is current, otherwise built and saved.
+    """
+    _require_numpy()
+    source = _digital_source(source)
+    index_path = _transition_index_path(source)
+    signature = _source_signature(source)
+    index = TransitionIndex.load(index_path, signature)
+    if index is None:
+        index = _build_transition_index(source)
+        index.save(index_path, signature)
+    return index
+
+
+def _transition_index_path(source):
+    """
+    Returns where the index of source is kept: 'digital.csv.index.npz' next to a CSV export,
+    'digital_index.npz' inside a directory of digital_N.bin files.
+    """
+    if os.path.isdir(source):
+        return os.path.join(source, 'digital_index.npz')
+    return source + '.index.npz'
+
+
+def _source_signature(source):
+    """
+    Returns (total size, newest modification time) of the export files, to tell whether an index is still current.
+    """
+    if os.path.isdir(source):
+        paths = [bin_path for _, bin_path in _binary_export_files(source, 'digital')]
+    else:
+        paths = [source]
+    stats = [os.stat(path) for path in paths]
+    return (sum(stat.st_size for stat in stats), max((stat.st_mtime for stat in stats), default=0.0))
+
+
+def _build_transition_index(source):
+    """
+    Builds a TransitionIndex from a digital.csv, read in chunks so memory stays bounded, or from digital_N.bin files.
+    """
+    if os.path.isdir(source):
+        channels, initial_states, channel_times, begin_time, end_time = [], [], [], None, None
+        for channel, bin_path in _binary_export_files(source, 'digital'):
+            digital = read_binary_digital(bin_path)
+            channels.append(channel)
+            initial_states.append(digital['initial_state'])
+            channel_times.append(np.array(digital['transition_times'], dtype=np.float64))
+            begin_time = digital['begin_time'] if begin_time is None else min(begin_time, digital['begin_time'])
+            end_time = digital['end_time'] if end_time is None else max(end_time, digital['end_time'])
+        begin_time, end_time = begin_time or 0.0, end_time or 0.0
+    else:
+        reader = RawDataReader(source, 1000000, 'rows', 0)
+        try:
+            channels = reader.channels
+            channel_times = [[] for _ in channels]
+            initial_states, previous_states, begin_time, end_time = None, None, 0.0, 0.0
+            while True:
+                chunk = reader.next_chunk()
+                if chunk is None:
+                    break
+                times, states = chunk
+                states = states.astype(np.uint8)
+                if previous_states is None:
+                    initial_states, begin_time = states[0], float(times[0])
+                    previous_states = states[0]
+                rows = np.vstack((previous_states, states))
+                for column in range(len(channels)):
+                    change_rows = np.flatnonzero(rows[1:, column] != rows[:-1, column])
+                    channel_times[column].append(times[change_rows])
+                previous_states, end_time = states[-1], float(times[-1])
+        finally:
+            reader.close()
+        initial_states = initial_states if initial_states is not None else np.zeros(len(channels), dtype=np.uint8)
+        channel_times = [np.concatenate(parts) if parts else np.empty(0) for parts in channel_times]
+
+    offsets = np.concatenate(([0], np.cumsum([times.size for times in channel_times]))).astype(np.int64)
+    times = np.concatenate(channel_times) if channel_times else np.empty(0)
+    return TransitionIndex(channels, initial_states, offsets, times, begin_time, end_time)
+
 
+@_instrumented
+def build_transition_index(source, rebuild):
+    """
+    Builds the transition index of a digital export and stores it next to the export.
+
+    Args:
+        source (str): A digital.csv file, the output_dir it was exported to, or a directory of digital_N.bin files
+            from export_raw_digital_binary().
+        rebuild (bool): Build it again even if a current index exists.
+
+    Returns:
+        str: The path of the index file, or a '-1 ERROR' string.
+    """
     try:
-        # Record N seconds of data before stopping the capture
-        capture_configuration = automation.CaptureConfiguration(
-        capture_mode=automation.TimedCaptureMode(duration_seconds=capture_duration)
-        )
+        _require_numpy()
+        source = _digital_source(source)
+        index_path = _transition_index_path(source)
+        signature = _source_signature(source)
+        if rebuild or TransitionIndex.load(index_path, signature) is None:
+            _build_transition_index(source).save(index_path, signature)
+        return index_path
+    except Exception as e:
+        return f"-1 ERROR An error occurred while building the transition index: {e}"
 
+
+@_instrumented
+def open_transition_index(source):
+    """
+    Loads the transition index of a digital export, building it first if it is missing or out of date.
+
+    Args:
+        source (str): A digital.csv file, the output_dir it was exported to, or a directory of digital_N.bin files
+            from export_raw_digital_binary().
+
+    Returns:
+        str: The index handle as a decimal string, or a '-1 ERROR' string.
+    """
+    try:
+        index = _load_transition_index(source)
     except Exception as e:
-        return f"-1 ERROR An error occurred while configuring the capture: {e}"
-    return 'Capture Configured Successfully'
+        return f"-1 ERROR An error occurred while opening the transition index: {e}"
+    return f"{registry.add(index)}"
 
 
-def get_list_of_devices(include_simulation_devices):
+@_instrumented
+def digital_state_at(index_handle, channel, time_seconds):
     """
-    Returns a list of Saleae devices.
+    Returns the state of a channel at a time, as '0' or '1'.
 
     Args:
-        include_simulation_devices (bool): If True, the return value will also include simulation devices. This can be useful for testing without a physical device
+        index_handle (int): Handle returned by open_transition_index().
+        channel (int): Digital channel number.
+        time_seconds (float): Time in seconds, on the capture time axis.
+    """
+    index = registry.get(index_handle, TransitionIndex)
+    if index is None:
+        return _missing_handle(TransitionIndex, index_handle)
+    try:
+        return f"{index.state_at(int(channel), time_seconds)}"
+    except Exception as e:
+        return f"-1 ERROR An error occurred while querying the transition index: {e}"
 
+
+@_instrumented
+def digital_edges_between(index_handle, channel, t0, t1):
     """
-    global manager, capture_configuration
-    if manager is None:
-        return "-1 ERROR Manager is not connected. Please establish a connection first."
-    
-    # Setup DeviceType is an enum
-    class DeviceType(Enum):
-        LOGIC = 1
-        LOGIC_4 = 2
-        LOGIC_8 = 3
-        LOGIC_16 = 4
-        LOGIC_PRO_8 = 5
-        LOGIC_PRO_16 = 6
-
-    # Setup DeviceDesc is a class
-    class DeviceDesc:
-        def __init__(self, device_id, device_type, is_simulation):
-            self.device_id = device_id
-            self.device_type = device_type
-            self.is_simulation = is_simulation
-
-    def to_dict(self):
-        return {
-            "device_id": self.device_id,
-            "device_type": self.device_type.name,
-            "is_simulation": self.is_simulation
-        }
+    Returns the transitions of a channel between two times.
+
+    Args:
+        index_handle (int): Handle returned by open_transition_index().
+        channel (int): Digital channel number.
+        t0 (float): Start of the range in seconds (inclusive).
+        t1 (float): End of the range in seconds (exclusive).
 
-  
+    Returns:
+        tuple: (status, count, times, states)
+            status (str): 'OK' or a '-1 ERROR' string.
+            count (int): Number of transitions.
+            times (bytes): Transition times in seconds, little-endian DBL.
+            states (bytes): State after each transition, U8.
+    """
+    index = registry.get(index_handle, TransitionIndex)
+    if index is None:
+        return (_missing_handle(TransitionIndex, index_handle), 0, b"", b"")
     try:
-        # 
-        list_of_devices = manager.get_devices(
-            include_simulation_devices = include_simulation_devices
-        )
+        times, states = index.edges(int(channel), t0, t1)
+        return ("OK", int(times.size), times.astype('<f8', copy=False).tobytes(), states.tobytes())
+    except Exception as e:
+        return (f"-1 ERROR An error occurred while querying the transition index: {e}", 0, b"", b"")
 
-        # Function to convert DeviceDesc object to a dictionary
-        def device_desc_to_dict(device):
-            return {
-                "device_id": device.device_id,
-                "device_type": device.device_type.name if isinstance(device.device_type, Enum) else device.device_type,
-                "is_simulation": device.is_simulation
-            }
 
-        # Convert each DeviceDesc object to a dictionary
-        devices_dict = [device_desc_to_dict(device) for device in list_of_devices]
+@_instrumented
+def digital_pulse_at(index_handle, channel, time_seconds):
+    """
+    Returns the pulse (the level between two transitions) a channel is in at a time.
+
+    Args:
+        index_handle (int): Handle returned by open_transition_index().
+        channel (int): Digital channel number.
+        time_seconds (float): Time in seconds, on the capture time axis.
+
+    Returns:
+        str: JSON with "state", "start" and "end" in seconds and "width_seconds". Before the first and after
+        the last transition the capture begin and end are used, and "complete" is false.
+    """
+    index = registry.get(index_handle, TransitionIndex)
+    if index is None:
+        return _missing_handle(TransitionIndex, index_handle)
+    try:
+        state, start, end = index.pulse_at(int(channel), time_seconds)
+        _, times = index.channel_times(int(channel))
+        complete = times.size > 0 and times[0] <= start and end <= times[-1]
+        return json.dumps({'state': state, 'start': start, 'end': end, 'width_seconds': end - start, 'complete': bool(complete)})
+    except Exception as e:
+        return f"-1 ERROR An error occurred while querying the transition index: {e}"
+
 
-        # Convert the list of dictionaries to JSON
-        json_list_of_devices = json.dumps(devices_dict)
+@_instrumented
+def digital_frequency_between(index_handle, channel, t0, t1):
+    """
+    Measures the frequency of a channel from its rising edges between two times.
 
-        return f"{json_list_of_devices}"
+    Args:
+        index_handle (int): Handle returned by open_transition_index().
+        channel (int): Digital channel number.
+        t0 (float): Start of the range in seconds (inclusive).
+        t1 (float): End of the range in seconds (exclusive).
 
+    Returns:
+        str: JSON with "rising_edges", "frequency_hz" and "period_seconds" (0 with fewer than two rising edges).
+    """
+    index = registry.get(index_handle, TransitionIndex)
+    if index is None:
+        return _missing_handle(TransitionIndex, index_handle)
+    try:
+        times, states = index.edges(int(channel), t0, t1)
+        rising = times[states == 1]
+        period = float(rising[-1] - rising[0]) / (rising.size - 1) if rising.size > 1 else 0.0
+        return json.dumps({'rising_edges': int(rising.size), 'frequency_hz': 1.0 / period if period > 0 else 0.0, 'period_seconds': period})
     except Exception as e:
-        return f"-1 ERROR An error occurred while retrieving the list of devices: {e}"
+        return f"-1 ERROR An error occurred while querying the transition index: {e}"
 
 
-def start_capture(device_id):
+@_instrumented
+def close_transition_index(index_handle):
     """
-    Starts a capture session using the given configurations.
+    Releases an index loaded by open_transition_index().
 
     Args:
-        device_id (str): ID of the device to capture from.
-        device_configuration: Configuration settings for the device.
-        capture_configuration: Configuration settings for the capture.
+        index_handle (int): Handle returned by open_transition_index().
     """
-    global manager, capture, device_configuration, capture_configuration
-    if manager is None:
-        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    if registry.remove(index_handle, TransitionIndex) is None:
+        return _missing_handle(TransitionIndex, index_handle)
+    return "Transition index closed"
 
-    try:
-        temp_capture = manager.start_capture(
-            device_id=device_id,
-            device_configuration=device_configuration,
-            capture_configuration=capture_configuration)
 
-        temp_capture.wait()
-        capture = temp_capture  # Assign to global variable
-        return "Capture started successfully"
-    except Exception as e:
-        return f"-1 ERROR An error occurred while starting the capture: {e}"
+def _measure_channel(initial_state, times, glitch_seconds, reference_rising):
+    """
+    Returns the DIGITAL_MEASUREMENTS of one channel from its sorted transition times, NaN where one does not apply.
+    Only complete pulses (between two transitions) are measured.
+    """
+    nan = float('nan')
+    states = (initial_state ^ ((np.arange(times.size) + 1) & 1)).astype(np.uint8) # State after each transition
+    rising = times[states == 1]
+    widths = np.diff(times)
+    levels = states[:-1] # Level held during each complete pulse
+    high, low = widths[levels == 1], widths[levels == 0]
+    periods = np.diff(rising)
 
+    duty_cycle = nan
+    if rising.size > 1:
+        in_periods = (times[:-1] >= rising[0]) & (times[1:] <= rising[-1])
+        duty_cycle = float(widths[in_periods & (levels == 1)].sum() / (rising[-1] - rising[0]))
 
+    skew = np.empty(0)
+    if reference_rising is not None and reference_rising.size and rising.size:
+        after = np.clip(np.searchsorted(reference_rising, rising), 0, reference_rising.size - 1)
+        before = np.clip(after - 1, 0, reference_rising.size - 1)
+        to_after, to_before = rising - reference_rising[after], rising - reference_rising[before]
+        skew = np.where(np.abs(to_after) < np.abs(to_before), to_after, to_before) # Offset to the nearest reference edge
 
+    def stat(values, function):
+        return float(function(values)) if values.size else nan
 
-def add_spi_analyzer(label, mosi, miso, clock, enable, bits_per_transfer):
+    return [
+        float(times.size), float(rising.size),
+        1.0 / periods.mean() if periods.size and periods.mean() > 0 else nan,
+        stat(periods, np.mean), stat(periods, np.min), stat(periods, np.max), float(periods.std(ddof=1)) if periods.size > 1 else nan,
+        duty_cycle,
+        stat(high, np.min), stat(high, np.max), stat(low, np.min), stat(low, np.max),
+        float((widths < glitch_seconds).sum()),
+        stat(skew, np.mean), stat(skew, np.min), stat(skew, np.max),
+    ]
+
+
+def _measurement_table(channels, values):
     """
-    Adds an SPI analyzer to the capture session.
+    Returns a measurement table as a JSON-ready dict, with None in place of NaN.
+    """
+    return {
+        'columns': DIGITAL_MEASUREMENTS,
+        'channels': [int(channel) for channel in channels],
+        'values': [[None if np.isnan(value) else float(value) for value in row] for row in values],
+    }
+
+
+@_instrumented
+def measure_digital(source, glitch_seconds, reference_channel, accumulator_handle):
+    """
+    Measures every channel of a digital export in one call (see DIGITAL_MEASUREMENTS).
 
     Args:
-        label (str): Label for the analyzer.
-        miso (int): MISO channel number.
-        clock (int): Clock channel number.
-        enable (int): Enable channel number.
-        bits_per_transfer (str): Number of bits per transfer.
+        source (str): The output_dir of export_raw_digital() or export_raw_mixed_signal(), a digital.csv file,
+            or a directory of digital_N.bin files. The transition index of the export is used (and built if needed).
+        glitch_seconds (float): Pulses shorter than this count as glitches.
+        reference_channel (int): Channel the skew is measured against, -1 for no skew measurement.
+        accumulator_handle (int): Handle from open_measurement_accumulator() to add the results to, 0 for none.
+
+    Returns:
+        str: JSON table with "columns" (the measurement names), "channels", and "values", one row per channel
+        in the order of "columns", null where a measurement does not apply (for example no complete period).
     """
-    global capture, spi_analyzer
-    if capture is None:
-        return "-1 ERROR Capture session is not valid. Please start a capture first."
+    try:
+        accumulator = None
+        if accumulator_handle > 0:
+            accumulator = registry.get(accumulator_handle, MeasurementAccumulator)
+            if accumulator is None:
+                return _missing_handle(MeasurementAccumulator, accumulator_handle)
+        index = _load_transition_index(source)
+        reference_rising = None
+        if reference_channel >= 0:
+            initial_state, times = index.channel_times(int(reference_channel))
+            reference_rising = times[(initial_state ^ ((np.arange(times.size) + 1) & 1)) == 1]
+        values = np.array([_measure_channel(*index.channel_times(channel), glitch_seconds, reference_rising)
+                           for channel in index.channels]).reshape(len(index.channels), len(DIGITAL_MEASUREMENTS))
+        if accumulator is not None:
+            accumulator.add(index.channels, values)
+        return json.dumps(_measurement_table(index.channels, values))
+    except Exception as e:
+        return f"-1 ERROR An error occurred while measuring the digital channels: {e}"
 
+
+@_instrumented
+def open_measurement_accumulator():
+    """
+    Creates an accumulator for measure_digital() statistics over many captures.
+
+    Returns:
+        str: The accumulator handle as a decimal string, or a '-1 ERROR' string.
+    """
     try:
-        spi_analyzer = capture.add_analyzer('SPI', label=label, settings={
-            'MOSI': mosi,
-            'MISO': miso,
-            'Clock': clock,
-            'Enable': enable,
-            'Bits per Transfer': bits_per_transfer
-        })
-        return "SPI analyzer added successfully."
+        _require_numpy()
     except Exception as e:
-        return f"-1 ERROR An error occurred while adding the SPI analyzer: {e}"
+        return f"-1 ERROR {e}"
+    return f"{registry.add(MeasurementAccumulator())}"
 
 
-def export_raw_digital(output_dir, digital_channels):
+@_instrumented
+def get_accumulated_measurements(accumulator_handle):
     """
-    Exports the raw digital capture to a CSV file.
+    Returns the long-run statistics of an accumulator.
 
     Args:
-        output_dir (str): File path and file name for the output CSV file.
-        digital_channels (list): List of channels to be exported.
-    """
-    global capture
-    if capture is None:
-        return "-1 ERROR Capture no longer exists. Please capture data first."
+        accumulator_handle (int): Handle returned by open_measurement_accumulator().
 
+    Returns:
+        str: JSON with "captures" and one measure_digital() style table for each of "count", "mean", "std", "min" and "max".
+    """
+    accumulator = registry.get(accumulator_handle, MeasurementAccumulator)
+    if accumulator is None:
+        return _missing_handle(MeasurementAccumulator, accumulator_handle)
     try:
-           # Export raw digital data to a CSV file
-        capture.export_raw_data_csv(directory=output_dir, digital_channels=digital_channels)
-        return "Raw digital data successfully exported to CSV file"
+        summary = {name: _measurement_table(*table) for name, table in accumulator.summary().items()}
+        return json.dumps(dict(captures=accumulator.captures, **summary))
     except Exception as e:
-        return f"-1 ERROR An error occurred while exporting raw digital data to CSV: {e}"
-    
-def export_raw_mixed_signal(output_dir, digital_channels, analog_channels, analog_downsample_ratio):
+        return f"-1 ERROR An error occurred while reading the accumulated measurements: {e}"
+
+
+@_instrumented
+def close_measurement_accumulator(accumulator_handle):
     """
-    Exports the raw digital capture to a CSV file.
+    Releases an accumulator created by open_measurement_accumulator().
 
     Args:
-        output_dir (str): File path and file name for the output CSV file.
-        digital_channels (list): List of channels to be exported.
+        accumulator_handle (int): Handle returned by open_measurement_accumulator().
     """
-    global capture
-    if capture is None:
-        return "-1 ERROR Capture no longer exists. Please capture data first."
+    if registry.remove(accumulator_handle, MeasurementAccumulator) is None:
+        return _missing_handle(MeasurementAccumulator, accumulator_handle)
+    return "Measurement accumulator closed"
+
+
+@_instrumented
+def set_automation_module(module_name):
+    """
+    Replaces the automation API used by this module, for example with a local stub of Logic 2 for testing.
+    Sessions opened before the switch keep the manager they were opened with.
 
+    Args:
+        module_name (str): Importable module providing the saleae.automation names (Manager, LogicDeviceConfiguration, ...).
+    """
+    global automation
     try:
-           # Export raw digital data to a CSV file
-        capture.export_raw_data_csv(directory=output_dir, digital_channels=digital_channels, analog_channels=analog_channels, analog_downsample_ratio = analog_downsample_ratio)
-        return "Raw digital data successfully exported to CSV file"
+        automation = importlib.import_module(module_name)
     except Exception as e:
-        return f"-1 ERROR An error occurred while exporting raw digital data to CSV: {e}"
-    
+        return f"-1 ERROR An error occurred while loading the automation module: {e}"
+    return f"Using automation module {module_name}"
 
-def export_spi_analyzer_table(output_dir):
+
+def _python_executable():
     """
-    Export the data from the analyzer to a CSV file.
+    Returns the Python interpreter to start the worker with. Inside LabVIEW sys.executable can be LabVIEW itself,
+    so fall back to the interpreter of the Python environment LabVIEW loaded.
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for name in ('python.exe', 'python3', 'python'):
+        for directory in (sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')):
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return sys.executable
+
+
+def _worker_key_path(port):
+    return os.path.join(WORKER_KEY_DIR, f"worker_{port}.key")
+
+
+def _save_worker_key(port, authkey):
+    """
+    Writes the key of a worker to a file only the current user can read, so later Python sessions
+    (a new LabVIEW run) can connect_worker() to the worker without being given the key.
+    """
+    os.makedirs(WORKER_KEY_DIR, mode=0o700, exist_ok=True)
+    key_path = _worker_key_path(port)
+    temporary_path = key_path + '.tmp'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path) # os.open() only applies the permissions to a file it creates
+    with os.fdopen(os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as key_file:
+        key_file.write(authkey.hex())
+    os.replace(temporary_path, key_path)
+
+
+def _load_worker_key(port):
+    """
+    Returns the key start_worker() saved for the worker on port, or None.
+    """
+    try:
+        with open(_worker_key_path(port), 'r') as key_file:
+            return bytes.fromhex(key_file.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _port_in_use(port):
+    try:
+        socket.create_connection((WORKER_ADDRESS, port), timeout=1.0).close()
+        return True
+    except OSError:
+        return False
+
+
+def _serve_worker_connection(connection, shutdown_requested, wake_listener):
+    """
+    Answers the requests of one client until it disconnects. Every client gets its own thread,
+    so one client's long capture or export does not hold up the others.
+    """
+    with connection:
+        while True:
+            try:
+                function_name, args, kwargs = connection.recv()
+            except (EOFError, OSError):
+                return
+            if function_name == 'shutdown_worker':
+                shutdown_requested.set()
+                connection.send("Worker shutting down")
+                wake_listener()
+                return
+
+            function = WORKER_OPERATIONS.get(function_name)
+            if function is None:
+                result = f"-1 ERROR Unknown worker function: {function_name}"
+            else:
+                try:
+                    result = function(*args, **kwargs)
+                except Exception as e:
+                    result = f"-1 ERROR An error occurred while running {function_name} in the worker: {e}"
+            try:
+                connection.send(result)
+            except (EOFError, OSError):
+                return
+
+
+def serve_worker(port, authkey):
+    """
+    Runs this module as a worker process that owns the Logic 2 sessions and serves the module functions to
+    local clients. Blocks until a client calls stop_worker(). Normally started with start_worker() or
+    'python Logic2_Python_Module_for_LabVIEW.py --serve', which reads the key from stdin.
+
+    Clients send pickled requests, so only clients presenting authkey are accepted: never use a key that is
+    written down anywhere, start_worker() generates a random one per worker.
 
     Args:
-        output_dir (str): File path and file name for the output CSV file.
-        analyzer (string): Analyzer to be exported.
+        port (int): Local TCP port to listen on.
+        authkey (bytes): Shared secret clients must present.
     """
-    global capture, spi_analyzer
-    if capture is None:
-        return "-1 ERROR Capture no longer exists. Please capture data first."
+    if not authkey:
+        raise ValueError("The worker needs an authentication key")
+    shutdown_requested = threading.Event()
+
+    def wake_listener():
+        # accept() only returns for a new connection, so connect once to let the loop see the shutdown
+        try:
+            Client((WORKER_ADDRESS, port), authkey=authkey).close()
+        except Exception:
+            pass
+
+    with Listener((WORKER_ADDRESS, port), authkey=authkey) as listener:
+        while not shutdown_requested.is_set():
+            try:
+                connection = listener.accept()
+            except Exception:
+                # A client that failed authentication or hung up early
+                continue
+            if shutdown_requested.is_set():
+                connection.close()
+                break
+            threading.Thread(target=_serve_worker_connection, args=(connection, shutdown_requested, wake_listener), daemon=True).start()
+
+    # Close whatever the clients left open in Logic 2
+    for session_handle, _ in registry.items(Session):
+        close_connection(session_handle)
+    return "Worker stopped"
+
+
+@_instrumented
+def start_worker(port=DEFAULT_WORKER_PORT, automation_module='', timeout_seconds=10.0):
+    """
+    Starts a worker process running this module in the background and waits until it accepts connections.
+    The worker outlives the LabVIEW run that started it, so later runs can connect_worker() to a warm connection.
+    The worker gets a random key through its stdin, never on the command line. The key is saved to a file in
+    WORKER_KEY_DIR that only the current user can read, which connect_worker() uses.
 
+    Args:
+        port (int): Local TCP port for the worker.
+        automation_module (str): Module to use instead of saleae.automation, for example a Logic 2 stub. Empty for the real API.
+        timeout_seconds (float): Longest time to wait for the worker to come up.
+
+    Returns:
+        str: 'Worker started', 'Worker already running' if the worker of the saved key answers on port, or a '-1 ERROR' string.
+    """
+    if _port_in_use(port):
+        authkey = _load_worker_key(port)
+        if authkey is not None:
+            try:
+                _call_with_deadline(timeout_seconds, Client, (WORKER_ADDRESS, port), authkey=authkey).close()
+                return "Worker already running"
+            except Exception:
+                pass
+        return f"-1 ERROR Port {port} is in use by a process that does not accept the saved worker key. Stop it or use another port."
+
+    command = [_python_executable(), os.path.abspath(__file__), '--serve', '--port', str(port)]
+    if automation_module:
+        command += ['--automation-module', automation_module]
+    authkey = secrets.token_bytes(WORKER_AUTHKEY_BYTES)
     try:
-        # Export analyzer data to a CSV file
-        analyzer_export_filepath = output_dir
-        capture.export_data_table(
-            filepath=analyzer_export_filepath,
-            analyzers=[spi_analyzer]
-        )
-        return "Analyzer successfully exported to CSV file"
+        _save_worker_key(port, authkey)
+        worker_process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                          stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with worker_process.stdin:
+            worker_process.stdin.write(authkey.hex().encode() + b'\n')
     except Exception as e:
-        return f"-1 ERROR An error occurred while exporting analyzer data to CSV: {e}"
+        return f"-1 ERROR An error occurred while starting the worker: {e}"
+
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            Client((WORKER_ADDRESS, port), authkey=authkey).close()
+            return "Worker started"
+        except Exception as e:
+            if time.monotonic() > deadline:
+                return f"-1 ERROR The worker did not start within {timeout_seconds} seconds: {e}"
+            time.sleep(0.1)
+
 
-def export_saleae_capture(capture_filepath):
+@_instrumented
+def connect_worker(port=DEFAULT_WORKER_PORT, authkey=''):
     """
-    Export the data from the analyzer to a CSV file.
+    Connects to a running worker process. Every parallel LabVIEW loop should use its own connection.
 
     Args:
-        capture_filepath (str): File path and file name for the output CSV file.
+        port (int): Local TCP port of the worker.
+        authkey (str): Key of the worker as hex, only needed for a worker started by hand with --serve.
+            Empty uses the key start_worker() saved for port, also from an earlier Python session.
+
+    Returns:
+        str: The worker handle as a decimal string, or a '-1 ERROR' string.
     """
-    global capture
-    if capture is None:
-        return "-1 ERROR Capture no longer exists. Please capture data first."
+    key = bytes.fromhex(authkey) if authkey else _load_worker_key(port)
+    if key is None:
+        return f"-1 ERROR No key for the worker on port {port}. Start it with start_worker() or pass its key."
+    try:
+        worker = WorkerClient(port, key)
+    except Exception as e:
+        return f"-1 ERROR An error occurred while connecting to the worker: {e}"
+    return f"{registry.add(worker)}"
+
+
+@_instrumented
+def worker_call(worker_handle, function_name, args):
+    """
+    Runs one of the module functions in the worker process and returns its result unchanged, so the
+    Python Node is wired the same way as for a local call. The worker keeps its own session handles.
 
+    Args:
+        worker_handle (int): Handle returned by connect_worker().
+        function_name (str): Name of the module function, for example 'start_capture'.
+        args (str or list): JSON string or list of the function's positional arguments.
+    """
+    worker = registry.get(worker_handle, WorkerClient)
+    if worker is None:
+        return _missing_handle(WorkerClient, worker_handle)
     try:
-        # Finally, save the capture to a .sal file
-        capture.save_capture(filepath=capture_filepath)
-        return "Analyzer data successfully saved."
+        if isinstance(args, str):
+            args = json.loads(args) if args else []
+        return worker.call(function_name, *args)
+    except (EOFError, OSError) as e:
+        registry.remove(worker_handle)
+        return f"-1 ERROR The connection to the worker was lost: {e}"
     except Exception as e:
-        return f"-1 ERROR An error occurred while exporting the capture: {e}"
+        return f"-1 ERROR An error occurred while calling the worker: {e}"
 
 
-def close_connection():
+@_instrumented
+def disconnect_worker(worker_handle):
+    """
+    Closes a connection made with connect_worker(). The worker and its sessions keep running.
+
+    Args:
+        worker_handle (int): Handle returned by connect_worker().
     """
-    Closes the connection to the Logic 2 application.
+    worker = registry.remove(worker_handle, WorkerClient)
+    if worker is None:
+        return _missing_handle(WorkerClient, worker_handle)
+    worker.close()
+    return "Worker disconnected"
+
+
+@_instrumented
+def stop_worker(worker_handle):
     """
-    global manager, capture
-    if manager is None:
-        return "-1 ERROR Manager is not connected. Please establish a connection first."
+    Asks the worker process to close its sessions and exit, and closes the connection.
+
+    Args:
+        worker_handle (int): Handle returned by connect_worker().
+    """
+    worker = registry.remove(worker_handle, WorkerClient)
+    if worker is None:
+        return _missing_handle(WorkerClient, worker_handle)
+    try:
+        result = worker.call('shutdown_worker')
+        if _load_worker_key(worker.port) == worker.authkey:
+            os.remove(_worker_key_path(worker.port))
+        return result
+    except Exception as e:
+        return f"-1 ERROR An error occurred while stopping the worker: {e}"
+    finally:
+        worker.close()
+
+
+def enable_metrics(enabled, trace_path='', max_trace_megabytes=10.0):
+    """
+    Turns the per-function latency metrics on or off, optionally writing every call to a rolling trace file.
 
+    Args:
+        enabled (bool): True to start recording, False to stop (the counters are kept until reset_metrics()).
+        trace_path (str): File for a JSON-lines trace of every call, empty for no trace.
+        max_trace_megabytes (float): Size at which the trace file rolls over to trace_path.1.
+    """
     try:
-        # Close the session and release the port
-        if capture:
-            capture.close()
-            capture = None
-        if manager:
-            manager.close()
-            manager = None
+        with metrics.lock:
+            if metrics.trace_logger is not None:
+                for handler in list(metrics.trace_logger.handlers):
+                    metrics.trace_logger.removeHandler(handler)
+                    handler.close()
+                metrics.trace_logger = None
+            if enabled and trace_path:
+                trace_logger = logging.getLogger('logic2_labview.trace')
+                trace_logger.setLevel(logging.INFO)
+                trace_logger.propagate = False
+                trace_logger.addHandler(logging.handlers.RotatingFileHandler(
+                    trace_path, maxBytes=int(max_trace_megabytes * 1024 * 1024), backupCount=1))
+                metrics.trace_logger = trace_logger
+            metrics.enabled = bool(enabled)
     except Exception as e:
-        return f"-1 ERROR An error occurred while closing the session: {e}"
-    return 'Logic2 Session Closed'
\ No newline at end of file
+        return f"-1 ERROR An error occurred while configuring the metrics: {e}"
+    return "Metrics enabled" if enabled else "Metrics disabled"
+
+
+def get_metrics():
+    """
+    Returns a snapshot of the metrics recorded since the last reset_metrics().
+
+    Returns:
+        str: JSON object with "enabled" and "calls", which maps each module function ('start_capture', ...)
+        and automation call ('capture.wait', ...) to its "count", "failures", "total_seconds", "mean_seconds",
+        "max_seconds", "p50_seconds", "p95_seconds", "p99_seconds" and, for exports, "bytes_written".
+    """
+    return json.dumps({'enabled': metrics.enabled, 'calls': metrics.snapshot()})
+
+
+def reset_metrics():
+    """
+    Clears all recorded metrics.
+    """
+    metrics.reset()
+    return "Metrics reset"
+
+
+# Functions run_sequence() may call, by the name used in the "op" field of each step.
+# Kept at the end of the module so it can list every function above.
+SEQUENCE_OPERATIONS = {
+    'open_connection': open_connection,
+    'device_config': device_config,
+    'capture_duration_config': capture_duration_config,
+    'get_list_of_devices': get_list_of_devices,
+    'start_capture': start_capture,
+    'start_capture_async': start_capture_async,
+    'poll_capture': poll_capture,
+    'wait_capture': wait_capture,
+    'cancel_capture': cancel_capture,
+    'add_spi_analyzer': add_spi_analyzer,
+    'export_raw_digital': export_raw_digital,
+    'export_raw_mixed_signal': export_raw_mixed_signal,
+    'export_spi_analyzer_table': export_spi_analyzer_table,
+    'export_saleae_capture': export_saleae_capture,
+    'close_connection': close_connection,
+    'export_all': export_all,
+    'start_capture_loop': start_capture_loop,
+    'poll_capture_loop': poll_capture_loop,
+    'stop_capture_loop': stop_capture_loop,
+    'export_raw_digital_binary': export_raw_digital_binary,
+    'export_raw_mixed_signal_binary': export_raw_mixed_signal_binary,
+    'warm_up': warm_up,
+    'refresh_devices': refresh_devices,
+    'configure_device_cache': configure_device_cache,
+    'check_connection': check_connection,
+    'get_connection_status': get_connection_status,
+    'close_idle_connections': close_idle_connections,
+    'digital_trigger_capture_config': digital_trigger_capture_config,
+    'manual_capture_config': manual_capture_config,
+    'stop_capture': stop_capture,
+    'add_analyzer': add_analyzer,
+    'remove_analyzer': remove_analyzer,
+    'export_data_table': export_data_table,
+    'open_analyzer_table': open_analyzer_table,
+    'analyzer_table_statistics': analyzer_table_statistics,
+    'close_analyzer_table': close_analyzer_table,
+    'build_transition_index': build_transition_index,
+    'open_transition_index': open_transition_index,
+    'digital_state_at': digital_state_at,
+    'digital_pulse_at': digital_pulse_at,
+    'digital_frequency_between': digital_frequency_between,
+    'close_transition_index': close_transition_index,
+    'measure_digital': measure_digital,
+    'open_measurement_accumulator': open_measurement_accumulator,
+    'get_accumulated_measurements': get_accumulated_measurements,
+    'close_measurement_accumulator': close_measurement_accumulator,
+    'archive_exports': archive_exports,
+    'poll_archive_job': poll_archive_job,
+    'list_archive': list_archive,
+    'restore_archive_csv': restore_archive_csv,
+    'start_batch_reprocess': start_batch_reprocess,
+    'poll_batch_reprocess': poll_batch_reprocess,
+    'stop_batch_reprocess': stop_batch_reprocess,
+    'estimate_capture_resources': estimate_capture_resources,
+    'set_capture_budget': set_capture_budget,
+    'configure_call_deadlines': configure_call_deadlines,
+    'get_deadline_report': get_deadline_report,
+}
+
+# Functions a worker process serves to its clients: everything above that works on local state. set_automation_module()
+# is left out on purpose, it would let any client make the worker import a module of its choosing
+WORKER_OPERATIONS = dict(
+    SEQUENCE_OPERATIONS,
+    open_session=open_session,
+    run_sequence=run_sequence,
+    load_raw_digital_arrays=load_raw_digital_arrays,
+    export_raw_digital_arrays=export_raw_digital_arrays,
+    open_raw_reader=open_raw_reader,
+    read_next_chunk=read_next_chunk,
+    close_raw_reader=close_raw_reader,
+    load_binary_digital_arrays=load_binary_digital_arrays,
+    load_binary_analog_waveforms=load_binary_analog_waveforms,
+    enable_metrics=enable_metrics,
+    get_metrics=get_metrics,
+    reset_metrics=reset_metrics,
+    share_digital_transitions=share_digital_transitions,
+    share_analog_waveforms=share_analog_waveforms,
+    share_analyzer_table=share_analyzer_table,
+    release_shared_block=release_shared_block,
+    release_all_shared_blocks=release_all_shared_blocks,
+    query_analyzer_frames=query_analyzer_frames,
+    digital_edges_between=digital_edges_between,
+    decimate_analog_waveforms=decimate_analog_waveforms,
+    read_archive_window=read_archive_window,
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Logic 2 LabVIEW module as a worker process for local clients.')
+    parser.add_argument('--serve', action='store_true', help='start the worker (the only mode for now)')
+    parser.add_argument('--port', type=int, default=DEFAULT_WORKER_PORT, help='local TCP port to listen on')
+    parser.add_argument('--automation-module', default='', help='module to use instead of saleae.automation, e.g. a Logic 2 stub')
+    arguments = parser.parse_args()
+    if not arguments.serve:
+        parser.error('nothing to do, pass --serve')
+    # The key comes on stdin as hex, so it never shows up in the process list
+    worker_authkey = bytes.fromhex(sys.stdin.readline().strip())
+    if not worker_authkey:
+        parser.error('pass the worker key as hex on stdin')
+    if arguments.automation_module:
+        set_automation_module(arguments.automation_module)
+    serve_worker(arguments.port, worker_authkey)
@@ -0,0 +1,187 @@
+# Benchmark for Logic2_Python_Module_for_LabVIEW.py against the in-process fake Logic 2 in fake_logic2_automation.py.
+#
+# Measures the module's own overhead per function (with zero simulated gRPC latency) and the time of complete
+# configure -> capture -> analyze -> export -> load cycles at several export sizes, and prints the results
+# as JSON so runs can be compared to catch regressions.
+#
+# Example:
+#   python benchmark_logic2_module.py --sizes 1000 10000 100000 --repeat 20 --output results.json
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODULE = os.path.join(HERE, '..', '..', 'src', 'LabVIEW 2023', 'subVIs', 'Logic2_Python_Module_for_LabVIEW.py')
+
+HAVE_NUMPY = importlib.util.find_spec('numpy') is not None
+
+sys.path.insert(0, HERE)
+import fake_logic2_automation
+
+
+def load_module(module_path):
+    """
+    Imports the LabVIEW module from its file with the fake installed as saleae.automation.
+    """
+    fake_logic2_automation.install()
+    spec = importlib.util.spec_from_file_location('Logic2_Python_Module_for_LabVIEW', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def summarize(seconds):
+    """
+    Returns mean, min, p50, p95 and max of a list of durations, in seconds.
+    """
+    ordered = sorted(seconds)
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))]
+    return {
+        'count': len(ordered),
+        'mean_seconds': sum(ordered) / len(ordered),
+        'min_seconds': ordered[0],
+        'p50_seconds': percentile(50),
+        'p95_seconds': percentile(95),
+        'max_seconds': ordered[-1],
+    }
+
+
+def time_call(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    if (result[0] if isinstance(result, tuple) else str(result)).startswith('-1 ERROR'):
+        raise RuntimeError(f"{function.__name__} failed: {result}")
+    return elapsed
+
+
+def benchmark_call_overhead(module, work_dir, repeat):
+    """
+    Times each module function with instant fake responses, so the numbers are the module's own cost.
+    """
+    fake_logic2_automation.configure(rpc_latency_seconds=0.0, capture_time_scale=0.0, export_rows=10, analyzer_rows=10, capture_file_bytes=16)
+    timings = {}
+    def record(name, function, *args):
+        timings.setdefault(name, []).append(time_call(function, *args))
+
+    for _ in range(repeat):
+        record('open_connection', module.open_connection, '127.0.0.1', 10430)
+        record('device_config', module.device_config, [0, 1, 2, 3], 10000000, 3.3, [], 0)
+        record('capture_duration_config', module.capture_duration_config, 0.0)
+        record('get_list_of_devices', module.get_list_of_devices, True)
+        record('start_capture', module.start_capture, 'F4241')
+        record('add_spi_analyzer', module.add_spi_analyzer, 'SPI', 0, 1, 2, 3, '8 Bits per Transfer (Standard)')
+        record('export_raw_digital', module.export_raw_digital, work_dir, [0, 1, 2, 3])
+        record('export_spi_analyzer_table', module.export_spi_analyzer_table, os.path.join(work_dir, 'spi.csv'))
+        record('export_saleae_capture', module.export_saleae_capture, os.path.join(work_dir, 'capture.sal'))
+        record('close_connection', module.close_connection)
+    return {name: summarize(seconds) for name, seconds in timings.items()}
+
+
+def benchmark_cycles(module, work_dir, sizes, repeat, rpc_latency_seconds):
+    """
+    Times full capture and export cycles, through individual calls and through run_sequence(), at each export size.
+    """
+    results = []
+    for rows in sizes:
+        fake_logic2_automation.configure(rpc_latency_seconds=rpc_latency_seconds, capture_time_scale=0.0,
+                                         export_rows=rows, analyzer_rows=rows, capture_file_bytes=rows * 16)
+        cycle_dir = os.path.join(work_dir, f'rows_{rows}')
+        os.makedirs(cycle_dir, exist_ok=True)
+        operations = [
+            {'op': 'open_connection', 'args': ['127.0.0.1', 10430]},
+            {'op': 'device_config', 'args': [[0, 1, 2, 3], 10000000, 3.3, [], 0]},
+            {'op': 'capture_duration_config', 'args': [0.0]},
+            {'op': 'start_capture', 'args': ['F4241']},
+            {'op': 'add_spi_analyzer', 'args': ['SPI', 0, 1, 2, 3, '8 Bits per Transfer (Standard)']},
+            {'op': 'export_raw_digital', 'args': [cycle_dir, [0, 1, 2, 3]]},
+            {'op': 'export_spi_analyzer_table', 'args': [os.path.join(cycle_dir, 'spi.csv')]},
+            {'op': 'export_saleae_capture', 'args': [os.path.join(cycle_dir, 'capture.sal')]},
+            {'op': 'close_connection', 'args': []},
+        ]
+
+        # One untimed cycle so the fake has generated its export files before anything is measured
+        for operation in operations:
+            time_call(getattr(module, operation['op']), *operation['args'])
+
+        individual, sequenced, parsing = [], [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for operation in operations:
+                time_call(getattr(module, operation['op']), *operation['args'])
+            individual.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            result = json.loads(module.run_sequence(operations))
+            sequenced.append(time.perf_counter() - start)
+            if result['status'] != 'OK':
+                raise RuntimeError(f"run_sequence failed: {result}")
+
+            if HAVE_NUMPY:
+                parsing.append(time_call(module.load_raw_digital_arrays, os.path.join(cycle_dir, 'digital.csv'), 10000000))
+
+        export_bytes = sum(os.path.getsize(os.path.join(cycle_dir, name)) for name in ('digital.csv', 'spi.csv', 'capture.sal'))
+        entry = {
+            'rows': rows,
+            'export_bytes': export_bytes,
+            'cycle': summarize(individual),
+            'cycle_run_sequence': summarize(sequenced),
+            'export_megabytes_per_second': export_bytes / 1e6 / (sum(individual) / len(individual)),
+        }
+        if parsing:
+            entry['load_raw_digital_arrays'] = summarize(parsing)
+            entry['load_rows_per_second'] = rows / (sum(parsing) / len(parsing))
+        results.append(entry)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Logic2_Python_Module_for_LabVIEW.py against a fake Logic 2.')
+    parser.add_argument('--module', default=DEFAULT_MODULE, help='path of the module to benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='rows per export for the cycle benchmark')
+    parser.add_argument('--repeat', type=int, default=10, help='repetitions per measurement')
+    parser.add_argument('--rpc-latency', type=float, default=0.0, help='simulated gRPC latency per call in seconds for the cycle benchmark')
+    parser.add_argument('--output', default='', help='file to write the JSON results to, default is stdout')
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    module = load_module(os.path.abspath(arguments.module))
+    load_seconds = time.perf_counter() - start
+    fake_logic2_automation.configure(rpc_latency_seconds=arguments.rpc_latency)
+    warm_up = json.loads(module.warm_up('127.0.0.1', 10430, True))
+    module.close_connection()
+    work_dir = tempfile.mkdtemp(prefix='logic2_benchmark_')
+    try:
+        results = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'module': os.path.abspath(arguments.module),
+            'numpy': HAVE_NUMPY,
+            'module_load_seconds': load_seconds,
+            'warm_up': warm_up,
+            'repeat': arguments.repeat,
+            'rpc_latency_seconds': arguments.rpc_latency,
+            'call_overhead': benchmark_call_overhead(module, work_dir, arguments.repeat),
+            'cycles': benchmark_cycles(module, work_dir, arguments.sizes, arguments.repeat, arguments.rpc_latency),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            output_file.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
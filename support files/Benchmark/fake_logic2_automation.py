@@ -0,0 +1,380 @@
+# In-process stand-in for saleae.automation, used to benchmark and test Logic2_Python_Module_for_LabVIEW.py
+# without a running Logic 2 instance or any hardware.
+#
+# It provides the names the module uses (Manager, LogicDeviceConfiguration, CaptureConfiguration, ...).
+# Nothing is captured: waits sleep for the simulated duration, exports write generated files of a configurable
+# size, and every call can be given an extra delay to simulate gRPC latency or a stalled Logic 2.
+#
+# Use it by installing it as saleae.automation before the module is imported (see install()), by passing
+# --automation-module fake_logic2_automation to the worker, or with set_automation_module('fake_logic2_automation').
+
+import os
+import struct
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import List, Optional
+
+
+# Simulation settings, change them with configure()
+settings = {
+    'rpc_latency_seconds': 0.0, # Added to every call, like a gRPC round trip
+    'capture_time_scale': 1.0, # Multiplies TimedCaptureMode durations, 0 makes captures finish at once
+    'export_rows': 1000, # Rows written to digital.csv / analog.csv and transitions per digital_N.bin
+    'analyzer_rows': 1000, # Frames written by export_data_table()
+    'capture_file_bytes': 1024 * 1024, # Size of the file written by save_capture()
+    'call_delays': {}, # Extra seconds for specific calls, e.g. {'capture.wait': 3600} to simulate a hung Logic 2
+}
+
+_cache_lock = threading.Lock()
+_file_cache = {} # Generated export contents, keyed by what they depend on, so writing them costs only disk time
+
+
+def configure(**kwargs):
+    """
+    Changes the simulation settings, for example configure(rpc_latency_seconds=0.002, export_rows=100000).
+    """
+    unknown = set(kwargs) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown fake Logic 2 settings: {sorted(unknown)}")
+    settings.update(kwargs)
+
+
+def install():
+    """
+    Registers this module as saleae.automation, so 'from saleae import automation' imports the fake.
+    Call it before importing Logic2_Python_Module_for_LabVIEW.py.
+    """
+    saleae = sys.modules.get('saleae') or types.ModuleType('saleae')
+    saleae.automation = sys.modules[__name__]
+    sys.modules['saleae'] = saleae
+    sys.modules['saleae.automation'] = sys.modules[__name__]
+
+
+def _rpc(name):
+    """
+    Sleeps for the simulated round trip of one call.
+    """
+    delay = settings['rpc_latency_seconds'] + settings['call_delays'].get(name, 0.0)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _cached(key, build):
+    with _cache_lock:
+        if key not in _file_cache:
+            _file_cache[key] = build()
+        return _file_cache[key]
+
+
+def _write(path, contents):
+    with open(path, 'wb') as output_file:
+        output_file.write(contents)
+
+
+class SaleaeError(Exception):
+    pass
+
+
+class DeviceError(SaleaeError):
+    pass
+
+
+class DeviceType(Enum):
+    LOGIC = 1
+    LOGIC_4 = 2
+    LOGIC_8 = 3
+    LOGIC_16 = 4
+    LOGIC_PRO_8 = 5
+    LOGIC_PRO_16 = 6
+
+
+class RadixType(Enum):
+    BINARY = 1
+    DECIMAL = 2
+    HEXADECIMAL = 3
+    ASCII = 4
+
+
+class DigitalTriggerType(Enum):
+    RISING = 1
+    FALLING = 2
+    PULSE_HIGH = 3
+    PULSE_LOW = 4
+
+
+class DigitalTriggerLinkedChannelState(Enum):
+    LOW = 1
+    HIGH = 2
+
+
+@dataclass
+class DeviceDesc:
+    device_id: str
+    device_type: DeviceType
+    is_simulation: bool
+
+
+@dataclass
+class Version:
+    major: int
+    minor: int
+    patch: int
+
+
+@dataclass
+class AppInfo:
+    api_version: Version
+    app_version: str
+    app_pid: int
+
+
+@dataclass
+class GlitchFilterEntry:
+    channel_index: int
+    pulse_width_seconds: float
+
+
+@dataclass
+class LogicDeviceConfiguration:
+    enabled_analog_channels: List[int] = field(default_factory=list)
+    enabled_digital_channels: List[int] = field(default_factory=list)
+    analog_sample_rate: Optional[int] = None
+    digital_sample_rate: Optional[int] = None
+    digital_threshold_volts: Optional[float] = None
+    glitch_filters: List[GlitchFilterEntry] = field(default_factory=list)
+
+
+@dataclass
+class DigitalTriggerLinkedChannel:
+    channel_index: int
+    state: DigitalTriggerLinkedChannelState
+
+
+@dataclass
+class DigitalTriggerCaptureMode:
+    trigger_type: DigitalTriggerType
+    trigger_channel_index: int
+    min_pulse_width_seconds: Optional[float] = None
+    max_pulse_width_seconds: Optional[float] = None
+    linked_channels: List[DigitalTriggerLinkedChannel] = field(default_factory=list)
+    trim_data_seconds: Optional[float] = None
+    after_trigger_seconds: Optional[float] = None
+
+
+@dataclass
+class TimedCaptureMode:
+    duration_seconds: float
+    trim_data_seconds: Optional[float] = None
+
+
+@dataclass
+class ManualCaptureMode:
+    trim_data_seconds: Optional[float] = None
+
+
+@dataclass
+class CaptureConfiguration:
+    buffer_size_megabytes: Optional[int] = None
+    capture_mode: object = field(default_factory=ManualCaptureMode)
+
+
+@dataclass
+class AnalyzerHandle:
+    analyzer_id: int
+
+
+@dataclass
+class DataTableExportConfiguration:
+    analyzer: AnalyzerHandle
+    radix: RadixType
+
+
+@dataclass
+class DataTableFilter:
+    columns: List[str]
+    query: str
+
+
+class Capture:
+    """
+    A simulated capture. wait() sleeps for the (scaled) timed duration or until stop() is called.
+    """
+
+    def __init__(self, manager, device_configuration, capture_configuration):
+        self.manager = manager
+        self.device_configuration = device_configuration or LogicDeviceConfiguration()
+        self.capture_configuration = capture_configuration or CaptureConfiguration()
+        self.stopped = threading.Event()
+        self.closed = False
+        self.next_analyzer_id = 1
+
+    def _check_open(self):
+        if self.closed or self.manager.closed:
+            raise SaleaeError("Capture is closed")
+
+    def wait(self):
+        _rpc('capture.wait')
+        self._check_open()
+        capture_mode = self.capture_configuration.capture_mode
+        if isinstance(capture_mode, ManualCaptureMode):
+            raise SaleaeError("wait() cannot be used with ManualCaptureMode")
+        duration = getattr(capture_mode, 'duration_seconds', None)
+        if duration is None:
+            duration = getattr(capture_mode, 'after_trigger_seconds', None) or 0.0
+        self.stopped.wait(duration * settings['capture_time_scale'])
+
+    def stop(self):
+        _rpc('capture.stop')
+        self._check_open()
+        self.stopped.set()
+
+    def close(self):
+        _rpc('capture.close')
+        self.closed = True
+        self.stopped.set()
+
+    def add_analyzer(self, name, *, label=None, settings=None):
+        _rpc('capture.add_analyzer')
+        self._check_open()
+        analyzer = AnalyzerHandle(analyzer_id=self.next_analyzer_id)
+        self.next_analyzer_id += 1
+        return analyzer
+
+    def remove_analyzer(self, analyzer):
+        _rpc('capture.remove_analyzer')
+        self._check_open()
+
+    def _digital_channels(self, digital_channels):
+        return digital_channels if digital_channels else self.device_configuration.enabled_digital_channels
+
+    def _analog_channels(self, analog_channels):
+        return analog_channels if analog_channels else self.device_configuration.enabled_analog_channels
+
+    def export_raw_data_csv(self, directory, *, analog_channels=None, digital_channels=None, analog_downsample_ratio=1, iso8601_timestamp=False):
+        _rpc('capture.export_raw_data_csv')
+        self._check_open()
+        rows = settings['export_rows']
+        digital_channels = list(self._digital_channels(digital_channels))
+        analog_channels = list(self._analog_channels(analog_channels))
+        if digital_channels:
+            _write(os.path.join(directory, 'digital.csv'),
+                   _cached(('digital.csv', rows, tuple(digital_channels)), lambda: _digital_csv(rows, digital_channels)))
+        if analog_channels:
+            _write(os.path.join(directory, 'analog.csv'),
+                   _cached(('analog.csv', rows, tuple(analog_channels)), lambda: _analog_csv(rows, analog_channels)))
+
+    def export_raw_data_binary(self, directory, *, analog_channels=None, digital_channels=None, analog_downsample_ratio=1):
+        _rpc('capture.export_raw_data_binary')
+        self._check_open()
+        rows = settings['export_rows']
+        for channel in self._digital_channels(digital_channels):
+            _write(os.path.join(directory, f'digital_{channel}.bin'),
+                   _cached(('digital.bin', rows, channel), lambda: _digital_bin(rows, channel)))
+        for channel in self._analog_channels(analog_channels):
+            _write(os.path.join(directory, f'analog_{channel}.bin'),
+                   _cached(('analog.bin', rows, channel, analog_downsample_ratio), lambda: _analog_bin(rows, channel, analog_downsample_ratio)))
+
+    def export_data_table(self, filepath, analyzers, *, columns=None, filter=None, iso8601_timestamp=False):
+        _rpc('capture.export_data_table')
+        self._check_open()
+        rows = settings['analyzer_rows']
+        _write(filepath, _cached(('data_table', rows), lambda: _data_table_csv(rows)))
+
+    def save_capture(self, filepath):
+        _rpc('capture.save_capture')
+        self._check_open()
+        size = settings['capture_file_bytes']
+        _write(filepath, _cached(('sal', size), lambda: bytes(size)))
+
+
+class Manager:
+    """
+    A simulated connection to Logic 2 with one simulated Logic Pro 16 (F4241) and one Logic Pro 8 (F4242).
+    """
+
+    def __init__(self, *, port=10430, address='127.0.0.1', connect_timeout_seconds=None, grpc_channel_arguments=None, logic2_process=None):
+        _rpc('Manager.connect')
+        self.port = port
+        self.address = address
+        self.closed = False
+
+    @classmethod
+    def connect(cls, *, address='127.0.0.1', port=10430, connect_timeout_seconds=None, grpc_channel_arguments=None):
+        return cls(address=address, port=port, connect_timeout_seconds=connect_timeout_seconds)
+
+    def _check_open(self):
+        if self.closed:
+            raise RuntimeError("Cannot use Manager after it has been closed")
+
+    def get_app_info(self):
+        _rpc('manager.get_app_info')
+        self._check_open()
+        return AppInfo(api_version=Version(1, 0, 0), app_version='fake', app_pid=os.getpid())
+
+    def get_devices(self, *, include_simulation_devices=False):
+        _rpc('manager.get_devices')
+        self._check_open()
+        if not include_simulation_devices:
+            return []
+        return [DeviceDesc('F4241', DeviceType.LOGIC_PRO_16, True), DeviceDesc('F4242', DeviceType.LOGIC_PRO_8, True)]
+
+    def start_capture(self, *, device_configuration, device_id=None, capture_configuration=None):
+        _rpc('manager.start_capture')
+        self._check_open()
+        return Capture(self, device_configuration, capture_configuration)
+
+    def load_capture(self, filepath):
+        _rpc('manager.load_capture')
+        self._check_open()
+        if not os.path.isfile(filepath):
+            raise SaleaeError(f"Capture file not found: {filepath}")
+        return Capture(self, LogicDeviceConfiguration(enabled_digital_channels=[0, 1, 2, 3]), CaptureConfiguration(capture_mode=TimedCaptureMode(0.0)))
+
+    def close(self):
+        _rpc('manager.close')
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _digital_csv(rows, channels):
+    # Channel k toggles every 2**k rows, one row per microsecond
+    lines = ['Time [s],' + ','.join(f'Channel {channel}' for channel in channels)]
+    for row in range(rows):
+        lines.append(f'{row * 1e-6:.9f},' + ','.join(str((row >> position) & 1) for position in range(len(channels))))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def _analog_csv(rows, channels):
+    lines = ['Time [s],' + ','.join(f'Channel {channel}' for channel in channels)]
+    for row in range(rows):
+        lines.append(f'{row * 1e-6:.9f},' + ','.join(f'{((row + position * 7) % 50) / 10.0:.6f}' for position in range(len(channels))))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def _digital_bin(rows, channel):
+    period = 2 ** (channel % 8)
+    transition_times = [index * period * 1e-6 for index in range(1, rows + 1)]
+    header = struct.pack('<8siiIddQ', b'<SALEAE>', 0, 0, 0, 0.0, (rows + 1) * period * 1e-6, rows)
+    return header + struct.pack(f'<{rows}d', *transition_times)
+
+
+def _analog_bin(rows, channel, downsample):
+    samples = [((row + channel * 7) % 50) / 10.0 for row in range(rows)]
+    header = struct.pack('<8siidQQQ', b'<SALEAE>', 0, 1, 0.0, 1000000, downsample, rows)
+    return header + struct.pack(f'<{rows}f', *samples)
+
+
+def _data_table_csv(rows):
+    lines = ['name,type,start_time,duration,"mosi","miso"']
+    for row in range(rows):
+        lines.append(f'"SPI","result",{row * 1e-5:.9f},{2e-6:.9f},0x{row % 256:02X},0x{(255 - row) % 256:02X}')
+    return ('\n'.join(lines) + '\n').encode()
@@ -0,0 +1,1382 @@
+# Behavior tests for Logic2_Python_Module_for_LabVIEW.py against the in-process fake Logic 2 in
+# ../Benchmark/fake_logic2_automation.py. Needs no Logic 2 or hardware.
+#
+# Example:
+#   python -m pytest "support files/Tests"
+
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+from multiprocessing import shared_memory
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(HERE, '..', 'Benchmark')
+MODULE_PATH = os.path.join(HERE, '..', '..', 'src', 'LabVIEW 2023', 'subVIs', 'Logic2_Python_Module_for_LabVIEW.py')
+
+sys.path.insert(0, BENCHMARK_DIR)
+import fake_logic2_automation
+
+fake_logic2_automation.install()
+spec = importlib.util.spec_from_file_location('Logic2_Python_Module_for_LabVIEW', MODULE_PATH)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+
+FAKE_DEFAULTS = dict(fake_logic2_automation.settings)
+
+
+class FakeLogic2TestCase(unittest.TestCase):
+    """
+    Every test starts with instant fake responses, the default call deadlines and an open default session.
+    """
+
+    def setUp(self):
+        fake_logic2_automation.settings.update(FAKE_DEFAULTS, call_delays={})
+        fake_logic2_automation.configure(rpc_latency_seconds=0.0, capture_time_scale=0.0, export_rows=10, analyzer_rows=10)
+        module.call_deadlines.clear()
+        module.call_deadlines.update(module.DEFAULT_CALL_DEADLINES)
+        module.configure_call_deadlines({}, 0, module.CALL_RETRIES, 0.01)
+        module.deadline_misses.clear()
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.assertEqual(module.open_connection('127.0.0.1', 10430), 'Connection Successful')
+        module.device_config([0, 1, 2, 3], 10000000, 3.3, [], 0)
+        module.capture_duration_config(0.01)
+
+    def tearDown(self):
+        for handle, _ in module.registry.items(module.Session):
+            module.close_connection(handle)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def pool_sessions(self):
+        return sum(connection['sessions'] for connection in json.loads(module.get_connection_status()))
+
+
+class WorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.key_dir = tempfile.mkdtemp(prefix='logic2_test_keys_')
+        key_dir_patch = unittest.mock.patch.object(module, 'WORKER_KEY_DIR', self.key_dir)
+        key_dir_patch.start()
+        self.addCleanup(key_dir_patch.stop)
+        self.addCleanup(shutil.rmtree, self.key_dir, True)
+
+    def start_worker(self, port):
+        saved_path = os.environ.get('PYTHONPATH')
+        os.environ['PYTHONPATH'] = os.pathsep.join([BENCHMARK_DIR] + ([saved_path] if saved_path else []))
+        try:
+            return module.start_worker(port, 'fake_logic2_automation', 20.0)
+        finally:
+            if saved_path is None:
+                del os.environ['PYTHONPATH']
+            else:
+                os.environ['PYTHONPATH'] = saved_path
+
+    def test_worker_needs_its_random_key(self):
+        port = 10499
+        self.assertEqual(self.start_worker(port), 'Worker started')
+        key = module._load_worker_key(port)
+        self.assertEqual(len(key), module.WORKER_AUTHKEY_BYTES)
+        if os.name == 'posix':
+            self.assertEqual(os.stat(module._worker_key_path(port)).st_mode & 0o777, 0o600)
+        self.assertTrue(module.connect_worker(port, '00' * module.WORKER_AUTHKEY_BYTES).startswith('-1 ERROR'))
+        self.assertTrue(module.connect_worker(port + 1).startswith('-1 ERROR No key'))
+
+        # A later Python session finds the running worker through the saved key
+        self.assertEqual(self.start_worker(port), 'Worker already running')
+        worker_handle = int(module.connect_worker(port))
+        self.assertEqual(module.registry.get(worker_handle, module.WorkerClient).authkey, key)
+        self.assertEqual(module.worker_call(worker_handle, 'open_connection', ['127.0.0.1', 10430]), 'Connection Successful')
+        self.assertTrue(module.worker_call(worker_handle, 'set_automation_module', ['os']).startswith('-1 ERROR Unknown worker function'))
+        self.assertEqual(module.stop_worker(worker_handle), 'Worker shutting down')
+        self.assertFalse(os.path.exists(module._worker_key_path(port)))
+
+    def test_port_held_by_another_process_is_refused(self):
+        with socket.create_server(('127.0.0.1', 0)) as server:
+            port = server.getsockname()[1]
+            self.assertTrue(module.start_worker(port, 'fake_logic2_automation', 1.0).startswith('-1 ERROR Port'))
+        self.assertFalse(os.path.exists(module._worker_key_path(port)))
+
+
+class CloseConnectionTest(FakeLogic2TestCase):
+
+    def test_failing_capture_close_still_releases_the_pool_slot(self):
+        module.start_capture('F4241')
+        sessions_before = self.pool_sessions()
+        def failing_close():
+            raise RuntimeError('close failed')
+        module.registry.get(module.DEFAULT_SESSION, module.Session).capture.close = failing_close
+        self.assertIn('close failed', module.close_connection())
+        self.assertEqual(self.pool_sessions(), sessions_before - 1)
+        self.assertIsNone(module.registry.get(module.DEFAULT_SESSION, module.Session))
+
+    def test_uncollected_job_captures_are_closed(self):
+        fake_logic2_automation.configure(capture_time_scale=1.0)
+        module.capture_duration_config(5.0)
+        job_handle = int(module.start_capture_async('F4241'))
+        job = module.registry.get(job_handle, module.CaptureJob)
+        self.assertEqual(module.close_connection(), 'Logic2 Session Closed')
+        self.assertTrue(job.capture.closed)
+        self.assertIsNone(module.registry.get(job_handle, module.CaptureJob))
+
+
+    def test_running_loop_is_stopped_before_the_connection_is_released(self):
+        fake_logic2_automation.configure(capture_time_scale=1.0)
+        module.capture_duration_config(5.0)
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        started = []
+        real_start_capture = session.manager.start_capture
+        def recording_start_capture(**kwargs):
+            started.append(real_start_capture(**kwargs))
+            return started[-1]
+        session.manager.start_capture = recording_start_capture
+        sessions_before = self.pool_sessions()
+        loop_handle = int(module.start_capture_loop('F4241', [{'op': 'export_raw_digital', 'args': [self.work_dir, [0]]}], 0))
+        loop = module.registry.get(loop_handle, module.CaptureLoop)
+        deadline = time.monotonic() + 5
+        while loop.recording is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        start = time.perf_counter()
+        self.assertEqual(module.close_connection(), 'Logic2 Session Closed')
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertFalse(loop.thread.is_alive())
+        self.assertEqual(len(started), 1)
+        self.assertTrue(started[0].closed)
+        self.assertEqual(os.listdir(self.work_dir), [])
+        self.assertEqual(self.pool_sessions(), sessions_before - 1)
+        self.assertIsNone(module.registry.get(loop_handle, module.CaptureLoop))
+
+class ConnectionPoolTest(FakeLogic2TestCase):
+
+    def fail_probe(self):
+        module.configure_call_deadlines({'manager.get_app_info': 0.1}, 0, 0, 0.01)
+        fake_logic2_automation.configure(call_delays={'manager.get_app_info': 1.0})
+        try:
+            module.connection_pool.get(('127.0.0.1', 10430), 0)
+        finally:
+            fake_logic2_automation.configure(call_delays={})
+
+    def test_manager_with_open_captures_survives_a_failed_probe(self):
+        module.start_capture('F4241')
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        old_manager = session.manager
+        self.fail_probe()
+        self.assertIsNot(session.manager, old_manager)
+        self.assertFalse(old_manager.closed)
+        self.assertEqual(module.export_raw_digital(self.work_dir, [0]), 'Raw digital data successfully exported to CSV file')
+        self.assertEqual(json.loads(module.get_connection_status())[0]['retired_managers'], 1)
+
+        self.assertEqual(module.close_connection(), 'Logic2 Session Closed')
+        self.assertTrue(old_manager.closed)
+        self.assertEqual(json.loads(module.get_connection_status())[0]['retired_managers'], 0)
+
+    def test_manager_without_captures_is_closed_after_a_failed_probe(self):
+        old_manager = module.registry.get(module.DEFAULT_SESSION, module.Session).manager
+        self.fail_probe()
+        self.assertTrue(old_manager.closed)
+
+class OpenConnectionTest(FakeLogic2TestCase):
+
+    def test_reconnecting_a_session_closes_its_captures(self):
+        module.start_capture('F4241')
+        previous = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        previous_capture = previous.capture
+        fake_logic2_automation.configure(capture_time_scale=1.0)
+        module.capture_duration_config(5.0)
+        job_handle = int(module.start_capture_async('F4241'))
+        job = module.registry.get(job_handle, module.CaptureJob)
+        sessions_before = self.pool_sessions()
+
+        self.assertEqual(module.open_connection('127.0.0.1', 10430), 'Connection Successful')
+        self.assertIsNot(module.registry.get(module.DEFAULT_SESSION, module.Session), previous)
+        self.assertTrue(previous_capture.closed and job.capture.closed)
+        self.assertIsNone(module.registry.get(job_handle, module.CaptureJob))
+        self.assertEqual(self.pool_sessions(), sessions_before)
+
+    def test_handle_of_another_kind_is_refused(self):
+        fake_logic2_automation.configure(capture_time_scale=1.0)
+        module.capture_duration_config(5.0)
+        job_handle = int(module.start_capture_async('F4241'))
+        sessions_before = self.pool_sessions()
+        self.assertTrue(module.open_connection('127.0.0.1', 10430, job_handle).startswith('-1 ERROR'))
+        self.assertIsInstance(module.registry.get(job_handle), module.CaptureJob)
+        self.assertEqual(self.pool_sessions(), sessions_before)
+
+class RunSequenceTest(FakeLogic2TestCase):
+
+    def test_steps_report_their_results_and_timings(self):
+        fake_logic2_automation.configure(call_delays={'capture.export_raw_data_csv': 0.05})
+        result = json.loads(module.run_sequence([
+            {'op': 'capture_duration_config', 'args': [0.01]},
+            {'op': 'start_capture', 'args': ['F4241']},
+            {'op': 'export_raw_digital', 'args': {'output_dir': self.work_dir, 'digital_channels': [0, 1]}},
+        ]))
+        self.assertEqual(result['status'], 'OK')
+        self.assertEqual([step['op'] for step in result['steps']], ['capture_duration_config', 'start_capture', 'export_raw_digital'])
+        self.assertTrue(all(step['ok'] for step in result['steps']))
+        self.assertEqual(result['steps'][1]['result'], 'Capture started successfully')
+        self.assertGreaterEqual(result['steps'][2]['seconds'], 0.05)
+        self.assertGreaterEqual(result['total_seconds'], sum(step['seconds'] for step in result['steps']))
+        self.assertTrue(os.path.isfile(os.path.join(self.work_dir, 'digital.csv')))
+
+    def test_stop_on_error_skips_the_remaining_steps(self):
+        operations = [{'op': 'no_such_function'}, {'op': 'start_capture', 'args': ['F4241', 'extra', 'arguments']},
+                      {'op': 'capture_duration_config', 'args': [0.02]}]
+        result = json.loads(module.run_sequence(operations, True))
+        self.assertEqual(result['status'], 'ERROR')
+        self.assertEqual(len(result['steps']), 1)
+        self.assertEqual(result['steps'][0]['result'], '-1 ERROR Unknown operation: no_such_function')
+
+        result = json.loads(module.run_sequence(json.dumps(operations), False))
+        self.assertEqual([step['ok'] for step in result['steps']], [False, False, True])
+        self.assertIn('An error occurred while running start_capture', result['steps'][1]['result'])
+        self.assertTrue(module.run_sequence('not json').startswith('-1 ERROR'))
+
+    def test_steps_run_on_the_given_session(self):
+        session_handle = int(module.open_session('127.0.0.1', 10430))
+        result = json.loads(module.run_sequence([
+            {'op': 'device_config', 'args': [[0, 1], 10000000, 3.3, [], 0]},
+            {'op': 'capture_duration_config', 'args': [0.01]},
+            {'op': 'start_capture', 'args': ['F4241']},
+        ], True, session_handle))
+        self.assertEqual(result['status'], 'OK')
+        self.assertIsNotNone(module.registry.get(session_handle, module.Session).capture)
+        self.assertIsNone(module.registry.get(module.DEFAULT_SESSION, module.Session).capture)
+
+class ExportAllTest(FakeLogic2TestCase):
+
+    def setUp(self):
+        super().setUp()
+        module.start_capture('F4241')
+        for name in ('raw', 'bin'):
+            os.makedirs(os.path.join(self.work_dir, name))
+
+    def test_exports_run_side_by_side(self):
+        fake_logic2_automation.configure(call_delays={'capture.export_raw_data_csv': 0.3, 'capture.save_capture': 0.3})
+        exports = [{'op': 'export_raw_digital', 'args': [os.path.join(self.work_dir, 'raw'), [0, 1]]},
+                   {'op': 'export_saleae_capture', 'args': [os.path.join(self.work_dir, 'capture.sal')]}]
+        start = time.perf_counter()
+        result = json.loads(module.export_all(json.dumps(exports), 2))
+        self.assertLess(time.perf_counter() - start, 0.55)
+        self.assertEqual(result['status'], 'OK')
+        self.assertEqual([step['op'] for step in result['steps']], ['export_raw_digital', 'export_saleae_capture'])
+        self.assertTrue(all(step['seconds'] >= 0.3 for step in result['steps']))
+        self.assertGreaterEqual(result['total_seconds'], 0.3)
+
+    def test_failed_export_is_reported_without_stopping_the_others(self):
+        exports = [{'op': 'export_raw_digital', 'args': [os.path.join(self.work_dir, 'missing'), [0]]},
+                   {'op': 'start_capture', 'args': ['F4241']},
+                   {'op': 'export_raw_digital', 'args': [os.path.join(self.work_dir, 'raw'), [0]]}]
+        result = json.loads(module.export_all(exports))
+        self.assertEqual(result['status'], 'ERROR')
+        self.assertEqual([step['ok'] for step in result['steps']], [False, False, True])
+        self.assertEqual(result['steps'][1]['result'], '-1 ERROR Unknown operation: start_capture')
+        self.assertTrue(module.export_all('[').startswith('-1 ERROR'))
+
+    def test_metrics_count_the_bytes_written(self):
+        module.enable_metrics(True)
+        self.addCleanup(module.reset_metrics)
+        self.addCleanup(module.enable_metrics, False)
+        raw_dir = os.path.join(self.work_dir, 'raw')
+        module.export_all([{'op': 'export_raw_digital', 'args': [raw_dir, [0, 1]]},
+                           {'op': 'export_raw_digital_binary', 'args': [os.path.join(self.work_dir, 'bin'), [0, 1]]}])
+        calls = json.loads(module.get_metrics())['calls']
+        self.assertEqual(calls['export_raw_digital']['bytes_written'], os.path.getsize(os.path.join(raw_dir, 'digital.csv')))
+        self.assertEqual(calls['export_raw_digital_binary']['bytes_written'], module._output_bytes(os.path.join(self.work_dir, 'bin')))
+        self.assertEqual(calls['export_all']['count'], 1)
+
+class CaptureJobTest(FakeLogic2TestCase):
+
+    def test_completed_job_is_released_and_installed(self):
+        for _ in range(3):
+            job_handle = int(module.start_capture_async('F4241'))
+            self.assertEqual(module.wait_capture(job_handle, 5), 'COMPLETE')
+            self.assertEqual(module.poll_capture(job_handle), f"-1 ERROR Capture job {job_handle} does not exist.")
+            job_capture = module.registry.get(module.DEFAULT_SESSION, module.Session).capture
+            self.assertFalse(job_capture.closed)
+        self.assertEqual(module.registry.items(module.CaptureJob), [])
+
+    def test_new_capture_closes_the_one_it_replaces(self):
+        module.manual_capture_config(0, 0)
+        module.start_capture('F4241')
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        manual_capture = session.manual_capture
+        module.capture_duration_config(0.01)
+        module.start_capture('F4241')
+        timed_capture = session.capture
+        self.assertTrue(manual_capture.closed)
+        self.assertIsNone(session.manual_capture)
+
+        job_handle = int(module.start_capture_async('F4241'))
+        self.assertEqual(module.wait_capture(job_handle, 5), 'COMPLETE')
+        self.assertTrue(timed_capture.closed)
+        self.assertFalse(session.capture.closed)
+
+    def test_capture_uses_the_configuration_it_was_started_with(self):
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        module.manual_capture_config(0, 0)
+        manual_configuration = session.capture_configuration
+        module.capture_duration_config(0.01)
+        real_start_capture = session.manager.start_capture
+        def start_capture_while_reconfigured(**kwargs):
+            capture = real_start_capture(**kwargs)
+            session.capture_configuration = manual_configuration # Another loop changes the configuration meanwhile
+            return capture
+        session.manager.start_capture = start_capture_while_reconfigured
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+        self.assertIsNone(session.manual_capture)
+        self.assertTrue(module.stop_capture().startswith('-1 ERROR There is no recording capture'))
+
+    def test_failed_job_is_released_and_closed(self):
+        module.manual_capture_config(0, 0)
+        module.start_capture('F4241') # Manual, so the next capture has a capture_mode wait() refuses
+        job = module.CaptureJob(module.registry.get(module.DEFAULT_SESSION, module.Session),
+                                module.registry.get(module.DEFAULT_SESSION, module.Session).capture)
+        job_handle = module.registry.add(job)
+        self.assertTrue(module.wait_capture(job_handle, 5).startswith('-1 ERROR An error occurred while waiting'))
+        self.assertIsNone(module.registry.get(job_handle, module.CaptureJob))
+        self.assertTrue(job.capture.closed)
+
+
+class DeviceCacheTest(FakeLogic2TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(module.configure_device_cache, module.DEVICE_CACHE_TTL_SECONDS, 0)
+        module.configure_device_cache(10, 0)
+        self.session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        # The pool keeps the manager for the next test, so the wrapper must not outlive this one
+        patcher = unittest.mock.patch.object(self.session.manager, 'get_devices', wraps=self.session.manager.get_devices)
+        self.get_devices = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_entries_expire_after_the_ttl(self):
+        devices = module.get_list_of_devices(True)
+        self.assertEqual(json.loads(devices)[0]['device_id'], 'F4241')
+        self.assertEqual(module.get_list_of_devices(True), devices)
+        self.assertEqual(self.get_devices.call_count, 1)
+        module.get_list_of_devices(False) # Cached separately
+        self.assertEqual(self.get_devices.call_count, 2)
+        queried, cached = self.session.devices.entries[False]
+        self.session.devices.entries[False] = (queried - 10.5, cached)
+        module.get_list_of_devices(False)
+        module.get_list_of_devices(True)
+        self.assertEqual(self.get_devices.call_count, 3)
+        module.configure_device_cache(0, 0)
+        module.get_list_of_devices(False)
+        self.assertEqual(self.get_devices.call_count, 4)
+        module.refresh_devices(False)
+        self.assertEqual(self.get_devices.call_count, 5)
+
+    def test_failed_start_capture_drops_the_cached_lists(self):
+        module.get_list_of_devices(False)
+        self.assertEqual(self.session.devices.cached_keys(), [False])
+        with unittest.mock.patch.object(self.session.manager, 'start_capture', side_effect=RuntimeError('device unplugged')):
+            self.assertTrue(module.start_capture('F4241').startswith('-1 ERROR'))
+        self.assertEqual(self.session.devices.cached_keys(), [])
+        module.get_list_of_devices(False)
+        self.assertEqual(self.get_devices.call_count, 2)
+
+    def test_failed_query_drops_the_cached_lists(self):
+        module.get_list_of_devices(True)
+        self.get_devices.side_effect = RuntimeError('Logic 2 went away')
+        self.assertTrue(module.refresh_devices(False).startswith('-1 ERROR'))
+        self.assertEqual(self.session.devices.cached_keys(), [])
+        self.assertTrue(module.get_list_of_devices(True).startswith('-1 ERROR'))
+
+    def test_background_refresher(self):
+        module.get_list_of_devices(False)
+        self.assertTrue(module.configure_device_cache(10, 0.02).endswith('refreshed every 0.02 s'))
+        thread, _ = module.device_refresher
+        self.wait_for(lambda: self.get_devices.call_count >= 3)
+        self.get_devices.side_effect = RuntimeError('Logic 2 went away')
+        self.wait_for(lambda: not self.session.devices.cached_keys())
+        self.assertTrue(module.configure_device_cache(10, 0).endswith('background refresh off'))
+        self.assertIsNone(module.device_refresher)
+        self.assertFalse(thread.is_alive())
+
+class CaptureModeTest(FakeLogic2TestCase):
+
+    def configuration(self):
+        return module.registry.get(module.DEFAULT_SESSION, module.Session).capture_configuration
+
+    def test_trigger_trim_keeps_the_window_around_the_trigger(self):
+        self.assertEqual(module.digital_trigger_capture_config('rising', 2, 0.1, 0.4, 1e-6, 1e-3, [], [], 0),
+                         'Capture Configured Successfully')
+        configuration = self.configuration()
+        capture_mode = configuration.capture_mode
+        self.assertIsNone(configuration.buffer_size_megabytes)
+        self.assertEqual((capture_mode.trigger_type, capture_mode.trigger_channel_index), (fake_logic2_automation.DigitalTriggerType.RISING, 2))
+        self.assertAlmostEqual(capture_mode.trim_data_seconds, 0.5)
+        self.assertEqual(capture_mode.after_trigger_seconds, 0.4)
+        # Pulse widths only apply to pulse triggers
+        self.assertEqual((capture_mode.min_pulse_width_seconds, capture_mode.max_pulse_width_seconds), (None, None))
+
+        module.digital_trigger_capture_config('PULSE_LOW', 1, -1, 0.2, 1e-6, 0, [3, 4], ['high', 0], 128)
+        configuration = self.configuration()
+        capture_mode = configuration.capture_mode
+        self.assertEqual(configuration.buffer_size_megabytes, 128)
+        self.assertIsNone(capture_mode.trim_data_seconds) # Everything since the capture started is kept
+        self.assertEqual((capture_mode.min_pulse_width_seconds, capture_mode.max_pulse_width_seconds), (1e-6, None))
+        self.assertEqual([(linked.channel_index, linked.state.name) for linked in capture_mode.linked_channels], [(3, 'HIGH'), (4, 'LOW')])
+
+    def test_invalid_trigger_keeps_the_configuration(self):
+        configuration = self.configuration()
+        self.assertTrue(module.digital_trigger_capture_config('SIDEWAYS', 0, 0.1, 0.1, 0, 0, [], [], 0).startswith('-1 ERROR'))
+        self.assertTrue(module.digital_trigger_capture_config('RISING', 0, 0.1, 0.1, 0, 0, [1], [], 0).startswith('-1 ERROR'))
+        self.assertIs(self.configuration(), configuration)
+
+    def test_manual_capture_records_until_stopped(self):
+        self.assertEqual(module.manual_capture_config(2.0, 64), 'Capture Configured Successfully')
+        self.assertEqual((self.configuration().capture_mode.trim_data_seconds, self.configuration().buffer_size_megabytes), (2.0, 64))
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        capture = session.manual_capture
+        self.assertIs(session.capture, capture)
+        self.assertFalse(capture.stopped.is_set())
+        self.assertEqual(module.stop_capture(), 'Capture stopped successfully')
+        self.assertTrue(capture.stopped.is_set())
+        self.assertFalse(capture.closed)
+        self.assertIsNone(session.manual_capture)
+        self.assertEqual(module.export_raw_digital(self.work_dir, [0]), 'Raw digital data successfully exported to CSV file')
+        self.assertEqual(module.stop_capture(), '-1 ERROR There is no recording capture to stop.')
+        module.manual_capture_config(0, 0)
+        self.assertEqual((self.configuration().capture_mode.trim_data_seconds, self.configuration().buffer_size_megabytes), (None, None))
+
+    def test_stop_ends_a_trigger_capture_whose_trigger_never_came(self):
+        fake_logic2_automation.configure(capture_time_scale=1.0)
+        module.digital_trigger_capture_config('RISING', 0, 0.1, 30, 0, 0, [], [], 0)
+        job_handle = int(module.start_capture_async('F4241'))
+        self.assertEqual(module.poll_capture(job_handle), 'RUNNING')
+        start = time.perf_counter()
+        self.assertEqual(module.stop_capture(), 'Capture stopped successfully')
+        self.assertEqual(module.wait_capture(job_handle, 5), 'COMPLETE')
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(module.export_raw_digital(self.work_dir, [0]), 'Raw digital data successfully exported to CSV file')
+
+class AnalyzerRegistryTest(FakeLogic2TestCase):
+
+    def test_new_capture_drops_spi_analyzer_of_previous_one(self):
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+        self.assertEqual(module.add_spi_analyzer('SPI', 0, 1, 2, 3, '8 Bits per Transfer (Standard)'), 'SPI analyzer added successfully.')
+        previous_capture = module.registry.get(module.DEFAULT_SESSION, module.Session).capture
+
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        self.assertIsNot(session.capture, previous_capture)
+        self.assertIsNone(session.spi_analyzer)
+        self.assertTrue(module.export_data_table(os.path.join(self.work_dir, 'table.csv'), [], '', []).startswith('-1 ERROR'))
+
+        analyzer_handle = int(module.add_analyzer('I2C', 'I2C', {'SDA': 0, 'SCL': 1}))
+        self.assertEqual(module.export_data_table(os.path.join(self.work_dir, 'table.csv'), [], '', []),
+                         'Analyzers successfully exported to CSV file')
+        self.assertEqual(module.remove_analyzer(analyzer_handle), 'Analyzer removed successfully.')
+
+    def test_collected_job_drops_spi_analyzer(self):
+        module.start_capture('F4241')
+        module.add_spi_analyzer('SPI', 0, 1, 2, 3, '8 Bits per Transfer (Standard)')
+        job_handle = int(module.start_capture_async('F4241'))
+        self.assertEqual(module.wait_capture(job_handle, 5), 'COMPLETE')
+        self.assertIsNone(module.registry.get(module.DEFAULT_SESSION, module.Session).spi_analyzer)
+
+
+class CaptureBudgetTest(FakeLogic2TestCase):
+
+    def test_adapted_configuration_only_applies_to_the_capture(self):
+        module.device_config([0, 1], 10000000, 3.3, [0, 1, 2, 3], 50000000)
+        module.capture_duration_config(1.0)
+        self.assertEqual(module.set_capture_budget(100, 0, 'adapt', [], 0, 0.01), 'Capture Budget Set')
+        session = module.registry.get(module.DEFAULT_SESSION, module.Session)
+        configured = session.device_configuration
+
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+        captured = session.capture.device_configuration
+        self.assertIs(session.device_configuration, configured)
+        self.assertEqual(configured.analog_sample_rate, 50000000)
+        self.assertLess((captured.analog_sample_rate, len(captured.enabled_analog_channels)),
+                        (configured.analog_sample_rate, len(configured.enabled_analog_channels)))
+        self.assertIsNotNone(session.budget['last_adaptation'])
+
+
+class BatchReprocessTest(FakeLogic2TestCase):
+
+    def test_single_instance_string_is_one_instance(self):
+        capture_path = os.path.join(self.work_dir, 'capture.sal')
+        open(capture_path, 'w').close()
+        batch_handle = int(module.start_batch_reprocess(capture_path, [], os.path.join(self.work_dir, 'manifest.json'),
+                                                        '127.0.0.1:10430', 1))
+        batch = module.registry.get(batch_handle, module.BatchJob)
+        self.assertEqual(batch.pool_keys, [('127.0.0.1', 10430)])
+        deadline = time.monotonic() + 5
+        while json.loads(module.poll_batch_reprocess(batch_handle))['state'] == 'RUNNING' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status = json.loads(module.stop_batch_reprocess(batch_handle, 5))
+        self.assertEqual((status['state'], status['captures_completed']), ('COMPLETE', 1))
+
+
+class DeadlineTest(FakeLogic2TestCase):
+
+    def misses(self):
+        return [(miss['name'], miss['attempt']) for miss in json.loads(module.get_deadline_report())['misses']]
+
+    def test_stalled_wait_stops_and_closes_the_capture(self):
+        module.configure_call_deadlines({'capture.wait': 0.2}, 0, 0, 0.01)
+        fake_logic2_automation.configure(call_delays={'capture.wait': 3.0})
+        start = time.perf_counter()
+        result = module.start_capture('F4241')
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn('the capture was stopped and closed', result)
+        self.assertIsNone(module.registry.get(module.DEFAULT_SESSION, module.Session).capture)
+        self.assertEqual(self.misses(), [('capture.wait', 1)])
+
+    def test_trigger_wait_is_not_bounded_by_capture_wait(self):
+        module.digital_trigger_capture_config('RISING', 0, 0.001, 0.001, 0, 0, [], [], 0)
+        module.configure_call_deadlines({'capture.wait': 0.1}, 0, 0, 0.01)
+        fake_logic2_automation.configure(call_delays={'capture.wait': 0.5}) # The trigger comes late
+        self.assertEqual(module.start_capture('F4241'), 'Capture started successfully')
+
+        module.configure_call_deadlines({'capture.wait_trigger': 0.1}, 0, 0, 0.01)
+        self.assertIn('the capture was stopped and closed', module.start_capture('F4241'))
+
+    def test_stalled_export_returns_at_its_deadline_without_retry(self):
+        module.start_capture('F4241')
+        module.configure_call_deadlines({'capture.export_raw_data_csv': 0.2}, 0, 2, 0.01)
+        fake_logic2_automation.configure(call_delays={'capture.export_raw_data_csv': 3.0})
+        start = time.perf_counter()
+        result = module.export_raw_digital(self.work_dir, [0, 1])
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn('did not return within 0.2 seconds', result)
+        self.assertEqual(self.misses(), [('capture.export_raw_data_csv', 1)])
+
+    def test_idempotent_call_is_retried_after_a_stall(self):
+        module.configure_device_cache(0, 0)
+        module.configure_call_deadlines({'manager.get_devices': 0.1}, 0, 2, 0.1)
+        fake_logic2_automation.configure(call_delays={'manager.get_devices': 3.0})
+        threading.Timer(0.15, fake_logic2_automation.configure, kwargs={'call_delays': {}}).start() # Logic 2 recovers
+        try:
+            self.assertIn('F4241', module.get_list_of_devices(True))
+            self.assertEqual(self.misses(), [('manager.get_devices', 1)])
+
+            fake_logic2_automation.configure(call_delays={'manager.get_devices': 3.0})
+            self.assertTrue(module.get_list_of_devices(True).startswith('-1 ERROR'))
+            self.assertEqual(self.misses()[1:], [('manager.get_devices', 1), ('manager.get_devices', 2), ('manager.get_devices', 3)])
+        finally:
+            module.configure_device_cache(module.DEVICE_CACHE_TTL_SECONDS, 0)
+
+    def test_blocking_calls_have_finite_default_deadlines(self):
+        for name in ('manager.start_capture', 'capture.wait', 'capture.export_raw_data_csv', 'capture.export_raw_data_binary',
+                     'capture.export_data_table', 'capture.save_capture', 'manager.load_capture'):
+            self.assertGreater(module.DEFAULT_CALL_DEADLINES.get(name, 0), 0, name)
+        self.assertNotIn('capture.wait_trigger', module.DEFAULT_CALL_DEADLINES)
+
+    def test_cancel_with_zero_stop_deadline_does_not_wait_for_the_capture(self):
+        module.configure_call_deadlines({'capture.stop': 0}, 0, 0, 0.01)
+        fake_logic2_automation.configure(call_delays={'capture.wait': 3.0})
+        job_handle = int(module.start_capture_async('F4241'))
+        start = time.perf_counter()
+        self.assertEqual(module.cancel_capture(job_handle), 'Capture cancelled')
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+    def test_stalled_pool_close_is_abandoned_and_reported(self):
+        module.close_connection()
+        module.configure_call_deadlines({'manager.close': 0.2}, 0, 0, 0.01)
+        fake_logic2_automation.configure(call_delays={'manager.close': 3.0})
+        start = time.perf_counter()
+        self.assertTrue(module.close_idle_connections(0).startswith('Closed'))
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertIn(('manager.close', 1), self.misses())
+        fake_logic2_automation.configure(call_delays={})
+        self.assertEqual(module.open_connection('127.0.0.1', 10430), 'Connection Successful')
+
+
+def write_data_table(path, frame_types):
+    """
+    Writes an SPI data table with one frame per type, 1 us apart.
+    """
+    with open(path, 'w') as table_file:
+        table_file.write('name,type,start_time,duration,"mosi","miso"\n')
+        for index, frame_type in enumerate(frame_types):
+            value = f"0x{index:02X}" if frame_type == 'result' else ''
+            table_file.write(f'"SPI","{frame_type}",{index * 1e-6:.9f},5e-07,{value},{value}\n')
+
+
+class AnalyzerTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def transactions(self, frame_types):
+        path = os.path.join(self.work_dir, 'spi.csv')
+        write_data_table(path, frame_types)
+        return module.AnalyzerTable(path).transactions.tolist()
+
+    def test_orphan_leading_disable_is_ignored(self):
+        self.assertEqual(self.transactions(['disable', 'enable', 'result', 'result', 'disable', 'enable', 'result', 'disable']),
+                         [-1, 0, 0, 0, 0, 1, 1, 1])
+
+    def test_missing_end_closes_at_end_of_data(self):
+        self.assertEqual(self.transactions(['result', 'enable', 'result', 'disable', 'result', 'enable', 'result', 'result']),
+                         [-1, 0, 0, 0, -1, 1, 1, 1])
+
+    def test_query_by_transaction(self):
+        path = os.path.join(self.work_dir, 'spi.csv')
+        write_data_table(path, ['disable', 'enable', 'result', 'disable', 'enable', 'result', 'result'])
+        table_handle = int(module.open_analyzer_table(path))
+        try:
+            status, value_columns, _, start_times, _, _, transactions, values = module.query_analyzer_frames(table_handle, 0, -1, 1)
+            self.assertEqual(status, 'OK')
+            self.assertEqual(len(start_times) // 8, 3)
+            self.assertEqual(json.loads(module.analyzer_table_statistics(table_handle))['transactions'], 2)
+        finally:
+            module.close_analyzer_table(table_handle)
+
+
+def write_raw_digital(path, times, states):
+    """
+    Writes a digital.csv export with one column per row of states.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as csv_file:
+        csv_file.write('Time [s],' + ','.join(f'Channel {channel}' for channel in range(len(states))) + '\n')
+        for row in zip(times, *states):
+            csv_file.write(f'{row[0]:.9f},' + ','.join(str(state) for state in row[1:]) + '\n')
+
+
+def unpack_transitions(channels, counts, sample_indices, states):
+    """
+    Splits the flat transition buffers of load_raw_digital_arrays() into channel -> [(sample index, state), ...].
+    """
+    indices = struct.unpack(f'<{len(sample_indices) // 8}q', sample_indices)
+    result, offset = {}, 0
+    for channel, count in zip(channels, counts):
+        result[channel] = list(zip(indices[offset:offset + count], states[offset:offset + count]))
+        offset += count
+    return result
+
+
+class RawDigitalReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.csv_path = os.path.join(self.work_dir, 'digital.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def read_chunked(self, chunk_rows):
+        reader_handle = int(module.open_raw_reader(self.csv_path, chunk_rows, 'transitions', 1e6))
+        merged = {}
+        try:
+            while True:
+                status, channels, counts, sample_indices, states = module.read_next_chunk(reader_handle)
+                if status == 'END':
+                    return merged
+                self.assertEqual(status, 'CHUNK')
+                for channel, transitions in unpack_transitions(channels, counts, sample_indices, states).items():
+                    merged.setdefault(channel, []).extend(transitions)
+        finally:
+            self.assertEqual(module.close_raw_reader(reader_handle), 'Reader closed')
+
+    def test_chunks_continue_across_their_boundaries(self):
+        # Channel 0 toggles every row, channel 1 every third row, so some chunks start without a change on it
+        times = [row * 1e-6 for row in range(10)]
+        write_raw_digital(self.csv_path, times, [[row % 2 for row in range(10)], [(row // 3) % 2 for row in range(10)]])
+        status, channels, counts, sample_indices, states = module.load_raw_digital_arrays(self.csv_path, 1e6)
+        self.assertEqual(status, 'Raw digital data loaded')
+        whole = unpack_transitions(channels, counts, sample_indices, states)
+        self.assertEqual(whole[1], [(0, 0), (3, 1), (6, 0), (9, 1)])
+        self.assertEqual(len(whole[0]), 10)
+        for chunk_rows in (1, 2, 3, 4, 10, 100):
+            self.assertEqual(self.read_chunked(chunk_rows), whole, chunk_rows)
+
+    def test_rows_mode_returns_the_file_rows(self):
+        write_raw_digital(self.csv_path, [0.0, 1e-6, 2e-6], [[0, 1, 0], [1, 1, 0]])
+        reader_handle = int(module.open_raw_reader(self.csv_path, 2, 'rows', 0))
+        status, channels, counts, times, samples = module.read_next_chunk(reader_handle)
+        self.assertEqual((status, channels, counts), ('CHUNK', [0, 1], [2]))
+        self.assertEqual(struct.unpack('<2d', times), (0.0, 1e-6))
+        self.assertEqual(struct.unpack('<4d', samples), (0.0, 1.0, 1.0, 1.0))
+        self.assertEqual(module.read_next_chunk(reader_handle)[2], [1])
+        self.assertEqual(module.read_next_chunk(reader_handle)[0], 'END')
+        module.close_raw_reader(reader_handle)
+
+    def test_empty_file(self):
+        write_raw_digital(self.csv_path, [], [[], []])
+        status, channels, counts, sample_indices, states = module.load_raw_digital_arrays(self.csv_path, 1e6)
+        self.assertEqual((status, channels, counts, sample_indices, states), ('Raw digital data loaded', [0, 1], [0, 0], b'', b''))
+        self.assertEqual(self.read_chunked(4), {})
+
+    def test_single_row(self):
+        write_raw_digital(self.csv_path, [0.5], [[1], [0]])
+        status, channels, counts, sample_indices, states = module.load_raw_digital_arrays(self.csv_path, 1e6)
+        self.assertEqual(unpack_transitions(channels, counts, sample_indices, states), {0: [(500000, 1)], 1: [(500000, 0)]})
+        self.assertEqual(self.read_chunked(4), {0: [(500000, 1)], 1: [(500000, 0)]})
+
+    def test_unknown_reader_handle(self):
+        self.assertTrue(module.read_next_chunk(987654)[0].startswith('-1 ERROR'))
+        self.assertTrue(module.close_raw_reader(987654).startswith('-1 ERROR'))
+
+class DecimateAnalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.csv_path = os.path.join(self.work_dir, 'analog.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def decimate(self, waveform, method, target_points, anti_alias, dt=1e-3):
+        write_raw_digital(self.csv_path, [index * dt for index in range(len(waveform))], [waveform])
+        status, channels, counts, t0, dt, samples = module.decimate_analog_waveforms(self.work_dir, method, target_points, anti_alias)
+        self.assertEqual((status, channels), ('Analog waveforms decimated', [0]))
+        return list(struct.unpack(f'<{counts[0]}f', samples)), t0[0], dt[0]
+
+    def test_minmax_keeps_a_single_sample_glitch(self):
+        waveform = [0.0] * 1000
+        waveform[537] = 5.0
+        samples, t0, dt = self.decimate(waveform, 'minmax', 20, True)
+        self.assertEqual(len(samples), 20)
+        self.assertEqual(samples.count(5.0), 1)
+        self.assertEqual(t0, 0.0)
+        self.assertAlmostEqual(dt, 50e-3)
+
+    def test_no_target_returns_every_sample(self):
+        waveform = [float(index % 7) for index in range(100)]
+        for target_points in (0, -1):
+            samples, t0, dt = self.decimate(waveform, 'average', target_points, True)
+            self.assertEqual(samples, waveform)
+            self.assertAlmostEqual(dt, 1e-3)
+
+    def test_anti_alias_shift_keeps_a_ramp_on_its_time_axis(self):
+        # A ramp whose value is its own time in ms stays on it after the filter's delay is added to t0
+        ramp = [float(index) for index in range(1003)]
+        for method in ('average', 'subsample'):
+            for anti_alias in (False, True):
+                samples, t0, dt = self.decimate(ramp, method, 100, anti_alias)
+                self.assertAlmostEqual(dt, 11e-3)
+                full_blocks = samples if method == 'subsample' else samples[:-1]
+                for index, value in enumerate(full_blocks):
+                    self.assertAlmostEqual(value * 1e-3, t0 + index * dt, places=6, msg=(method, anti_alias, index))
+        # The filter delay is two half blocks
+        self.assertAlmostEqual(self.decimate(ramp, 'subsample', 100, True)[1], 10e-3)
+
+    def test_filtering_in_spans_matches_one_pass(self):
+        waveform = [float((index * 37) % 101) for index in range(1003)]
+        for method in ('average', 'subsample'):
+            whole = self.decimate(waveform, method, 100, True)
+            with unittest.mock.patch.object(module, 'DECIMATION_FILTER_SPAN', 30):
+                spans = self.decimate(waveform, method, 100, True)
+            self.assertEqual(len(spans[0]), len(whole[0]))
+            for expected, value in zip(whole[0], spans[0]):
+                self.assertAlmostEqual(value, expected, places=3)
+            self.assertEqual(spans[1:], whole[1:])
+
+    def test_unknown_method(self):
+        write_raw_digital(self.csv_path, [0.0, 1e-3], [[0.0, 1.0]])
+        self.assertTrue(module.decimate_analog_waveforms(self.work_dir, 'median', 1, False)[0].startswith('-1 ERROR'))
+
+def write_binary_digital(path, initial_state, begin_time, end_time, transition_times, version=0):
+    with open(path, 'wb') as bin_file:
+        bin_file.write(module.BINARY_DIGITAL_HEADER.pack(b'<SALEAE>', version, 0, initial_state, begin_time, end_time, len(transition_times)))
+        bin_file.write(struct.pack(f'<{len(transition_times)}d', *transition_times))
+
+
+def write_binary_analog(path, begin_time, sample_rate, downsample, samples, version=0):
+    with open(path, 'wb') as bin_file:
+        bin_file.write(module.BINARY_ANALOG_HEADER.pack(b'<SALEAE>', version, 1, begin_time, sample_rate, downsample, len(samples)))
+        bin_file.write(struct.pack(f'<{len(samples)}f', *samples))
+
+
+class BinaryExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_digital_round_trip(self):
+        path = os.path.join(self.work_dir, 'digital_2.bin')
+        write_binary_digital(path, 1, -0.5, 2.0, [0.0, 0.25, 1.5])
+        digital = module.read_binary_digital(path)
+        self.assertEqual((digital['initial_state'], digital['begin_time'], digital['end_time']), (1, -0.5, 2.0))
+        self.assertEqual(digital['transition_times'].tolist(), [0.0, 0.25, 1.5])
+        del digital
+        status, channels, counts, sample_indices, states = module.load_binary_digital_arrays(self.work_dir, 4)
+        self.assertEqual((status, channels), ('Raw digital data loaded', [2]))
+        self.assertEqual(unpack_transitions(channels, counts, sample_indices, states), {2: [(-2, 1), (0, 0), (1, 1), (6, 0)]})
+
+    def test_analog_round_trip(self):
+        path = os.path.join(self.work_dir, 'analog_1.bin')
+        write_binary_analog(path, 0.125, 1000000, 4, [0.5, -1.0, 3.25])
+        analog = module.read_binary_analog(path)
+        self.assertEqual((analog['begin_time'], analog['sample_rate'], analog['downsample']), (0.125, 1000000, 4))
+        self.assertEqual(analog['samples'].tolist(), [0.5, -1.0, 3.25])
+        del analog
+        status, channels, counts, t0, dt, samples = module.load_binary_analog_waveforms(self.work_dir)
+        self.assertEqual((status, channels, counts, t0, dt), ('Raw analog data loaded', [1], [3], [0.125], [4e-6]))
+        self.assertEqual(struct.unpack('<3f', samples), (0.5, -1.0, 3.25))
+
+    def test_empty_files(self):
+        write_binary_digital(os.path.join(self.work_dir, 'digital_0.bin'), 0, 0.0, 1.0, [])
+        write_binary_analog(os.path.join(self.work_dir, 'analog_0.bin'), 0.0, 1000000, 1, [])
+        self.assertEqual(module.read_binary_digital(os.path.join(self.work_dir, 'digital_0.bin'))['transition_times'].size, 0)
+        self.assertEqual(module.read_binary_analog(os.path.join(self.work_dir, 'analog_0.bin'))['samples'].size, 0)
+
+    def test_other_versions_are_rejected(self):
+        digital_path, analog_path = os.path.join(self.work_dir, 'digital_0.bin'), os.path.join(self.work_dir, 'analog_0.bin')
+        for version in (1, -1):
+            write_binary_digital(digital_path, 0, 0.0, 1.0, [0.5], version=version)
+            write_binary_analog(analog_path, 0.0, 1000000, 1, [0.5], version=version)
+            with self.assertRaisesRegex(ValueError, f'version {version}'):
+                module.read_binary_digital(digital_path)
+            with self.assertRaisesRegex(ValueError, f'version {version}'):
+                module.read_binary_analog(analog_path)
+        self.assertTrue(module.load_binary_digital_arrays(self.work_dir, 1)[0].startswith('-1 ERROR'))
+        self.assertTrue(module.load_binary_analog_waveforms(self.work_dir)[0].startswith('-1 ERROR'))
+
+    def test_wrong_type_and_truncated_files_are_rejected(self):
+        path = os.path.join(self.work_dir, 'digital_0.bin')
+        write_binary_analog(path, 0.0, 1000000, 1, [0.5, 0.25])
+        with self.assertRaisesRegex(ValueError, 'not a Saleae digital'):
+            module.read_binary_digital(path)
+        write_binary_digital(path, 0, 0.0, 1.0, [0.5, 0.75])
+        with open(path, 'r+b') as bin_file:
+            bin_file.truncate(module.BINARY_DIGITAL_HEADER.size + 8)
+        with self.assertRaisesRegex(ValueError, 'unsupported binary export layout'):
+            module.read_binary_digital(path)
+        with open(path, 'r+b') as bin_file:
+            bin_file.truncate(10)
+        with self.assertRaisesRegex(ValueError, 'not a Saleae digital'):
+            module.read_binary_digital(path)
+
+class SharedMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+
+    def tearDown(self):
+        module.release_all_shared_blocks()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def mapped(self, description):
+        """
+        Maps a block by name the way another process would and returns a copy of its array.
+        """
+        block = shared_memory.SharedMemory(name=description['name'])
+        try:
+            dtype = description['dtype']
+            dtype = module.np.dtype([tuple(field) for field in dtype] if isinstance(dtype, list) else dtype)
+            return module.np.ndarray(tuple(description['shape']), dtype=dtype, buffer=block.buf).copy()
+        finally:
+            block.close()
+
+    def assertReleased(self, block_name):
+        self.assertEqual(module.release_shared_block(block_name), 'Shared memory block released')
+        self.assertNotIn(block_name, module.shared_blocks)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block_name)
+        self.assertTrue(module.release_shared_block(block_name).startswith('-1 ERROR'))
+
+    def test_digital_transitions(self):
+        csv_path = os.path.join(self.work_dir, 'digital.csv')
+        write_raw_digital(csv_path, [0.0, 1e-6, 2e-6], [[0, 1, 0], [1, 1, 1]])
+        shared = json.loads(module.share_digital_transitions(csv_path, 1e6))
+        self.assertEqual((shared['channels'], shared['transition_counts']), ([0, 1], [3, 1]))
+        self.assertEqual((shared['sample_indices']['dtype'], shared['sample_indices']['shape']), ('<i8', [4]))
+        self.assertEqual((shared['states']['dtype'], shared['states']['shape']), ('|u1', [4]))
+        self.assertEqual(self.mapped(shared['sample_indices']).tolist(), [0, 1, 2, 0])
+        self.assertEqual(self.mapped(shared['states']).tolist(), [0, 1, 0, 1])
+        self.assertNotEqual(shared['sample_indices']['name'], shared['states']['name'])
+        self.assertReleased(shared['sample_indices']['name'])
+        self.assertReleased(shared['states']['name'])
+
+    def test_analog_waveforms(self):
+        write_binary_analog(os.path.join(self.work_dir, 'analog_0.bin'), 0.5, 1000, 1, [1.0, 2.0])
+        write_binary_analog(os.path.join(self.work_dir, 'analog_3.bin'), 0.5, 1000, 2, [-1.5])
+        shared = json.loads(module.share_analog_waveforms(self.work_dir))
+        self.assertEqual((shared['channels'], shared['sample_counts'], shared['t0'], shared['dt']), ([0, 3], [2, 1], [0.5, 0.5], [1e-3, 2e-3]))
+        self.assertEqual((shared['samples']['dtype'], shared['samples']['shape']), ('<f4', [3]))
+        self.assertEqual(self.mapped(shared['samples']).tolist(), [1.0, 2.0, -1.5])
+        self.assertReleased(shared['samples']['name'])
+
+    def test_analyzer_table_keeps_its_structured_dtype(self):
+        csv_path = os.path.join(self.work_dir, 'spi.csv')
+        write_data_table(csv_path, ['enable', 'result', 'disable'])
+        frames = json.loads(module.share_analyzer_table(csv_path))['frames']
+        self.assertEqual([field for field, _ in frames['dtype']], ['name', 'type', 'start_time', 'duration', 'mosi', 'miso'])
+        self.assertEqual(frames['shape'], [3])
+        table = self.mapped(frames)
+        self.assertEqual(table['type'].tolist(), ['enable', 'result', 'disable'])
+        self.assertEqual(table['start_time'].tolist(), [0.0, 1e-6, 2e-6])
+        self.assertReleased(frames['name'])
+
+    def test_release_all(self):
+        csv_path = os.path.join(self.work_dir, 'digital.csv')
+        write_raw_digital(csv_path, [], [[]])
+        shared = json.loads(module.share_digital_transitions(csv_path, 1e6))
+        self.assertEqual(shared['sample_indices']['shape'], [0])
+        self.assertEqual(module.release_all_shared_blocks(), 'Shared memory blocks released')
+        self.assertFalse(module.shared_blocks)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=shared['states']['name'])
+
+    def test_failure_shares_nothing(self):
+        self.assertTrue(module.share_digital_transitions(os.path.join(self.work_dir, 'missing.csv'), 1e6).startswith('-1 ERROR'))
+        self.assertFalse(module.shared_blocks)
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        module.reset_metrics()
+        self.assertEqual(module.enable_metrics(True), 'Metrics enabled')
+
+    def tearDown(self):
+        module.enable_metrics(False)
+        module.reset_metrics()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def calls(self):
+        return json.loads(module.get_metrics())['calls']
+
+    def test_percentiles_use_the_recent_window(self):
+        with unittest.mock.patch.object(module, 'METRICS_WINDOW', 6):
+            for seconds in range(1, 11):
+                module.metrics.record('step', float(seconds), seconds != 3)
+        entry = self.calls()['step']
+        self.assertEqual((entry['count'], entry['failures'], entry['total_seconds'], entry['max_seconds'], entry['mean_seconds']),
+                         (10, 1, 55.0, 10.0, 5.5))
+        # The window holds 5..10: the nearest-rank p50 is its 3rd value, p95 and p99 its 6th
+        self.assertEqual((entry['p50_seconds'], entry['p95_seconds'], entry['p99_seconds']), (7.0, 10.0, 10.0))
+        module.metrics.record('single', 0.25, True)
+        self.assertEqual(self.calls()['single']['p50_seconds'], 0.25)
+
+    def test_instrumented_functions_count_error_results_as_failures(self):
+        @module._instrumented
+        def step(result):
+            return result
+
+        step('OK')
+        step(('-1 ERROR failed', []))
+        step('-1 ERROR failed')
+        with self.assertRaises(ZeroDivisionError):
+            module._instrumented(lambda: 1 / 0)()
+        calls = self.calls()
+        self.assertEqual((calls['step']['count'], calls['step']['failures']), (3, 2))
+        self.assertEqual((calls['<lambda>']['count'], calls['<lambda>']['failures']), (1, 1))
+        self.assertEqual(calls['step']['bytes_written'], 0)
+
+    def test_timed_automation_calls(self):
+        with module.metrics.timed('capture.wait'):
+            pass
+        with self.assertRaises(RuntimeError):
+            with module.metrics.timed('capture.wait'):
+                raise RuntimeError('lost')
+        entry = self.calls()['capture.wait']
+        self.assertEqual((entry['count'], entry['failures']), (2, 1))
+
+    def test_disabled_and_reset(self):
+        module.metrics.record('step', 1.0, True)
+        module.metrics.add_bytes('step', 100)
+        self.assertEqual(self.calls()['step']['bytes_written'], 100)
+        self.assertEqual(module.enable_metrics(False), 'Metrics disabled')
+        module._instrumented(lambda: 'OK')()
+        with module.metrics.timed('capture.wait'):
+            pass
+        metrics = json.loads(module.get_metrics())
+        self.assertFalse(metrics['enabled'])
+        self.assertEqual(list(metrics['calls']), ['step'])
+        self.assertEqual(module.reset_metrics(), 'Metrics reset')
+        self.assertEqual(self.calls(), {})
+
+    def test_trace_file_rolls_over(self):
+        trace_path = os.path.join(self.work_dir, 'trace.jsonl')
+        module.enable_metrics(True, trace_path, 0.001)
+        for _ in range(40):
+            module.metrics.record('step', 0.5, True)
+        module.enable_metrics(False)
+        self.assertTrue(os.path.isfile(trace_path + '.1'))
+        self.assertFalse(os.path.exists(trace_path + '.2'))
+        self.assertLessEqual(os.path.getsize(trace_path + '.1'), 1049)
+        lines = []
+        for path in (trace_path + '.1', trace_path):
+            with open(path) as trace_file:
+                lines += [json.loads(line) for line in trace_file]
+        self.assertTrue(0 < len(lines) < 40)
+        self.assertEqual({(line['name'], line['seconds'], line['ok']) for line in lines}, {('step', 0.5, True)})
+        # Once disabled, the trace file is closed and nothing more is written
+        size = os.path.getsize(trace_path)
+        module.metrics.record('step', 0.5, True)
+        self.assertEqual(os.path.getsize(trace_path), size)
+
+LAZY_IMPORT_CHECK = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location('Logic2_Python_Module_for_LabVIEW', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = sorted(name for name in ('numpy', 'saleae', 'saleae.automation') if name in sys.modules)
+stand_in = type(module.np).__name__
+loads_numpy = module.np.load.__module__
+print(json.dumps([imported, stand_in, loads_numpy, type(module.np).__name__]))
+"""
+
+
+class LazyImportTest(unittest.TestCase):
+
+    def test_loading_the_module_imports_neither_numpy_nor_saleae(self):
+        output = subprocess.run([sys.executable, '-c', LAZY_IMPORT_CHECK, MODULE_PATH], capture_output=True, text=True, timeout=60)
+        self.assertEqual(output.returncode, 0, output.stderr)
+        imported, stand_in, loads_numpy, resolved = json.loads(output.stdout)
+        self.assertEqual((imported, stand_in), ([], '_LazyModule'))
+        # The first attribute imports NumPy and replaces the stand-in; its load is NumPy's, not the stand-in's
+        self.assertEqual((loads_numpy, resolved), ('numpy', 'module'))
+
+    def test_attributes_resolve_to_the_real_module(self):
+        stand_in = module._LazyModule('json', 'not_a_global_of_the_module')
+        self.assertIs(stand_in.load, json.load)
+        self.assertEqual(stand_in.loads('[1]'), [1])
+        self.assertIs(stand_in._resolve(), json)
+        with self.assertRaises(AttributeError):
+            module._LazyModule('json', 'unused').missing_attribute
+
+class TransitionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.csv_path = os.path.join(self.work_dir, 'digital.csv')
+        # Channel 0 toggles every microsecond from 0 at 0 s, channel 1 stays high
+        write_raw_digital(self.csv_path, [0.0, 1e-6, 2e-6, 3e-6, 4e-6, 5e-6], [[0, 1, 0, 1, 0, 1], [1] * 6])
+
+    def tearDown(self):
+        for handle, _ in module.registry.items(module.TransitionIndex):
+            module.close_transition_index(handle)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def open_index(self, source=None):
+        index_handle = module.open_transition_index(source or self.work_dir)
+        self.assertFalse(index_handle.startswith('-1 ERROR'), index_handle)
+        return int(index_handle)
+
+    def test_build_writes_the_sidecar_once(self):
+        index_path = module.build_transition_index(self.work_dir, False)
+        self.assertEqual(index_path, self.csv_path + '.index.npz')
+        modified = os.path.getmtime(index_path)
+        with unittest.mock.patch.object(module, '_build_transition_index', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(module.build_transition_index(self.csv_path, False), index_path)
+            self.open_index()
+            self.assertTrue(module.build_transition_index(self.csv_path, True).startswith('-1 ERROR'))
+        self.assertEqual(os.path.getmtime(index_path), modified)
+
+    def test_changed_export_is_indexed_again(self):
+        module.build_transition_index(self.work_dir, False)
+        write_raw_digital(self.csv_path, [0.0, 1e-6, 2e-6], [[1, 1, 0], [0, 0, 0]])
+        index_handle = self.open_index()
+        self.assertEqual(module.digital_state_at(index_handle, 0, 0.5e-6), '1')
+        self.assertEqual(module.digital_state_at(index_handle, 1, 0.5e-6), '0')
+
+    def test_state_at(self):
+        index_handle = self.open_index()
+        self.assertEqual([module.digital_state_at(index_handle, 0, t * 1e-6) for t in (-1, 0.5, 1.5, 2.5, 4.5, 9)],
+                         ['0', '0', '1', '0', '0', '1'])
+        self.assertEqual(module.digital_state_at(index_handle, 0, 2e-6), '0') # The new state holds from the transition on
+        self.assertEqual(module.digital_state_at(index_handle, 1, 3.3e-6), '1')
+        self.assertTrue(module.digital_state_at(index_handle, 7, 0).startswith('-1 ERROR'))
+
+    def test_edges_between(self):
+        index_handle = self.open_index()
+        status, count, times, states = module.digital_edges_between(index_handle, 0, 0.5e-6, 3e-6)
+        self.assertEqual((status, count, states), ('OK', 2, b'\x01\x00'))
+        self.assertEqual(struct.unpack('<2d', times), (1e-6, 2e-6))
+        self.assertEqual(module.digital_edges_between(index_handle, 1, 0, 1)[:2], ('OK', 0))
+
+    def test_pulse_at(self):
+        index_handle = self.open_index()
+        pulse = json.loads(module.digital_pulse_at(index_handle, 0, 2.5e-6))
+        self.assertEqual((pulse['state'], pulse['start'], pulse['end'], pulse['complete']), (0, 2e-6, 3e-6, True))
+        self.assertAlmostEqual(pulse['width_seconds'], 1e-6)
+        # Before the first transition the pulse starts at the capture begin, a channel without transitions spans the capture
+        self.assertEqual(json.loads(module.digital_pulse_at(index_handle, 0, 0.5e-6))['complete'], False)
+        pulse = json.loads(module.digital_pulse_at(index_handle, 1, 2e-6))
+        self.assertEqual((pulse['state'], pulse['start'], pulse['end'], pulse['complete']), (1, 0.0, 5e-6, False))
+
+    def test_frequency_between(self):
+        index_handle = self.open_index()
+        frequency = json.loads(module.digital_frequency_between(index_handle, 0, 0, 1))
+        self.assertEqual(frequency['rising_edges'], 3)
+        self.assertAlmostEqual(frequency['period_seconds'], 2e-6)
+        self.assertAlmostEqual(frequency['frequency_hz'], 500000.0, places=3)
+        self.assertEqual(json.loads(module.digital_frequency_between(index_handle, 0, 0, 2e-6)),
+                         {'rising_edges': 1, 'frequency_hz': 0.0, 'period_seconds': 0.0})
+
+    def test_binary_export(self):
+        write_binary_digital(os.path.join(self.work_dir, 'digital_3.bin'), 1, 0.0, 1.0, [0.25, 0.5, 0.75])
+        self.assertEqual(module.build_transition_index(self.work_dir, False), os.path.join(self.work_dir, 'digital_index.npz'))
+        index_handle = self.open_index()
+        self.assertEqual([module.digital_state_at(index_handle, 3, t) for t in (0.1, 0.3, 0.6, 0.9)], ['1', '0', '1', '0'])
+        self.assertEqual(json.loads(module.digital_pulse_at(index_handle, 3, 0.9))['end'], 1.0)
+
+    def test_close(self):
+        index_handle = self.open_index()
+        # Closing it as another kind of handle leaves it open
+        for close, name in ((module.close_raw_reader, 'Reader'), (module.close_analyzer_table, 'Analyzer table'),
+                            (module.close_measurement_accumulator, 'Measurement accumulator'), (module.disconnect_worker, 'Worker')):
+            self.assertEqual(close(index_handle), f'-1 ERROR {name} {index_handle} does not exist.')
+        self.assertEqual(module.digital_state_at(index_handle, 1, 0), '1')
+        self.assertEqual(module.close_transition_index(index_handle), 'Transition index closed')
+        self.assertTrue(module.close_transition_index(index_handle).startswith('-1 ERROR'))
+        self.assertTrue(module.digital_state_at(index_handle, 0, 0).startswith('-1 ERROR'))
+        self.assertTrue(module.open_transition_index(os.path.join(self.work_dir, 'missing.csv')).startswith('-1 ERROR'))
+
+def write_square_wave(directory, channel, period, high_seconds, delay, cycles, end_time):
+    """
+    Writes a digital_N.bin file of a channel that starts low and rises every period from delay on.
+    """
+    os.makedirs(directory, exist_ok=True)
+    times = [time_seconds for cycle in range(cycles) for time_seconds in (delay + cycle * period, delay + cycle * period + high_seconds)]
+    write_binary_digital(os.path.join(directory, f'digital_{channel}.bin'), 0, 0.0, end_time, times)
+
+
+class MeasureDigitalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        # 1 MHz at 50 % duty, the same at 25 % duty 100 ns later, and a 10 ns glitch between two slow pulses
+        write_square_wave(self.work_dir, 0, 1e-6, 0.5e-6, 0.5e-6, 10, 11e-6)
+        write_square_wave(self.work_dir, 1, 1e-6, 0.25e-6, 0.6e-6, 10, 11e-6)
+        write_binary_digital(os.path.join(self.work_dir, 'digital_2.bin'), 0, 0.0, 11e-6, [1e-6, 1.01e-6, 3e-6, 5e-6])
+        write_binary_digital(os.path.join(self.work_dir, 'digital_3.bin'), 1, 0.0, 11e-6, [])
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def measure(self, reference_channel=0, source=None):
+        table = json.loads(module.measure_digital(source or self.work_dir, 50e-9, reference_channel, 0))
+        self.assertEqual(table['columns'], module.DIGITAL_MEASUREMENTS)
+        return {channel: dict(zip(table['columns'], row)) for channel, row in zip(table['channels'], table['values'])}
+
+    def assertMeasured(self, measured, expected):
+        for name, value in expected.items():
+            if value is None:
+                self.assertIsNone(measured[name], name)
+            else:
+                self.assertAlmostEqual(measured[name], value, delta=abs(value) * 1e-9 + 1e-15, msg=name)
+
+    def test_square_wave_at_half_duty(self):
+        self.assertMeasured(self.measure()[0], {
+            'transitions': 20, 'rising_edges': 10, 'frequency_hz': 1e6, 'period_mean_seconds': 1e-6,
+            'period_min_seconds': 1e-6, 'period_max_seconds': 1e-6, 'duty_cycle': 0.5,
+            'high_min_seconds': 0.5e-6, 'high_max_seconds': 0.5e-6, 'low_min_seconds': 0.5e-6, 'low_max_seconds': 0.5e-6,
+            'glitches': 0, 'skew_mean_seconds': 0.0, 'skew_min_seconds': 0.0, 'skew_max_seconds': 0.0})
+        self.assertLess(self.measure()[0]['period_std_seconds'], 1e-15)
+
+    def test_quarter_duty_and_skew(self):
+        self.assertMeasured(self.measure()[1], {
+            'frequency_hz': 1e6, 'duty_cycle': 0.25, 'high_min_seconds': 0.25e-6, 'high_max_seconds': 0.25e-6,
+            'low_min_seconds': 0.75e-6, 'low_max_seconds': 0.75e-6,
+            'skew_mean_seconds': 0.1e-6, 'skew_min_seconds': 0.1e-6, 'skew_max_seconds': 0.1e-6})
+        # Skew is measured to the nearest reference edge, so it is signed
+        self.assertMeasured(self.measure(reference_channel=1)[0], {
+            'skew_mean_seconds': -0.1e-6, 'skew_min_seconds': -0.1e-6, 'skew_max_seconds': -0.1e-6})
+
+    def test_glitches_and_jitter(self):
+        measured = self.measure()[2]
+        self.assertMeasured(measured, {
+            'transitions': 4, 'rising_edges': 2, 'glitches': 1, 'period_mean_seconds': 2e-6, 'frequency_hz': 5e5,
+            'high_min_seconds': 0.01e-6, 'high_max_seconds': 2e-6, 'low_min_seconds': 1.99e-6, 'low_max_seconds': 1.99e-6,
+            'period_std_seconds': None})
+        self.assertAlmostEqual(measured['duty_cycle'], 0.005)
+
+    def test_channel_without_transitions(self):
+        self.assertMeasured(self.measure()[3], {
+            'transitions': 0, 'rising_edges': 0, 'frequency_hz': None, 'duty_cycle': None, 'high_min_seconds': None,
+            'glitches': 0, 'skew_mean_seconds': None})
+        self.assertIsNone(self.measure(reference_channel=-1)[1]['skew_mean_seconds'])
+
+    def test_csv_export_matches_the_binary_one(self):
+        csv_dir = os.path.join(self.work_dir, 'csv')
+        times = [cycle * 0.5e-6 for cycle in range(22)]
+        write_raw_digital(os.path.join(csv_dir, 'digital.csv'), times, [[cycle % 2 for cycle in range(22)]])
+        self.assertMeasured(self.measure(source=csv_dir)[0], {'frequency_hz': 1e6, 'duty_cycle': 0.5, 'rising_edges': 11})
+
+    def test_errors(self):
+        self.assertTrue(module.measure_digital(self.work_dir, 0, 9, 0).startswith('-1 ERROR'))
+        self.assertEqual(module.measure_digital(self.work_dir, 0, 0, 987654), '-1 ERROR Measurement accumulator 987654 does not exist.')
+
+class MeasurementAccumulatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.accumulator_handle = int(module.open_measurement_accumulator())
+
+    def tearDown(self):
+        module.close_measurement_accumulator(self.accumulator_handle)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def capture(self, name, period, reference_channel=0):
+        """
+        Measures one simulated capture: channel 0 at the given period and 50 % duty, channel 1 idle.
+        """
+        capture_dir = os.path.join(self.work_dir, name)
+        write_square_wave(capture_dir, 0, period, period / 2, period, 5, 7 * period)
+        write_binary_digital(os.path.join(capture_dir, 'digital_1.bin'), 0, 0.0, 7 * period, [])
+        self.assertFalse(module.measure_digital(capture_dir, 0, reference_channel, self.accumulator_handle).startswith('-1 ERROR'))
+
+    def accumulated(self, statistic, channel, name):
+        summary = json.loads(module.get_accumulated_measurements(self.accumulator_handle))
+        table = summary[statistic]
+        return table['values'][table['channels'].index(channel)][table['columns'].index(name)]
+
+    def test_statistics_across_captures(self):
+        for name, period in (('a', 1e-6), ('b', 2e-6), ('c', 4e-6)):
+            self.capture(name, period)
+        self.assertEqual(json.loads(module.get_accumulated_measurements(self.accumulator_handle))['captures'], 3)
+        frequencies = [1e6, 5e5, 2.5e5]
+        self.assertEqual(self.accumulated('count', 0, 'frequency_hz'), 3)
+        self.assertAlmostEqual(self.accumulated('mean', 0, 'frequency_hz'), sum(frequencies) / 3)
+        mean = sum(frequencies) / 3
+        self.assertAlmostEqual(self.accumulated('std', 0, 'frequency_hz'), (sum((f - mean) ** 2 for f in frequencies) / 2) ** 0.5)
+        self.assertAlmostEqual(self.accumulated('min', 0, 'frequency_hz'), 2.5e5)
+        self.assertAlmostEqual(self.accumulated('max', 0, 'frequency_hz'), 1e6)
+        self.assertAlmostEqual(self.accumulated('mean', 0, 'duty_cycle'), 0.5)
+        self.assertAlmostEqual(self.accumulated('std', 0, 'duty_cycle'), 0.0)
+
+    def test_measurements_that_do_not_apply_are_not_counted(self):
+        self.capture('a', 1e-6)
+        self.capture('b', 1e-6, reference_channel=-1)
+        # The idle channel never has a frequency, the skew was only measured in the first capture
+        self.assertEqual(self.accumulated('count', 1, 'frequency_hz'), 0)
+        self.assertIsNone(self.accumulated('mean', 1, 'frequency_hz'))
+        self.assertIsNone(self.accumulated('min', 1, 'frequency_hz'))
+        self.assertEqual(self.accumulated('count', 1, 'transitions'), 2)
+        self.assertEqual(self.accumulated('count', 0, 'skew_mean_seconds'), 1)
+        self.assertIsNone(self.accumulated('std', 0, 'skew_mean_seconds')) # One value has no standard deviation
+        self.assertEqual(self.accumulated('count', 0, 'frequency_hz'), 2)
+
+    def test_channels_added_by_a_later_capture(self):
+        self.capture('a', 1e-6)
+        capture_dir = os.path.join(self.work_dir, 'b')
+        write_square_wave(capture_dir, 4, 1e-6, 0.5e-6, 1e-6, 5, 7e-6)
+        module.measure_digital(capture_dir, 0, -1, self.accumulator_handle)
+        self.assertEqual(json.loads(module.get_accumulated_measurements(self.accumulator_handle))['mean']['channels'], [0, 1, 4])
+        self.assertEqual(self.accumulated('count', 4, 'rising_edges'), 1)
+        self.assertEqual(self.accumulated('count', 0, 'rising_edges'), 1)
+
+    def test_empty_and_closed_accumulators(self):
+        summary = json.loads(module.get_accumulated_measurements(self.accumulator_handle))
+        self.assertEqual((summary['captures'], summary['count']['channels'], summary['count']['values']), (0, [], []))
+        self.assertEqual(module.close_measurement_accumulator(self.accumulator_handle), 'Measurement accumulator closed')
+        self.assertTrue(module.get_accumulated_measurements(self.accumulator_handle).startswith('-1 ERROR'))
+        self.assertTrue(module.close_measurement_accumulator(self.accumulator_handle).startswith('-1 ERROR'))
+
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='logic2_test_')
+        self.archive_dir = os.path.join(self.work_dir, 'archive')
+        self.table_path = os.path.join(self.work_dir, 'cycle1', 'spi.csv')
+        os.makedirs(os.path.dirname(self.table_path))
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def chunk_files(self, table_name):
+        return sorted(os.listdir(os.path.join(self.archive_dir, *table_name.split('/'))))
+
+    def run_job(self, sources):
+        job_handle = int(module.archive_exports(sources, self.archive_dir, True, 4))
+        module.registry.get(job_handle, module.ArchiveJob).thread.join(10)
+        return json.loads(module.poll_archive_job(job_handle))
+
+    def test_rearchived_table_leaves_no_stale_chunks(self):
+        write_data_table(self.table_path, ['enable', 'result', 'result', 'disable'] * 3)
+        module._archive_csv(self.table_path, self.archive_dir, 2)
+        write_data_table(self.table_path, ['enable', 'result', 'disable'])
+        table = module._archive_csv(self.table_path, self.archive_dir, 2)
+
+        manifest = module._read_archive_manifest(self.archive_dir)
+        self.assertEqual(manifest['tables']['cycle1/spi'], table)
+        self.assertEqual(self.chunk_files('cycle1/spi'), sorted(os.path.basename(chunk['file']) for chunk in table['chunks']))
+        _, times, _ = module._archive_window(self.archive_dir, 'cycle1/spi', 0, -1)
+        self.assertEqual(times.size, 3)
+
+    def test_failed_conversion_keeps_the_previous_table(self):
+        write_data_table(self.table_path, ['enable', 'result', 'disable'])
+        table = module._archive_csv(self.table_path, self.archive_dir, 2)
+        with open(self.table_path, 'a') as table_file:
+            table_file.write('"SPI","result",not_a_time,5e-07,,\n')
+        with self.assertRaises(ValueError):
+            module._archive_csv(self.table_path, self.archive_dir, 2)
+
+        self.assertEqual(module._read_archive_manifest(self.archive_dir)['tables']['cycle1/spi'], table)
+        self.assertEqual(self.chunk_files('cycle1/spi'), sorted(os.path.basename(chunk['file']) for chunk in table['chunks']))
+
+    def test_export_directories_with_the_same_file_names_keep_their_tables(self):
+        cycle1, cycle2 = os.path.join(self.work_dir, 'cycle1'), os.path.join(self.work_dir, 'cycle2')
+        write_raw_digital(os.path.join(cycle1, 'digital.csv'), [0.0, 1e-6, 2e-6], [[0, 1, 0]])
+        write_raw_digital(os.path.join(cycle2, 'digital.csv'), [0.0, 1e-6], [[1, 0]])
+        self.assertEqual(self.run_job([cycle1, cycle2])['state'], 'COMPLETE')
+
+        tables = json.loads(module.list_archive(self.archive_dir))
+        self.assertEqual((tables['cycle1/digital']['rows'], tables['cycle2/digital']['rows']), (3, 2))
+        status, _, row_count, _, samples = module.read_archive_window(self.archive_dir, 'cycle1/digital', [0], 0, -1)
+        self.assertEqual((status, row_count, list(samples)), ('OK', 3, [0, 1, 0]))
+
+    def test_sources_that_would_share_a_table_are_refused(self):
+        other = os.path.join(self.work_dir, 'elsewhere', 'cycle1', 'spi.csv')
+        write_data_table(self.table_path, ['enable', 'result', 'disable'])
+        os.makedirs(os.path.dirname(other))
+        write_data_table(other, ['enable', 'result', 'disable'])
+        self.assertTrue(module.archive_exports([self.table_path, other], self.archive_dir, True, 4).startswith('-1 ERROR'))
+        self.assertTrue(os.path.isfile(self.table_path) and os.path.isfile(other))
+
+        self.assertEqual(self.run_job([self.table_path])['state'], 'COMPLETE')
+        job_status = self.run_job([other])
+        self.assertEqual(job_status['state'], 'ERROR')
+        self.assertIn('already holds', job_status['error'])
+        self.assertTrue(os.path.isfile(other))
+
+    def test_window_only_decompresses_the_selected_channels(self):
+        path = os.path.join(self.work_dir, 'cycle1', 'digital.csv')
+        write_raw_digital(path, [0.0, 1e-6, 2e-6], [[0, 1, 0], [1, 1, 0], [0, 0, 1]])
+        module._archive_csv(path, self.archive_dir, 2)
+        loaded = []
+        real_load = module.np.load
+
+        class RecordingNpz:
+            def __init__(self, path):
+                self.stored = real_load(path)
+            def __enter__(self):
+                return self
+            def __exit__(self, *exc_info):
+                self.stored.close()
+            def __getitem__(self, key):
+                loaded.append(key)
+                return self.stored[key]
+
+        with unittest.mock.patch.object(module.np, 'load', RecordingNpz):
+            status, channels, _, _, samples = module.read_archive_window(self.archive_dir, 'cycle1/digital', [2], 0, -1)
+        self.assertEqual((status, channels, list(samples)), ('OK', [2], [0, 0, 1]))
+        self.assertEqual(set(loaded), {'time', 'column_2'})
+
+
+if __name__ == '__main__':
+    unittest.main()